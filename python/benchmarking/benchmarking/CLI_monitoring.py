@@ -1,51 +1,30 @@
 import time
-from queue import Empty
-from price_collector import PriceCollector
-from scipy import stats
+from collector_daemon import attach_or_create
+from snapshot_bus import LATEST
+from batch_analytics import pair_metrics
 
 def calculate_metrics(price_history, pair):
     """Calculate Spearman correlation and MSE for a specific pair"""
-    pragma_prices = []
-    pyth_prices = []
-    
-    for entry in price_history:
-        pragma_price = entry['pragma_prices'].get(pair)
-        pyth_price = entry['pyth_prices'].get(pair)
-        
-        if pragma_price and pyth_price:
-            pragma_prices.append(pragma_price)
-            pyth_prices.append(pyth_price)
-    
-    # Calculate MSE
-    mse = None
-    if pragma_prices and pyth_prices:
-        squared_diff = [(p1 - p2) ** 2 for p1, p2 in zip(pragma_prices, pyth_prices)]
-        mse = sum(squared_diff) / len(squared_diff)
-    
-    # Calculate Spearman
-    correlation = None
-    p_value = None
-    if len(pragma_prices) > 1:
-        if len(set(pragma_prices)) > 1 and len(set(pyth_prices)) > 1:
-            correlation, p_value = stats.spearmanr(pragma_prices, pyth_prices)
-    
-    return correlation, p_value, mse, len(pragma_prices)
+    row, = pair_metrics(price_history, [pair], sources=('pyth',))
+    return row['correlation'], row['p_value'], row['mse'], row['count']
 
-def print_price_update(price_entry, price_history):
-    if not price_entry:
+def print_price_update(snapshot, collector):
+    if not snapshot:
         return
         
     print("\nNew price update:")
-    print(f"Timestamp: {time.ctime(price_entry['timestamp'])}")
+    print(f"Timestamp: {time.ctime(snapshot.timestamp)}")
     
-    pragma_prices = price_entry.get('pragma_prices', {})
-    pyth_prices = price_entry.get('pyth_prices', {})
+    pragma_prices = snapshot.latest.get('pragma', {})
+    pyth_prices = snapshot.latest.get('pyth', {})
     
     for pair in sorted(pragma_prices.keys()):
-        pragma_price = pragma_prices[pair]
+        pragma_price = pragma_prices[pair]['price']
         pyth_price = pyth_prices.get(pair)
         
-        correlation, p_value, mse, n = calculate_metrics(price_history, pair)
+        pyth_metrics = collector.get_metrics(pair).get('pyth', {})
+        correlation = pyth_metrics.get('correlation')
+        mse = pyth_metrics.get('mse')
         
         if pyth_price:
             delta = ((pragma_price - pyth_price) * 100) / pragma_price
@@ -62,19 +41,18 @@ def print_price_update(price_entry, price_history):
 
 
 def main():
-    collector = PriceCollector()
-    collector.start()
+    collector = attach_or_create()
+    # Printing can fall behind the feed; only the newest Pragma update matters
+    updates = collector.subscribe(policy=LATEST, sources=('pragma',))
     
     try:
         while True:
             try:
-                new_price_entry = collector.update_queue.get(timeout=1)
-                if new_price_entry:
-                    print_price_update(new_price_entry, collector.get_history())
-                    print(f"\nTotal entries in history: {len(collector.get_history())}")
+                snapshot = updates.get(timeout=1)
+                if snapshot:
+                    print_price_update(snapshot, collector)
+                    print(f"\nTotal entries in history: {collector.get_history_length()}")
                 
-            except Empty:
-                continue
             except Exception as e:
                 print(f"Unexpected error in main loop: {e}")
                 
@@ -1,8 +1,8 @@
 import streamlit as st
-from price_collector import PriceCollector
-from datetime import datetime
+from collector_daemon import RemoteCollector, attach_or_create
+from chart_data import ChartData
+from batch_analytics import pair_metrics, source_metrics
 import time
-from scipy import stats
 import plotly.graph_objects as go
 
 CURRENT_ENV = 'dev'
@@ -22,80 +22,47 @@ COLOR_PER_PUBLISHER = {
     "Flowdesk" : 'white'
 }
 
+LATENCY_WINDOWS = {'1m': 60, '5m': 300, '1h': 3600, 'all': None}
+
 st.set_page_config(
     page_title="Websocket Monitoring",
     page_icon="📈",
     layout="wide"
 )
 
-def create_price_chart(history, selected_pair):
-    """Create price comparison chart for selected pair"""
-    times = []
-    median_prices = []
-    publisher_prices = {}
-    pyth_prices = []
-    stork_prices = []
-    
-    print("\n=== Debug: Price Data ===")
-    for entry in history:
-        times.append(datetime.fromtimestamp(entry['timestamp']))
-        pragma_data = entry['pragma_prices'].get(selected_pair)
-        print(f"\nTimestamp: {datetime.fromtimestamp(entry['timestamp'])}")
-        print(f"Pragma Data: {pragma_data}")
-        
-        # Store median price
-        median_prices.append(pragma_data["price"])
-        
-        # Store individual publisher prices
-        if "component" in pragma_data:
-            print(f"Component prices: {pragma_data['component']}")
-            for publisher_key, price in pragma_data["component"].items():
-                publisher_name = PUBLISHER_SIGNATURES[publisher_key]
-                print(f"Publisher: {publisher_name}, Key: {publisher_key}, Price: {price}")
-                if publisher_name not in publisher_prices:
-                    publisher_prices[publisher_name] = []
-                publisher_prices[publisher_name].append(price)
-
-        pyth_prices.append(entry['pyth_prices'].get(selected_pair))
-        stork_prices.append(entry['stork_prices'].get(selected_pair))
-    
-    print("\nPublisher prices collected:")
-    for pub, prices in publisher_prices.items():
-        print(f"{pub}: {len(prices)} prices")
-
+def create_price_chart(chart_data, selected_pair):
+    """Create price comparison chart for selected pair from decimated, cached series"""
     fig = go.Figure()
     
     # Add individual publisher traces first
-    for publisher_name, prices in publisher_prices.items():
+    for publisher_key in chart_data.history.publishers(selected_pair):
+        publisher_name = PUBLISHER_SIGNATURES.get(publisher_key, publisher_key)
+        times, prices = chart_data.trace('pragma', selected_pair, publisher_key)
         fig.add_trace(go.Scatter(
             x=times,
             y=prices,
             name=publisher_name,
-            line=dict(color=COLOR_PER_PUBLISHER[publisher_name], width=2)
+            line=dict(color=COLOR_PER_PUBLISHER.get(publisher_name), width=2)
         ))
     
     # Add median price trace
+    times, prices = chart_data.trace('pragma', selected_pair)
     fig.add_trace(go.Scatter(
         x=times,
-        y=median_prices,
+        y=prices,
         name='Median Price',
         line=dict(color='green', width=2)
     ))
     
-    # Add other price feeds
-    fig.add_trace(go.Scatter(
-        x=times,
-        y=pyth_prices,
-        name='Pyth',
-        line=dict(color='red', width=2)
-    ))
-
-    fig.add_trace(go.Scatter(
-        x=times,
-        y=stork_prices,
-        name='Stork',
-        line=dict(color='purple', width=2)
-    ))
+    # Add other price feeds, each at the times its updates were received
+    for source, name, color in (('pyth', 'Pyth', 'red'), ('stork', 'Stork', 'purple')):
+        times, prices = chart_data.trace(source, selected_pair)
+        fig.add_trace(go.Scatter(
+            x=times,
+            y=prices,
+            name=name,
+            line=dict(color=color, width=2, shape='hv')
+        ))
 
     fig.update_layout(
         title=f'{selected_pair} Price Comparison',
@@ -108,101 +75,23 @@ def create_price_chart(history, selected_pair):
     
     return fig
 
-def calculate_metrics(price_history, pair):
-    """Calculate Spearman correlation and MSE for a specific pair"""
-    pragma_prices = []
-    pyth_prices = []
-    stork_prices = []
-    
-    for entry in price_history:
-        pragma_data = entry['pragma_prices'].get(pair)
-        if pragma_data and isinstance(pragma_data, dict) and "price" in pragma_data:
-            pragma_price = pragma_data.get('price')
-        else:
-            continue  # Skip if no valid pragma price
-            
-        pyth_price = entry['pyth_prices'].get(pair)
-        stork_price = entry['stork_prices'].get(pair)
-        
-        if pragma_price is not None:
-            # Only append prices when we have matching pairs
-            if pyth_price is not None:
-                pragma_prices.append(pragma_price)
-                pyth_prices.append(pyth_price)
-            if stork_price is not None:
-                if len(pragma_prices) < len(pyth_prices):
-                    pragma_prices.append(pragma_price)
-                stork_prices.append(stork_price)
-    
-    metrics = {}
-    
-    # Calculate Pyth metrics
-    if len(pragma_prices) > 1 and len(pyth_prices) > 1:
-        pyth_mse = sum([(p1 - p2) ** 2 for p1, p2 in zip(pragma_prices[:len(pyth_prices)], pyth_prices)]) / len(pyth_prices)
-        if len(set(pragma_prices[:len(pyth_prices)])) > 1 and len(set(pyth_prices)) > 1:
-            pyth_correlation, _ = stats.spearmanr(pragma_prices[:len(pyth_prices)], pyth_prices)
-        else:
-            pyth_correlation = None
-        metrics['pyth'] = {'mse': pyth_mse, 'correlation': pyth_correlation}
-    
-    # Calculate Stork metrics
-    if len(pragma_prices) > 1 and len(stork_prices) > 1:
-        min_len = min(len(pragma_prices), len(stork_prices))
-        stork_mse = sum([(p1 - p2) ** 2 for p1, p2 in zip(pragma_prices[:min_len], stork_prices[:min_len])]) / min_len
-        if len(set(pragma_prices[:min_len])) > 1 and len(set(stork_prices[:min_len])) > 1:
-            stork_correlation, _ = stats.spearmanr(pragma_prices[:min_len], stork_prices[:min_len])
-        else:
-            stork_correlation = None
-        metrics['stork'] = {'mse': stork_mse, 'correlation': stork_correlation}
-    
-    return metrics
-
-def print_price_update(price_entry, price_history):
-    if not price_entry:
-        return
-    data_per_pair = {}
-    
-    pragma_prices = price_entry.get('pragma_prices', {})
-    pyth_prices = price_entry.get('pyth_prices', {})
-    stork_prices = price_entry.get('stork_prices', {})
-    
-    for pair in sorted(pragma_prices.keys()):
-        pragma_data = pragma_prices[pair]
-        if isinstance(pragma_data, dict) and "price" in pragma_data:
-            pragma_price = pragma_data["price"]
-        else:
-            pragma_price = pragma_data
-            
-        pyth_price = pyth_prices.get(pair)
-        stork_price = stork_prices.get(pair)
-        
-        metrics = calculate_metrics(price_history, pair)
-        
-        data_per_pair[pair] = {
-            "Pragma": pragma_price,
-            "Pyth": pyth_price,
-            "Stork": stork_price
-        }
-        
-        if metrics.get('pyth'):
-            data_per_pair[pair].update({
-                "Pyth_MSE": metrics['pyth']['mse'],
-                "Pyth_Correlation": metrics['pyth']['correlation']
-            })
-        
-        if metrics.get('stork'):
-            data_per_pair[pair].update({
-                "Stork_MSE": metrics['stork']['mse'],
-                "Stork_Correlation": metrics['stork']['correlation']
-            })
-    
-    return data_per_pair
+@st.cache_resource
+def shared_collector():
+    """One collector per Streamlit server, however many sessions are open; attaches to the daemon if configured"""
+    collector = attach_or_create(CURRENT_ENV)
+    if isinstance(collector, RemoteCollector):
+        print(f"Attached to the collector daemon on {collector.socket_path}")
+    else:
+        print(f"Started a local price collector ({CURRENT_ENV})")
+    return collector
 
 
-if 'collector' not in st.session_state:
-    st.session_state.collector = PriceCollector(env=CURRENT_ENV)
-    st.session_state.collector.start()
-    print("Price collector initialized and started")  # Debug print
+st.session_state.collector = shared_collector()
+# One snapshot per refresh, so every chart and table shows the same rows. A
+# RemoteCollector swaps in a new history replica when it resyncs.
+if ('chart_data' not in st.session_state or
+        not st.session_state.chart_data.update(st.session_state.collector.get_history())):
+    st.session_state.chart_data = ChartData(st.session_state.collector.get_history())
 
 def main():
     st.title("Websocket Monitoring")
@@ -216,14 +105,14 @@ def main():
     with col2:
         st.write("Status: Running" if st.session_state.collector.running else "Status: Stopped")
     with col3:
-        history = st.session_state.collector.get_history()
+        history = st.session_state.chart_data.history
         st.write(f"History entries: {len(history)}")
     
     st.divider()
     
     # Body
-    if history and len(history) > 0:
-        latest = history[-1]
+    if len(history) > 0:
+        latest = history.latest()
         
         # Pair selection
         if 'selected_pair' not in st.session_state:
@@ -236,15 +125,18 @@ def main():
             index=available_pairs.index(st.session_state.selected_pair)
         )
         st.session_state.selected_pair = selected_pair
+        missing = st.session_state.collector.get_unmatched_pairs()['missing'].get(selected_pair)
+        if missing:
+            st.caption(f"No {' / '.join(missing)} price received for {selected_pair}")
         
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            fig = create_price_chart(history, selected_pair)
+            fig = create_price_chart(st.session_state.chart_data, selected_pair)
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
-            metrics = calculate_metrics(history, selected_pair)
+            metrics = st.session_state.collector.get_metrics(selected_pair)
             if metrics:
                 st.markdown(f"### Current Metrics for {selected_pair}")
                 
@@ -287,6 +179,7 @@ def main():
                             st.metric("Pyth Correlation", f"{metrics['pyth']['correlation']:.3f}")
                         else:
                             st.metric("Pyth Correlation", "N/A")
+                        st.metric("Pyth Mean Delta", f"{metrics['pyth']['mean_delta_pct']:+.4f}%")
                 with col2:
                     if 'stork' in metrics:
                         st.metric("Stork MSE", f"{metrics['stork']['mse']:.6f}")
@@ -294,33 +187,89 @@ def main():
                             st.metric("Stork Correlation", f"{metrics['stork']['correlation']:.3f}")
                         else:
                             st.metric("Stork Correlation", "N/A")
-            global_metrics = st.session_state.collector.get_latency_metrics()
+                        st.metric("Stork Mean Delta", f"{metrics['stork']['mean_delta_pct']:+.4f}%")
+                # Recomputed over the retained history, so only on request
+                if st.checkbox("Show full-history correlation"):
+                    history_metrics = source_metrics(history, selected_pair)
+                    for source, values in history_metrics.items():
+                        if values['correlation'] is not None:
+                            st.metric(f"{source.capitalize()} Correlation (history)", f"{values['correlation']:.3f}")
+            latency_window = st.radio("Latency window", list(LATENCY_WINDOWS), horizontal=True)
+            global_metrics = st.session_state.collector.get_latency_metrics(LATENCY_WINDOWS[latency_window])
+            missed_slots = st.session_state.collector.calculate_missed_slots()
+            if missed_slots and latency_window != 'all':
+                missed_slots = {**missed_slots, **missed_slots['windows'][latency_window]}
             if global_metrics:
                 st.markdown("### Websocket Metrics")
                 col1, col2 = st.columns(2)
                 empty_message_amount = st.session_state.collector.get_empty_message()
     
                 with col1:
-                    st.metric("Mean Latency", f"{global_metrics['mean']:.2f} ms")
+                    st.metric("Mean Inter-arrival", f"{global_metrics['mean']:.2f} ms")
                     st.metric("Q1 (25th percentile)", f"{global_metrics['q1']:.2f} ms")
                     st.metric("90th percentile", f"{global_metrics['p90']:.2f} ms")
                     st.metric("empty message", f"{empty_message_amount}")
                     
                 with col2:
-                    st.metric("Median Latency", f"{global_metrics['median']:.2f} ms")
+                    st.metric("Median Inter-arrival", f"{global_metrics['median']:.2f} ms")
                     st.metric("Q3 (75th percentile)", f"{global_metrics['q3']:.2f} ms")
                     st.metric("99th percentile", f"{global_metrics['p99']:.2f} ms")
-                    st.metric("missed slot", f"{st.session_state.collector.calculate_missed_slots()['global']['ratio']:.2f}%")
+                    if missed_slots:
+                        st.metric("missed slot", f"{missed_slots['global']['ratio']:.2f}%")
+                    loop_lag = st.session_state.collector.get_loop_lag().get(latency_window)
+                    if loop_lag:
+                        st.metric("Event loop lag p99", f"{loop_lag['p99']:.2f} ms")
+
+            if missed_slots and missed_slots['per_publisher']:
+                st.markdown("#### Missed slots per publisher")
+                st.table({
+                    PUBLISHER_SIGNATURES.get(key, key): {
+                        'missed': counts['missed'],
+                        'total': counts['total'],
+                        'ratio %': round(counts['ratio'], 2)
+                    }
+                    for key, counts in missed_slots['per_publisher'].items()
+                })
+
+            e2e_latency = st.session_state.collector.get_e2e_latency()
+            if any(e2e_latency['stages'].values()):
+                st.markdown("### End-to-end Latency (ms)")
+                st.table({
+                    stage: {k: round(v, 2) for k, v in summary.items()}
+                    for stage, summary in e2e_latency['stages'].items() if summary
+                })
+                st.markdown("#### Median per publisher")
+                st.table({
+                    PUBLISHER_SIGNATURES.get(key, key): {
+                        stage: round(summary['median'], 2)
+                        for stage, summary in stages.items() if summary
+                    }
+                    for key, stages in e2e_latency['per_publisher'].items()
+                })
+
+            stork_stats = st.session_state.collector.get_stork_poll_stats()
+            if stork_stats:
+                st.markdown("### Stork Poll")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Mean Poll Latency", f"{stork_stats['mean_latency_ms']:.2f} ms")
+                    st.metric("99th percentile", f"{stork_stats['p99_latency_ms']:.2f} ms")
+                with col2:
+                    st.metric("Mean Payload", f"{stork_stats['mean_payload_bytes'] / 1024:.1f} KiB")
+                    st.metric("Not Modified", f"{stork_stats['not_modified']} / {stork_stats['polls']}")
                 
                 
         
+        if st.checkbox("Show all-pairs statistics"):
+            st.markdown("### All Pairs (full history)")
+            st.dataframe(pair_metrics(history), use_container_width=True)
+
         if st.checkbox("Show Raw Data"):
             st.markdown("### Raw Data")
             st.write("Latest data:", latest)
     else:
         st.write("Waiting for data...")
     time.sleep(10)
-    print(st.session_state.collector.calculate_missed_slots())
     st.rerun()
 
 
@@ -0,0 +1,179 @@
+"""
+Pragma vs reference statistics for every pair and source in one pass.
+
+    table = pair_metrics(collector.get_history())
+    # [{'pair': 'BTC/USD', 'source': 'pyth', 'count': ..., 'mse': ..., 'correlation': ..., ...}, ...]
+
+The Pragma series and each reference matched to it (``HistoryStore.as_of_matrix``)
+are built once as aligned (time, pair) arrays; deviations are column
+reductions and Spearman ranks come from one ``argsort`` per array, so the
+cost no longer grows with a Python loop over pairs. Columns are independent,
+so once the arrays exceed ``parallel_min_cells`` the pair columns are split
+across a process pool.
+"""
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy import stats
+
+from history_store import HistoryStore, REFERENCE_SOURCES
+
+# Time x pair cells per source above which columns are spread over worker processes
+PARALLEL_MIN_CELLS = 4_000_000
+
+STATISTICS = ('count', 'mse', 'correlation', 'p_value', 'mean_delta', 'mean_delta_pct', 'max_abs_delta')
+
+
+def rank_rows(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    1-based rank of each row's valid entries, ties sharing their average rank
+    as in ``scipy.stats.rankdata``; entries that are not valid rank after them
+    """
+    n_rows, n = values.shape
+    # Invalid entries sort after every price and so never shift a valid rank
+    keyed = np.where(valid, values, np.inf)
+    # Flat index of each row's entries in sorted order
+    order = np.argsort(keyed, axis=1)
+    order += np.arange(0, n_rows * n, n)[:, None]
+    order = order.ravel()
+    ordered = keyed.ravel()[order].reshape(n_rows, n)
+
+    # Runs of equal values, each row starting a new one
+    starts = np.empty(ordered.shape, dtype=bool)
+    starts[:, 0] = True
+    np.not_equal(ordered[:, 1:], ordered[:, :-1], out=starts[:, 1:])
+    run_starts = np.flatnonzero(starts)
+    run_lengths = np.diff(run_starts, append=starts.size)
+    average = run_starts % n + (run_lengths + 1) / 2
+
+    ranks = np.empty(values.size)
+    ranks[order] = np.repeat(average, run_lengths)
+    return ranks.reshape(n_rows, n)
+
+
+def column_statistics(pragma: np.ndarray, reference: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per-column deviation and Spearman statistics of two (time, pair) arrays
+    over the rows where both have a price; NaN where a column has too few matches
+    """
+    # Work on (pair, time) so every reduction and sort runs over contiguous rows
+    pragma = np.ascontiguousarray(pragma.T)
+    reference = np.ascontiguousarray(reference.T)
+    valid = ~np.isnan(pragma) & ~np.isnan(reference)
+    count = valid.sum(axis=1)
+    delta = np.where(valid, pragma - reference, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mse = (delta * delta).sum(axis=1) / count
+        mean_delta = delta.sum(axis=1) / count
+        # A zero Pragma price has no percentage delta
+        with_pct = valid & (pragma != 0)
+        mean_delta_pct = np.where(with_pct, delta * 100 / pragma, 0.0).sum(axis=1) / with_pct.sum(axis=1)
+        max_abs_delta = np.where(count > 0, np.abs(delta).max(axis=1, initial=0.0), np.nan)
+
+        # Spearman is the Pearson correlation of the ranks; only rank pairs that can have one
+        correlation = np.full(len(count), np.nan)
+        ranked = np.flatnonzero(count > 1)
+        if len(ranked):
+            matched = valid[ranked]
+            mean_rank = (count[ranked, None] + 1) / 2
+            centered = [
+                np.where(matched, rank_rows(values[ranked], matched) - mean_rank, 0.0)
+                for values in (pragma, reference)
+            ]
+            covariance = (centered[0] * centered[1]).sum(axis=1)
+            variance = (centered[0] ** 2).sum(axis=1) * (centered[1] ** 2).sum(axis=1)
+            # Constant series have no rank correlation, as in the per-pair code
+            correlation[ranked] = np.where(variance > 0, covariance / np.sqrt(variance), np.nan)
+        correlation = np.clip(correlation, -1.0, 1.0)
+
+        dof = count - 2
+        t = correlation * np.sqrt(dof / ((1.0 - correlation) * (1.0 + correlation)))
+        p_value = np.where(dof > 0, 2 * stats.t.sf(np.abs(t), np.maximum(dof, 1)), np.nan)
+
+    return {
+        'count': count,
+        'mse': mse,
+        'correlation': correlation,
+        'p_value': p_value,
+        'mean_delta': mean_delta,
+        'mean_delta_pct': mean_delta_pct,
+        'max_abs_delta': max_abs_delta
+    }
+
+
+def _parallel_statistics(pragma: np.ndarray, reference: np.ndarray, executor: Executor,
+                         chunks: int) -> Dict[str, np.ndarray]:
+    bounds = np.linspace(0, pragma.shape[1], chunks + 1).astype(int)
+    futures = [
+        executor.submit(column_statistics, np.ascontiguousarray(pragma[:, start:end]),
+                        np.ascontiguousarray(reference[:, start:end]))
+        for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+    ]
+    parts = [future.result() for future in futures]
+    return {name: np.concatenate([part[name] for part in parts]) for name in STATISTICS}
+
+
+def _value(value, integer=False):
+    if integer:
+        return int(value)
+    return None if np.isnan(value) else float(value)
+
+
+def pair_metrics(history: HistoryStore, pairs: Optional[List[str]] = None, sources=REFERENCE_SOURCES,
+                 workers: Optional[int] = None, executor: Optional[Executor] = None,
+                 parallel_min_cells: int = PARALLEL_MIN_CELLS) -> List[Dict]:
+    """
+    One row per pair x reference source with ``STATISTICS``, Pragma matched to
+    each reference as of its timestamps. Pass ``executor`` to reuse a pool;
+    otherwise one with ``workers`` processes is created for large histories.
+    """
+    if pairs is None:
+        pairs = history.pairs('pragma')
+    if not pairs:
+        return []
+    pragma = history.price_matrix('pragma', pairs)
+    timestamps = history.timestamps('pragma')
+
+    workers = workers or os.cpu_count() or 1
+    parallel = workers > 1 and len(pairs) > 1 and pragma.size >= parallel_min_cells
+    own_executor = None
+    if parallel and executor is None:
+        executor = own_executor = ProcessPoolExecutor(workers)
+    try:
+        table = []
+        for source in sources:
+            reference = history.as_of_matrix(source, pairs, timestamps)
+            if parallel:
+                columns = _parallel_statistics(pragma, reference, executor, min(workers, len(pairs)))
+            else:
+                columns = column_statistics(pragma, reference)
+            for j, pair in enumerate(pairs):
+                row = {'pair': pair, 'source': source}
+                for name in STATISTICS:
+                    row[name] = _value(columns[name][j], integer=name == 'count')
+                table.append(row)
+        return table
+    finally:
+        if own_executor:
+            own_executor.shutdown()
+
+
+def metrics_by_pair(table: List[Dict]) -> Dict[str, Dict[str, Dict]]:
+    """``pair_metrics`` rows regrouped as ``{pair: {source: row}}``, skipping unmatched ones"""
+    grouped: Dict[str, Dict[str, Dict]] = {}
+    for row in table:
+        if row['count']:
+            grouped.setdefault(row['pair'], {})[row['source']] = row
+    return grouped
+
+
+def source_metrics(history: HistoryStore, pair: str) -> Dict[str, Dict]:
+    """Spearman correlation and MSE of one pair against each reference source with at least two matches"""
+    metrics = metrics_by_pair(pair_metrics(history, [pair])).get(pair, {})
+    return {
+        source: {'mse': row['mse'], 'correlation': row['correlation']}
+        for source, row in metrics.items() if row['count'] >= 2
+    }
@@ -0,0 +1,193 @@
+"""
+Append-only capture of raw feed messages.
+
+A capture is a directory of segments. Each segment starts with ``MAGIC`` and
+holds records of ``RECORD_HEADER`` (source id, monotonic receive ns, wall-clock
+receive ns, payload length) followed by the raw payload bytes. Segments are
+optionally gzip-compressed and rotated by size or age.
+"""
+import gzip
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, List, NamedTuple, Optional, Union
+
+from latency_tracker import LatencyClock
+
+MAGIC = b'PNBCAP1\n'
+RECORD_HEADER = struct.Struct('<BqqI')
+
+SOURCE_IDS = {'pragma': 0, 'pyth': 1, 'stork': 2}
+SOURCE_NAMES = {v: k for k, v in SOURCE_IDS.items()}
+
+SEGMENT_SUFFIX = '.cap'
+
+
+class CaptureRecord(NamedTuple):
+    source: str
+    monotonic_ns: int
+    wall_ns: int
+    data: bytes
+
+
+class CaptureWriter:
+    """
+    Records raw messages to a segmented capture without blocking the caller.
+
+    ``record()`` only stamps the message and puts it on a queue; a writer
+    thread drains the queue in batches, encodes and writes them, and rotates
+    segments once they exceed ``max_segment_bytes`` (uncompressed) or
+    ``max_segment_seconds``.
+    """
+
+    def __init__(self, directory: str, compress: bool = False, max_segment_bytes: int = 256 * 1024 * 1024,
+                 max_segment_seconds: Optional[float] = 3600, batch_size: int = 1024, flush_interval: float = 0.5,
+                 clock: Optional[LatencyClock] = None):
+        self.directory = directory
+        # Stamps records that don't bring their own times, on the collector's time base
+        self.clock = clock or LatencyClock()
+        self.compress = compress
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.records_written = 0
+        self.bytes_written = 0
+        self.segments: List[str] = []
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._segment_bytes = 0
+        self._segment_started = 0.0
+        self._segment_index = len(list_segments(directory))
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, source: str, data: Union[str, bytes], monotonic_ns: Optional[int] = None,
+               wall_ns: Optional[int] = None):
+        if self._closed:
+            return
+        if monotonic_ns is None:
+            monotonic_ns = self.clock.now()
+        if wall_ns is None:
+            wall_ns = self.clock.to_wall_ns(monotonic_ns)
+        self._queue.put((SOURCE_IDS[source], monotonic_ns, wall_ns, data))
+
+    def close(self):
+        """Flush everything recorded so far and close the current segment"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _open_segment(self):
+        if self._file:
+            self._file.close()
+        name = f"segment-{self._segment_index:06d}-{time.time_ns()}{SEGMENT_SUFFIX}"
+        if self.compress:
+            name += '.gz'
+        path = os.path.join(self.directory, name)
+        self._file = gzip.open(path, 'wb', compresslevel=6) if self.compress else open(path, 'wb')
+        self._file.write(MAGIC)
+        self._segment_index += 1
+        self._segment_bytes = len(MAGIC)
+        self._segment_started = time.monotonic()
+        self.segments.append(path)
+
+    def _needs_rotation(self) -> bool:
+        if self._file is None:
+            return True
+        if self._segment_bytes >= self.max_segment_bytes:
+            return True
+        return (self.max_segment_seconds is not None and
+                time.monotonic() - self._segment_started >= self.max_segment_seconds)
+
+    def _write_batch(self, batch):
+        if self._needs_rotation():
+            self._open_segment()
+        chunks = []
+        for source_id, monotonic_ns, wall_ns, data in batch:
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            chunks.append(RECORD_HEADER.pack(source_id, monotonic_ns, wall_ns, len(data)))
+            chunks.append(data)
+        payload = b''.join(chunks)
+        self._file.write(payload)
+        self._segment_bytes += len(payload)
+        self.records_written += len(batch)
+        self.bytes_written += len(payload)
+
+    def _run(self):
+        done = False
+        while not done:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._file:
+                    self._file.flush()
+                continue
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            done = item is None
+            if batch:
+                self._write_batch(batch)
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def list_segments(directory: str) -> List[str]:
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith(SEGMENT_SUFFIX) or name.endswith(SEGMENT_SUFFIX + '.gz')
+    )
+
+
+def read_segment(path: str) -> Iterator[CaptureRecord]:
+    """
+    Every complete record of a segment. A segment cut short by a crash, or a
+    gzip stream that ends early or is corrupt, ends at its last whole record.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        try:
+            magic = f.read(len(MAGIC))
+        except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+            print(f"Capture segment {path} ends early: {e}")
+            return
+        if not magic:
+            return  # created but never written to
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a capture segment")
+        while True:
+            try:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return  # end of segment, or a record cut short by a crash
+                source_id, monotonic_ns, wall_ns, length = RECORD_HEADER.unpack(header)
+                data = f.read(length)
+            except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+                print(f"Capture segment {path} ends early: {e}")
+                return
+            if len(data) < length:
+                return
+            yield CaptureRecord(SOURCE_NAMES[source_id], monotonic_ns, wall_ns, data)
+
+
+def read_capture(directory: str) -> Iterator[CaptureRecord]:
+    """Every record of a capture, in write order"""
+    for path in list_segments(directory):
+        yield from read_segment(path)
@@ -0,0 +1,144 @@
+"""
+Decimated chart series for the dashboard.
+
+Each trace is reduced to at most ``points_per_trace`` points with min-max
+decimation: rows are grouped into fixed-size buckets and every bucket keeps
+its lowest and highest point, so spikes survive at any zoom-out. Buckets are
+extended as rows are appended and pairs of buckets are merged when the budget
+is exceeded, so a refresh costs O(new rows + budget) and the Plotly payload
+stays the same size whether the run is five minutes or five days old.
+"""
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from history_store import HistoryStore
+
+DEFAULT_POINTS_PER_TRACE = 2000
+
+
+def _reduce(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Min and max point of every row of ``(buckets, n)`` arrays, in time order,
+    NaN-aware. A row whose min and max are the same point (one observation, or
+    a flat price) gets a NaN second point, so it is emitted once.
+    """
+    lowest = np.where(np.isnan(y), np.inf, y).argmin(axis=1)
+    highest = np.where(np.isnan(y), -np.inf, y).argmax(axis=1)
+    idx = np.sort(np.stack([lowest, highest], axis=1), axis=1)
+    rows = np.arange(len(y))[:, None]
+    reduced_y = y[rows, idx]
+    reduced_y[lowest == highest, 1] = np.nan
+    return x[rows, idx], reduced_y
+
+
+class DecimatedSeries:
+    """Min-max decimation of one history column, extended incrementally"""
+
+    def __init__(self, points_per_trace: int = DEFAULT_POINTS_PER_TRACE):
+        self.max_buckets = max(1, points_per_trace // 2 - 1)  # one point pair is kept for the open tail
+        self.bucket_rows = 1
+        self.first_row = 0  # absolute row where the first bucket starts
+        self.processed = 0  # absolute row where the open tail starts
+        self.appended = None
+        self._x = np.empty((0, 2))
+        self._y = np.empty((0, 2))
+        self._points = (np.empty(0), np.empty(0))
+
+    def _reset(self, start: int, count: int):
+        # Start at the power-of-two bucket size that fits the retained rows in the budget
+        self.bucket_rows = 1 << max(0, math.ceil(math.log2(max(count, 1) / self.max_buckets)))
+        self.first_row = self.processed = start
+        self._x = np.empty((0, 2))
+        self._y = np.empty((0, 2))
+
+    def update(self, timestamps: np.ndarray, values: np.ndarray, appended: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Bring the decimation up to date with the retained rows ``timestamps`` /
+        ``values``, the last of which is absolute row ``appended - 1``, and
+        return the decimated (timestamps, values) without NaN points
+        """
+        if appended == self.appended:
+            return self._points
+        count = len(timestamps)
+        start = appended - count
+        if self.appended is None or not start <= self.processed <= appended:
+            self._reset(start, count)
+
+        # Drop buckets that start before the retained window
+        if start > self.first_row:
+            dropped = min(len(self._x), -(-(start - self.first_row) // self.bucket_rows))
+            self._x, self._y = self._x[dropped:], self._y[dropped:]
+            self.first_row += dropped * self.bucket_rows
+
+        # Close the buckets completed since the last update
+        offset = self.processed - start
+        complete = (count - offset) // self.bucket_rows * self.bucket_rows
+        if complete:
+            rows = slice(offset, offset + complete)
+            x, y = _reduce(timestamps[rows].reshape(-1, self.bucket_rows), values[rows].reshape(-1, self.bucket_rows))
+            self._x = np.concatenate([self._x, x])
+            self._y = np.concatenate([self._y, y])
+            self.processed += complete
+
+        while len(self._x) > self.max_buckets:
+            self._merge()
+
+        x, y = self._x, self._y
+        tail = slice(self.processed - start, count)
+        if tail.start < count:
+            tail_x, tail_y = _reduce(timestamps[tail][None, :], values[tail][None, :])
+            x = np.concatenate([x, tail_x])
+            y = np.concatenate([y, tail_y])
+
+        x, y = x.ravel(), y.ravel()
+        observed = ~np.isnan(y)
+        self._points = (x[observed], y[observed])
+        self.appended = appended
+        return self._points
+
+    def _merge(self):
+        """Double the bucket size; an odd last bucket is reopened and rebuilt from the ring"""
+        pairs = len(self._x) // 2
+        if len(self._x) % 2:
+            self.processed -= self.bucket_rows
+        x, y = self._x[:2 * pairs], self._y[:2 * pairs]
+        self._x, self._y = _reduce(x.reshape(pairs, 4), y.reshape(pairs, 4))
+        self.bucket_rows *= 2
+
+
+class ChartData:
+    """
+    Per-trace decimated series of a HistoryStore, cached across dashboard
+    refreshes: pass each refresh's ``snapshot()`` of the same store to ``update``
+    """
+
+    def __init__(self, history: HistoryStore, points_per_trace: int = DEFAULT_POINTS_PER_TRACE):
+        self.history = history
+        self.points_per_trace = points_per_trace
+        self._series: Dict[tuple, DecimatedSeries] = {}
+
+    def update(self, history: HistoryStore) -> bool:
+        """Read the newer ``history`` from now on; False if it is not a snapshot of the same store"""
+        if history.store_id != self.history.store_id:
+            return False
+        self.history = history
+        return True
+
+    def trace(self, source: str, pair: str, publisher: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Decimated (datetime64 times, prices) of a pair, or of one publisher's Pragma component prices"""
+        key = (source, pair, publisher)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = DecimatedSeries(self.points_per_trace)
+
+        history = self.history
+        timestamps = history.timestamps(source)
+        if publisher is None:
+            values = history.prices(source, pair)
+        else:
+            values = history.component(pair, publisher)
+
+        times, prices = series.update(timestamps, values, history.appended(source))
+        return (times * 1000).astype('datetime64[ms]'), prices
@@ -0,0 +1,355 @@
+"""
+One headless collector shared by every dashboard and CLI viewer.
+
+    python collector_daemon.py --env dev                 # serve on DEFAULT_SOCKET
+    COLLECTOR_SOCKET=/tmp/pragma-collector.sock streamlit run GUI_monitoring.py
+
+The daemon runs a single ``PriceCollector`` (one Pragma WebSocket, one Pyth
+stream, one Stork poller) and publishes over a Unix socket, one JSON object
+per line:
+
+    {"type": "snapshot", "series": {...}}      retained history, once on attach
+    {"type": "update", "source", "timestamp", "prices"}   every history append
+    {"type": "stats", ...}                     metrics and latency, every second
+
+Updates are read from one collector subscription, encoded once and shared by
+all subscribers; a subscriber whose queue fills up is dropped and resyncs
+from a fresh snapshot when it reconnects. ``RemoteCollector`` is the read-only client: it rebuilds a local
+``HistoryStore`` replica and answers the same getters as ``PriceCollector``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+from typing import Dict
+
+import numpy as np
+
+from history_store import HistoryStore, SOURCES
+from latency_histogram import DEFAULT_WINDOWS
+from price_collector import ENVIRONMENTS, PriceCollector
+from snapshot_bus import DROP_OLDEST, SnapshotBus
+
+DEFAULT_SOCKET = '/tmp/pragma-collector.sock'
+SOCKET_ENV = 'COLLECTOR_SOCKET'
+
+WINDOW_NAMES = {seconds: name for name, seconds in DEFAULT_WINDOWS.items()}
+WINDOW_NAMES[None] = 'all'
+
+
+def _encode(message: Dict) -> bytes:
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def copy_history(history: HistoryStore) -> Dict:
+    """
+    Columnar copy of every retained series as arrays, NaN where a source had
+    no value; a memory copy, cheap enough to take on the collector's loop
+    """
+    series = {}
+    for source in SOURCES:
+        series[source] = {
+            'timestamps': history.timestamps(source).copy(),
+            'prices': {pair: history.prices(source, pair).copy() for pair in history.pairs(source)}
+        }
+    series['pragma']['components'] = {
+        pair: {key: history.component(pair, key).copy() for key in history.publishers(pair)}
+        for pair in history.pairs('pragma')
+    }
+    return series
+
+
+def _lists(value):
+    if isinstance(value, dict):
+        return {key: _lists(item) for key, item in value.items()}
+    return value.tolist()
+
+
+def history_snapshot(history: HistoryStore) -> Dict:
+    """``copy_history`` as JSON-ready lists"""
+    return _lists(copy_history(history))
+
+
+def encode_snapshot(series: Dict) -> bytes:
+    """The snapshot line for a ``copy_history`` result; slow for long histories, so run off the loop"""
+    return _encode({'type': 'snapshot', 'series': _lists(series)})
+
+
+def load_snapshot(history: HistoryStore, series: Dict):
+    """Load a ``history_snapshot`` into an empty store, one bulk ``extend`` per source"""
+    for source in SOURCES:
+        data = series[source]
+        prices = {pair: np.asarray(column, dtype=float) for pair, column in data['prices'].items()}
+        components = {
+            pair: {key: np.asarray(column, dtype=float) for key, column in columns.items()}
+            for pair, columns in data.get('components', {}).items()
+        }
+        history.extend(source, data['timestamps'], prices, components)
+
+
+class CollectorDaemon:
+    """Serves one collector's updates and stats to any number of Unix socket subscribers"""
+
+    def __init__(self, collector: PriceCollector, socket_path: str = DEFAULT_SOCKET,
+                 stats_interval: float = 1.0, max_queued: int = 10_000):
+        self.collector = collector
+        self.socket_path = socket_path
+        self.stats_interval = stats_interval
+        self.max_queued = max_queued
+        self.subscribers = set()
+        self.updates = collector.subscribe(max_queued, DROP_OLDEST)
+        self._dropped = 0
+
+    def _drop(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)  # tells the writer to close
+
+    def _publish(self, line: bytes):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(line)
+            except asyncio.QueueFull:
+                print("Dropping a subscriber that fell behind")
+                self._drop(queue)
+
+    def _drop_all(self):
+        for queue in list(self.subscribers):
+            self._drop(queue)
+
+    def _forward(self, snapshot):
+        if self.updates.dropped != self._dropped:
+            # Replicas missed updates; make every subscriber resync
+            print("Collector subscription overflowed, resyncing subscribers")
+            self._dropped = self.updates.dropped
+            self._drop_all()
+        if self.subscribers:
+            self._publish(_encode({
+                'type': 'update', 'source': snapshot.source, 'timestamp': snapshot.timestamp,
+                'prices': snapshot.prices
+            }))
+
+    async def _forward_updates(self):
+        while True:
+            self._forward(await self.updates.get_async())
+
+    def stats(self) -> Dict:
+        collector = self.collector
+        return {
+            'type': 'stats',
+            'running': collector.running,
+            'metrics': {pair: collector.get_metrics(pair) for pair in collector.history.pairs('pragma')},
+            'latency_windows': collector.get_latency_windows(),
+            'e2e_latency': collector.get_e2e_latency(),
+            'loop_lag': collector.get_loop_lag(),
+            'pipeline': collector.get_pipeline_stats(),
+            'connection': collector.get_connection_stats(),
+            'profile': collector.get_profile(),
+            'missed_slots': collector.calculate_missed_slots(),
+            'stork_poll': collector.get_stork_poll_stats(),
+            'empty_messages': collector.get_empty_message(),
+            'unmatched_pairs': collector.get_unmatched_pairs()
+        }
+
+    async def _serve_subscriber(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        queue = asyncio.Queue(self.max_queued)
+        # Hand pending updates to the existing subscribers; the new one gets them in its snapshot
+        for snapshot in self.updates.drain():
+            self._forward(snapshot)
+        # Copy and registration happen without yielding, so no update falls in between; the
+        # copy is encoded in a worker thread so the collector's recv loop is not held up by it
+        series = copy_history(self.collector.history)
+        stats = _encode(self.stats())
+        self.subscribers.add(queue)
+        try:
+            encoded = await asyncio.get_running_loop().run_in_executor(None, encode_snapshot, series)
+            del series
+            writer.write(encoded)
+            writer.write(stats)
+            await writer.drain()
+            while True:
+                line = await queue.get()
+                if line is None:
+                    break
+                writer.write(line)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.subscribers.discard(queue)
+            writer.close()
+
+    async def _publish_stats(self):
+        while self.collector.running:
+            await asyncio.sleep(self.stats_interval)
+            if self.subscribers:
+                self._publish(_encode(self.stats()))
+
+    async def run(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._serve_subscriber, path=self.socket_path)
+        print(f"Collector daemon listening on {self.socket_path}")
+        self.collector.running = True
+        forwarder = asyncio.ensure_future(self._forward_updates())
+        try:
+            async with server:
+                await asyncio.gather(self.collector.run_all_fetchers(), self._publish_stats())
+        finally:
+            forwarder.cancel()
+            self.collector.unsubscribe(self.updates)
+            os.unlink(self.socket_path)
+
+
+class RemoteCollector:
+    """
+    Read-only stand-in for ``PriceCollector`` fed by a ``CollectorDaemon``.
+
+    History is a local replica, so chart and metric reads cost the same as
+    in-process; everything else comes from the daemon's latest stats message.
+    If the connection drops, the replica is replaced by a fresh one on resync.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, history_size: int = 50_000):
+        self.socket_path = socket_path
+        self.history_size = history_size
+        self.history = HistoryStore(capacity=history_size)
+        self.updates = SnapshotBus()
+        self.latest_prices = {source: {} for source in SOURCES}
+        self.connected = False
+        self.running = False
+        self._stats: Dict = {}
+        self._thread = None
+
+    def _apply(self, message: Dict):
+        kind = message['type']
+        if kind == 'update':
+            source, timestamp, prices = message['source'], message['timestamp'], message['prices']
+            self.history.append(source, timestamp, prices)
+            # Pragma frames carry every pair; Pyth and Stork only the ones that moved
+            self.latest_prices[source] = prices if source == 'pragma' else {**self.latest_prices[source], **prices}
+            self.updates.publish(source, timestamp, prices, dict(self.latest_prices))
+        elif kind == 'stats':
+            self._stats = message
+        elif kind == 'snapshot':
+            history = HistoryStore(capacity=self.history_size)
+            load_snapshot(history, message['series'])
+            self.history = history
+            self.latest_prices = {source: {} for source in SOURCES}
+
+    async def _subscribe(self):
+        while self.running:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=2 ** 30)
+                self.connected = True
+                try:
+                    while self.running:
+                        line = await reader.readline()
+                        if not line:
+                            break
+                        self._apply(json.loads(line))
+                finally:
+                    self.connected = False
+                    writer.close()
+            except (OSError, ValueError) as e:
+                print(f"Collector daemon connection error: {e}")
+            if self.running:
+                await asyncio.sleep(1)
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._subscribe()), daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def subscribe(self, maxsize=1024, policy=DROP_OLDEST, sources=None):
+        return self.updates.subscribe(maxsize, policy, sources)
+
+    def unsubscribe(self, subscription):
+        self.updates.unsubscribe(subscription)
+
+    def get_snapshot(self):
+        return self.updates.latest
+
+    def get_history(self):
+        return self.history.snapshot()
+
+    def get_history_length(self):
+        return len(self.history)
+
+    def get_metrics(self, pair):
+        return self._stats.get('metrics', {}).get(pair, {})
+
+    def get_latency_metrics(self, window=None):
+        return self._stats.get('latency_windows', {}).get(WINDOW_NAMES.get(window))
+
+    def get_latency_windows(self):
+        return self._stats.get('latency_windows', {})
+
+    def get_e2e_latency(self):
+        return self._stats.get('e2e_latency', {'stages': {}, 'per_pair': {}, 'per_publisher': {}})
+
+    def get_loop_lag(self):
+        return self._stats.get('loop_lag', {})
+
+    def get_pipeline_stats(self):
+        return self._stats.get('pipeline')
+
+    def get_profile(self):
+        return self._stats.get('profile')
+
+    def get_connection_stats(self):
+        return self._stats.get('connection')
+
+    def calculate_missed_slots(self):
+        return self._stats.get('missed_slots')
+
+    def get_stork_poll_stats(self):
+        return self._stats.get('stork_poll')
+
+    def get_empty_message(self):
+        return self._stats.get('empty_messages', 0)
+
+    def get_unmatched_pairs(self):
+        return self._stats.get('unmatched_pairs', {'missing': {}, 'unresolved': {}})
+
+
+def attach_or_create(env: str = 'local') -> object:
+    """A RemoteCollector if ``COLLECTOR_SOCKET`` is set, otherwise an in-process PriceCollector; started"""
+    socket_path = os.environ.get(SOCKET_ENV)
+    collector = RemoteCollector(socket_path) if socket_path else PriceCollector(env=env)
+    collector.start()
+    return collector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--env', choices=list(ENVIRONMENTS), default='local')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET)
+    parser.add_argument('--history-size', type=int, default=50_000)
+    parser.add_argument('--stats-interval', type=float, default=1.0)
+    parser.add_argument('--metrics-port', type=int, help="serve Prometheus/OpenMetrics on this port")
+    parser.add_argument('--pipeline', action='store_true', help="decode Pragma frames off the recv loop")
+    parser.add_argument('--profile', action='store_true', default=None,
+                        help="time hot-path stages (also enabled by PRAGMA_BENCH_PROFILE)")
+    args = parser.parse_args()
+
+    collector = PriceCollector(args.env, history_size=args.history_size, metrics_port=args.metrics_port,
+                               pipeline=args.pipeline, profile=args.profile)
+    daemon = CollectorDaemon(collector, args.socket, args.stats_interval)
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        collector.running = False
+        if collector.capture:
+            collector.capture.close()
+        print("\nCollector daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
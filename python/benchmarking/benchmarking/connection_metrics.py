@@ -0,0 +1,117 @@
+"""
+Connection-level metrics and reconnect backoff for the Pragma WebSocket.
+
+Every connection records its handshake time (connect to open) and the time
+from sending the subscription to the first frame. Pings sampled every few
+seconds give a round-trip baseline of the network path alone, so a latency
+rise can be attributed to the node or to the network. Close codes are
+counted, and each reconnect gap runs from the close to the first frame of
+the next connection. Frames on either side of a gap are not consecutive, so
+the collector leaves that interval out of inter-arrival and missed-slot
+statistics and reports the gaps next to them instead.
+"""
+import random
+from collections import defaultdict, deque
+from typing import Dict, List, NamedTuple, Optional
+
+from latency_histogram import LatencyHistogram, WindowedLatencyHistogram
+
+
+class Backoff:
+    """
+    Reconnect delays: a fast first retry, then exponential growth up to
+    ``maximum``, each delay drawn uniformly from ``[(1 - jitter) x d, d]`` so
+    many clients dropped at once do not reconnect in lockstep
+    """
+
+    def __init__(self, first: float = 0.1, initial: float = 1.0, maximum: float = 30.0,
+                 factor: float = 2.0, jitter: float = 0.5, rng: Optional[random.Random] = None):
+        self.first = first
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.attempt = 0
+
+    def next(self) -> float:
+        """The delay before the next attempt, advancing the schedule"""
+        if self.attempt == 0:
+            delay = self.first
+        else:
+            delay = min(self.maximum, self.initial * self.factor ** (self.attempt - 1))
+        self.attempt += 1
+        return delay * (1 - self.jitter * self.rng.random())
+
+    def reset(self):
+        """Called once a connection is healthy, so the next drop retries fast again"""
+        self.attempt = 0
+
+
+class Gap(NamedTuple):
+    # Wall-clock seconds on the collector's clock
+    start: float
+    end: float
+    # Close code of the connection that ended, or the error that prevented a connection
+    cause: str
+
+
+class ConnectionMetrics:
+    """Handshake, first-data, ping RTT, close-code and reconnect-gap statistics of one feed"""
+
+    def __init__(self, max_gaps: int = 1000):
+        self.handshake = LatencyHistogram()
+        self.first_data = LatencyHistogram()
+        self.ping_rtt = WindowedLatencyHistogram()
+        self.gap = LatencyHistogram()
+        self.close_codes: Dict[str, int] = defaultdict(int)
+        self.ping_timeouts = 0
+        self.connections = 0
+        # Monotonic ns on the collector's clock at which the current connection opened
+        self.opened_ns = 0
+        self.gaps = deque(maxlen=max_gaps)
+        self._down_since_ns: Optional[int] = None
+        self._down_cause: Optional[str] = None
+
+    def opened(self, handshake_ns: int, now_ns: int):
+        self.connections += 1
+        self.opened_ns = now_ns
+        self.handshake.record_us(handshake_ns // 1000)
+
+    def received_first(self, subscribe_to_data_ns: int, now_ns: int, wall_ns: int):
+        """The first frame of a connection, which also ends any reconnect gap"""
+        self.first_data.record_us(subscribe_to_data_ns // 1000)
+        if self._down_since_ns is not None:
+            gap_ns = now_ns - self._down_since_ns
+            self.gap.record_us(gap_ns // 1000)
+            self.gaps.append(Gap((wall_ns - gap_ns) / 1e9, wall_ns / 1e9, self._down_cause))
+            self._down_since_ns = None
+
+    def closed(self, cause, now_ns: int):
+        """A connection ended or failed to open; ``cause`` is its close code or the exception"""
+        cause = str(cause)
+        self.close_codes[cause] += 1
+        if self._down_since_ns is None:
+            self._down_since_ns = now_ns
+            self._down_cause = cause
+
+    def spans_gap(self, previous_ns: Optional[int], received_ns: int) -> bool:
+        """Whether frames received at ``previous_ns`` and ``received_ns`` straddle a reconnect"""
+        return previous_ns is not None and previous_ns < self.opened_ns <= received_ns
+
+    def recent_gaps(self, count: int = 10) -> List[Dict]:
+        return [gap._asdict() for gap in list(self.gaps)[-count:]]
+
+    def report(self) -> Dict:
+        """Summaries in ms, plus counts of connections, close causes and ping timeouts"""
+        return {
+            'connections': self.connections,
+            'handshake_ms': self.handshake.summary(),
+            'first_data_ms': self.first_data.summary(),
+            'ping_rtt_ms': self.ping_rtt.summaries(),
+            'gap_ms': self.gap.summary(),
+            'gap_count': self.gap.total,
+            'close_codes': dict(self.close_codes),
+            'ping_timeouts': self.ping_timeouts,
+            'recent_gaps': self.recent_gaps()
+        }
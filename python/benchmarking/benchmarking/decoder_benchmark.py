@@ -0,0 +1,89 @@
+"""
+Messages/second of the Pragma decode path, before and after the fast-path decoder.
+
+    python decoder_benchmark.py [--payloads recorded.jsonl] [--count 5000] [--pairs 4]
+
+``--payloads`` takes one raw WebSocket message per line; without it a seeded
+synthetic session in the same wire format is used.
+"""
+import argparse
+import contextlib
+import json
+import os
+import time
+
+from price_collector import PriceCollector
+from pragma_decoder import PragmaDecoder
+from synthetic_data import recorded_pragma_messages
+
+
+def legacy_decode(collector: PriceCollector, message: str):
+    """The per-message work ``fetch_pragma_prices`` did before ``PragmaDecoder``"""
+    parsed_data = json.loads(message)
+    print("\n=== Raw Message ===")
+    print(json.dumps(parsed_data, indent=2))
+    if 'oracle_prices' not in parsed_data:
+        return None
+
+    prices = {}
+    for price_data in parsed_data['oracle_prices']:
+        pair = collector.decode_short_string(price_data['global_asset_id'])
+        print(f"\nProcessing pair: {pair}")
+        print(f"Price data: {json.dumps(price_data, indent=2)}")
+        price_value = collector.format_price(price_data['median_price'])
+        component_prices = {}
+        print("\nLooking for component prices...")
+        print(f"Available fields: {price_data.keys()}")
+        for cmp in price_data.get('signed_prices', []):
+            print(f"Processing component: {cmp}")
+            comp_price = collector.format_price(cmp["oracle_price"])
+            if comp_price is not None:
+                component_prices[cmp["signing_key"]] = comp_price
+        print(f"Collected component prices: {component_prices}")
+        prices[pair] = {"price": price_value, "component": component_prices}
+    return prices
+
+
+def measure(decode, messages) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        decode(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def run(messages):
+    collector = PriceCollector()
+    results = {}
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        results['legacy'] = measure(lambda m: legacy_decode(collector, m), messages)
+    results['decoder (json, cold cache)'] = measure(lambda m: PragmaDecoder(json.loads).decode(m, {}), messages)
+    decoder = PragmaDecoder(json.loads)
+    results['decoder (json, warm cache)'] = measure(lambda m: decoder.decode(m, {}), messages)
+    decoder = PragmaDecoder()
+    results['decoder (default backend)'] = measure(lambda m: decoder.decode(m, {}), messages)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payloads', help="file with one raw Pragma message per line")
+    parser.add_argument('--count', type=int, default=5000)
+    parser.add_argument('--pairs', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.payloads:
+        with open(args.payloads) as f:
+            messages = [line.rstrip('\n') for line in f if line.strip()]
+    else:
+        messages = recorded_pragma_messages(args.count, pairs=args.pairs)
+
+    results = run(messages)
+    baseline = results['legacy']
+    print(f"{len(messages)} messages")
+    for name, rate in results.items():
+        print(f"{name:<28} {rate:>12,.0f} msg/s  {rate / baseline:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
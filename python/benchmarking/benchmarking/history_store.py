@@ -0,0 +1,483 @@
+import itertools
+import math
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from pair_registry import PAIRS, PairRegistry
+
+SOURCES = ('pragma', 'pyth', 'stork')
+REFERENCE_SOURCES = ('pyth', 'stork')
+
+# Column groups held by each source's series. Prices are keyed by pair id, so
+# a column is the same pair in every series; Pragma rows also carry the
+# per-publisher component prices, one column per (pair id, signing_key).
+SERIES_GROUPS = {
+    'pragma': ('price', 'component'),
+    'pyth': ('price',),
+    'stork': ('price',),
+}
+
+# Sentinel so ``tolerance=None`` can mean "no limit" while the default is the store's
+_STORE_DEFAULT = object()
+
+# Identifies a store and the snapshots taken of it
+_store_ids = itertools.count()
+
+
+class SeriesBuffer:
+    """
+    One source's timestamped rows in preallocated NumPy ring buffers.
+
+    Every column is allocated twice the capacity and each value is written at
+    ``pos`` and ``pos + capacity``, so the retained window is always one
+    contiguous slice and can be handed out as a zero-copy read-only view.
+    Views alias the ring: they stay valid until ``capacity`` further appends
+    overwrite the rows they cover. Keys of the ``direct_groups`` are column
+    numbers; other groups assign columns to keys as they first appear.
+    """
+
+    def __init__(self, groups, capacity: int, max_age: Optional[float] = None, initial_width: int = 8,
+                 direct_groups=()):
+        self.capacity = capacity
+        self.max_age = max_age
+        self._head = 0
+        self._count = 0
+        # Rows ever appended; the retained window is rows [appended - len, appended)
+        self.appended = 0
+        self._timestamps = np.full(2 * capacity, np.nan)
+        self._columns = {group: np.full((2 * capacity, initial_width), np.nan) for group in groups}
+        self._index: Dict[str, Optional[Dict]] = {
+            group: None if group in direct_groups else {} for group in groups
+        }
+        self._seen: Dict[str, Set[int]] = {group: set() for group in direct_groups}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, values: Dict[str, Dict]):
+        """Append one row of ``{group: {key: value}}`` in O(columns), evicting rows past retention"""
+        pos = self._head
+        self._timestamps[pos] = self._timestamps[pos + self.capacity] = timestamp
+        for group in self._columns:
+            self._write(group, values.get(group, {}), pos)
+
+        self._head = (pos + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        self.appended += 1
+        if self.max_age is not None:
+            self._evict_older_than(timestamp - self.max_age)
+
+    def extend(self, timestamps: np.ndarray, values: Dict[str, Dict]):
+        """
+        Append many rows at once: ``values`` maps group -> key -> one array per
+        column, NaN where a row has no value. Only the last ``capacity`` rows
+        are written, so loading a long history costs O(capacity x columns).
+        """
+        n = len(timestamps)
+        if n == 0:
+            return
+        kept = min(n, self.capacity)
+        positions = (self._head + n - kept + np.arange(kept)) % self.capacity
+        mirrored = np.concatenate([positions, positions + self.capacity])
+        self._timestamps[mirrored] = np.tile(timestamps[-kept:], 2)
+        for group in self._columns:
+            group_values = values.get(group, {})
+            self._assign_columns(group, group_values)
+            column = self._columns[group]
+            column[mirrored] = np.nan
+            for key, data in group_values.items():
+                column[mirrored, self._column_number(group, key)] = np.tile(np.asarray(data, dtype=float)[-kept:], 2)
+
+        self._head = (self._head + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+        self.appended += n
+        if self.max_age is not None:
+            self._evict_older_than(float(timestamps[-1]) - self.max_age)
+
+    def _assign_columns(self, group: str, keys):
+        """Give new keys a column, widening the group if needed"""
+        index = self._index[group]
+        if index is None:
+            self._seen[group].update(keys)
+            width = max(keys, default=-1) + 1
+        else:
+            for key in keys:
+                if key not in index:
+                    index[key] = len(index)
+            width = len(index)
+        if width > self._columns[group].shape[1]:
+            self._widen(group, width)
+
+    def _write(self, group: str, values: Dict, pos: int):
+        self._assign_columns(group, values)
+        index = self._index[group]
+
+        column = self._columns[group]
+        row = column[pos]
+        row.fill(np.nan)
+        if values:
+            # One scatter of the whole row rather than a NumPy setitem per value
+            n = len(values)
+            numbers = values if index is None else map(index.__getitem__, values)
+            row[np.fromiter(numbers, dtype=np.intp, count=n)] = np.fromiter(values.values(), dtype=float, count=n)
+        column[pos + self.capacity] = row
+
+    def _widen(self, group: str, width: int):
+        column = self._columns[group]
+        grown = np.full((column.shape[0], max(width, 2 * column.shape[1])), np.nan)
+        grown[:, :column.shape[1]] = column
+        self._columns[group] = grown
+
+    def _evict_older_than(self, cutoff: float):
+        while self._count > 1 and self._timestamps[(self._head - self._count) % self.capacity] < cutoff:
+            self._count -= 1
+
+    def _window(self) -> slice:
+        end = self._head if self._head >= self._count else self._head + self.capacity
+        return slice(end - self._count, end)
+
+    @staticmethod
+    def _readonly(view: np.ndarray) -> np.ndarray:
+        view.flags.writeable = False
+        return view
+
+    def timestamps(self) -> np.ndarray:
+        return self._readonly(self._timestamps[self._window()])
+
+    def _column_number(self, group: str, key) -> Optional[int]:
+        index = self._index[group]
+        if index is None:
+            return key if key in self._seen[group] else None
+        return index.get(key)
+
+    def column(self, group: str, key) -> np.ndarray:
+        j = None if key is None else self._column_number(group, key)
+        if j is None:
+            return self._readonly(np.full(self._count, np.nan))
+        return self._readonly(self._columns[group][self._window(), j])
+
+    def columns(self, group: str, keys: List) -> np.ndarray:
+        """Copy of several columns as one (rows, keys) array, NaN for unknown keys"""
+        numbers = [None if key is None else self._column_number(group, key) for key in keys]
+        block = np.full((self._count, len(keys)), np.nan)
+        known = [i for i, j in enumerate(numbers) if j is not None]
+        if known:
+            block[:, known] = self._columns[group][self._window()][:, [numbers[i] for i in known]]
+        return block
+
+    def keys(self, group: str) -> List:
+        index = self._index[group]
+        return sorted(self._seen[group]) if index is None else list(index)
+
+    def latest_row(self, group: str) -> Dict:
+        """The non-NaN values of the most recent row"""
+        if self._count == 0:
+            return {}
+        values = self._columns[group][(self._head - 1) % self.capacity]
+        row = {}
+        for key in self.keys(group):
+            value = values[self._column_number(group, key)]
+            if not math.isnan(value):
+                row[key] = float(value)
+        return row
+
+    def latest_timestamp(self) -> Optional[float]:
+        if self._count == 0:
+            return None
+        return float(self._timestamps[(self._head - 1) % self.capacity])
+
+    def snapshot(self) -> 'SeriesBuffer':
+        """Copy of the retained window in a buffer of its own, sized to fit it"""
+        window = self._window()
+        copy = SeriesBuffer.__new__(SeriesBuffer)
+        copy.capacity = max(self._count, 1)
+        copy.max_age = self.max_age
+        copy._head = 0
+        copy._count = self._count
+        copy.appended = self.appended
+        copy._timestamps = self._mirrored(self._timestamps[window])
+        copy._columns = {group: self._mirrored(column[window]) for group, column in self._columns.items()}
+        copy._index = {group: None if index is None else dict(index) for group, index in self._index.items()}
+        copy._seen = {group: set(seen) for group, seen in self._seen.items()}
+        return copy
+
+    @staticmethod
+    def _mirrored(rows: np.ndarray) -> np.ndarray:
+        if len(rows) == 0:
+            return np.full((2,) + rows.shape[1:], np.nan)
+        return np.concatenate([rows, rows])
+
+
+class HistoryStore:
+    """
+    Bounded price history with one timestamped series per source.
+
+    Pragma rows are whole messages (median and component prices); Pyth and
+    Stork rows hold only the pairs each update carried, NaN elsewhere, stamped
+    with that update's receive time. Sources are compared with ``as_of``: each
+    Pragma row is matched to the nearest previous observation of the
+    reference, dropped if it is older than ``match_tolerance`` seconds.
+
+    A store has one writer. Other threads read it through ``snapshot()``, a
+    consistent copy that later appends do not touch.
+    """
+
+    def __init__(self, capacity: int = 50_000, max_age: Optional[float] = None, initial_width: int = 8,
+                 match_tolerance: Optional[float] = None, registry: PairRegistry = PAIRS):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.max_age = max_age
+        self.match_tolerance = match_tolerance
+        self.registry = registry
+        self.version = 0
+        self.store_id = next(_store_ids)
+        # Held by appends and by snapshot(), so a copy never sees half a row
+        self._lock = threading.Lock()
+        self._series = {
+            source: SeriesBuffer(groups, capacity, max_age, max(initial_width, len(registry)),
+                                 direct_groups=('price', 'component'))
+            for source, groups in SERIES_GROUPS.items()
+        }
+        # Component column numbers by pair id and signing key, and the (pair id, key) of each column
+        self._component_columns: Dict[int, Dict[str, int]] = {}
+        self._component_keys: List[Tuple[int, str]] = []
+        # Last observation of every reference pair, kept past eviction for streaming matches
+        self._last_prices: Dict[str, Dict[str, float]] = {source: {} for source in REFERENCE_SOURCES}
+        self._last_times: Dict[str, Dict[str, float]] = {source: {} for source in REFERENCE_SOURCES}
+
+    def __len__(self) -> int:
+        """Number of retained Pragma rows"""
+        return len(self._series['pragma'])
+
+    def count(self, source: str) -> int:
+        return len(self._series[source])
+
+    def appended(self, source: str) -> int:
+        """Rows ever appended to a source's series, retained or not"""
+        return self._series[source].appended
+
+    def append(self, source: str, timestamp: float, prices: Dict, pair_ids: Optional[List[int]] = None):
+        """
+        Append one update of ``source``: a decoded Pragma message
+        (``{pair: {"price", "component"}}``) or a reference ``{pair: price}``.
+        ``pair_ids`` are the registry ids of ``prices``' pairs in iteration
+        order, as the decoder and fetchers resolved them; without them each
+        pair is looked up.
+        """
+        if pair_ids is None:
+            intern = self.registry.intern
+            pair_ids = [intern(pair) for pair in prices]
+        with self._lock:
+            if source == 'pragma':
+                component_columns = self._component_columns
+                price = {}
+                component = {}
+                for pair_id, data in zip(pair_ids, prices.values()):
+                    price[pair_id] = data['price']
+                    columns = component_columns.get(pair_id, {})
+                    for key, value in data.get('component', {}).items():
+                        j = columns.get(key)
+                        if j is None:
+                            j = self._component_column(pair_id, key)
+                        component[j] = value
+                self._series['pragma'].append(timestamp, {'price': price, 'component': component})
+            else:
+                self._series[source].append(timestamp, {'price': dict(zip(pair_ids, prices.values()))})
+                self._last_prices[source] = {**self._last_prices[source], **prices}
+                times = self._last_times[source]
+                for pair in prices:
+                    times[pair] = timestamp
+            self.version += 1
+
+    def extend(self, source: str, timestamps: np.ndarray, prices: Dict[str, np.ndarray],
+               components: Optional[Dict[str, Dict[str, np.ndarray]]] = None):
+        """
+        Bulk ``append`` of whole columns, e.g. to load a long history: ``prices``
+        maps pair -> one price per timestamp (NaN where absent) and, for Pragma,
+        ``components`` maps pair -> signing key -> component prices.
+        """
+        intern = self.registry.intern
+        timestamps = np.asarray(timestamps, dtype=float)
+        values = {'price': {intern(pair): column for pair, column in prices.items()}}
+        with self._lock:
+            if source == 'pragma':
+                values['component'] = {
+                    self._component_column(intern(pair), key): column
+                    for pair, columns in (components or {}).items()
+                    for key, column in columns.items()
+                }
+            else:
+                last_prices = dict(self._last_prices[source])
+                times = self._last_times[source]
+                for pair, column in prices.items():
+                    observed = np.flatnonzero(~np.isnan(column))
+                    if len(observed):
+                        last_prices[pair] = float(column[observed[-1]])
+                        times[pair] = float(timestamps[observed[-1]])
+                self._last_prices[source] = last_prices
+            self._series[source].extend(timestamps, values)
+            self.version += 1
+
+    def _component_column(self, pair_id: int, key: str) -> int:
+        """Column of a pair's component from ``key``, numbered on first sight"""
+        columns = self._component_columns.setdefault(pair_id, {})
+        j = columns.get(key)
+        if j is None:
+            j = columns[key] = len(self._component_keys)
+            self._component_keys.append((pair_id, key))
+        return j
+
+    def snapshot(self) -> 'HistoryStore':
+        """
+        Consistent copy of the retained history for readers on other threads,
+        taken between two appends. Every view and matrix read from it agrees,
+        however long the reader holds it. The writer waits for the copy, a few
+        ms at full capacity, so take one per refresh rather than per read.
+        """
+        copy = HistoryStore.__new__(HistoryStore)
+        copy.capacity = self.capacity
+        copy.max_age = self.max_age
+        copy.match_tolerance = self.match_tolerance
+        copy.registry = self.registry
+        copy.store_id = self.store_id
+        copy._lock = threading.Lock()
+        with self._lock:
+            copy.version = self.version
+            copy._series = {source: series.snapshot() for source, series in self._series.items()}
+            copy._last_prices = dict(self._last_prices)
+            copy._last_times = {source: dict(times) for source, times in self._last_times.items()}
+            copy._component_columns = {pair_id: dict(keys) for pair_id, keys in self._component_columns.items()}
+            copy._component_keys = list(self._component_keys)
+        return copy
+
+    def timestamps(self, source: str = 'pragma') -> np.ndarray:
+        """Read-only view of a source's retained receive timestamps, oldest first"""
+        return self._series[source].timestamps()
+
+    def prices(self, source: str, pair: str) -> np.ndarray:
+        """Read-only view of a pair's column in the source's own series (NaN where absent)"""
+        return self._series[source].column('price', self.registry.ids.get(pair))
+
+    def price_matrix(self, source: str, pairs: List[str]) -> np.ndarray:
+        """Copy of the source's series as a (rows, pairs) array, one column per pair in ``pairs``"""
+        ids = self.registry.ids
+        return self._series[source].columns('price', [ids.get(pair) for pair in pairs])
+
+    def component(self, pair: str, key: str) -> np.ndarray:
+        """Read-only view of one publisher's component price column for a Pragma pair"""
+        columns = self._component_columns.get(self.registry.ids.get(pair), {})
+        return self._series['pragma'].column('component', columns.get(key))
+
+    def publishers(self, pair: str) -> List[str]:
+        """Signing keys with component prices for a Pragma pair"""
+        return list(self._component_columns.get(self.registry.ids.get(pair), {}))
+
+    def components(self, pair: str) -> Dict[str, np.ndarray]:
+        """Read-only views of each publisher's component price column for a Pragma pair"""
+        series = self._series['pragma']
+        columns = self._component_columns.get(self.registry.ids.get(pair), {})
+        return {key: series.column('component', j) for key, j in columns.items()}
+
+    def pairs(self, source: str) -> List[str]:
+        """Canonical names of the pairs a source has delivered"""
+        names = self.registry.names
+        return [names[pair_id] for pair_id in self._series[source].keys('price')]
+
+    def as_of(self, source: str, pair: str, timestamps: Optional[np.ndarray] = None,
+              tolerance=_STORE_DEFAULT) -> np.ndarray:
+        """
+        ``source``'s price for ``pair`` as of each of ``timestamps`` (the Pragma
+        timestamps by default): the nearest previous observation, or NaN if there
+        is none or it is more than ``tolerance`` seconds old.
+        """
+        if timestamps is None:
+            timestamps = self.timestamps('pragma')
+        if tolerance is _STORE_DEFAULT:
+            tolerance = self.match_tolerance
+
+        column = self.prices(source, pair)
+        observed = ~np.isnan(column)
+        matched = np.full(len(timestamps), np.nan)
+        if not observed.any():
+            return matched
+        observed_at = self.timestamps(source)[observed]
+        observed_prices = column[observed]
+
+        idx = np.searchsorted(observed_at, timestamps, side='right') - 1
+        valid = idx >= 0
+        if tolerance is not None:
+            valid &= timestamps - observed_at[np.maximum(idx, 0)] <= tolerance
+        matched[valid] = observed_prices[idx[valid]]
+        return matched
+
+    def as_of_matrix(self, source: str, pairs: List[str], timestamps: Optional[np.ndarray] = None,
+                     tolerance=_STORE_DEFAULT) -> np.ndarray:
+        """
+        ``as_of`` for every pair in ``pairs`` at once, as a (timestamps, pairs)
+        array: the source's rows are forward-filled per column and matched to
+        ``timestamps`` with a single ``searchsorted``.
+        """
+        if timestamps is None:
+            timestamps = self.timestamps('pragma')
+        if tolerance is _STORE_DEFAULT:
+            tolerance = self.match_tolerance
+
+        block = self.price_matrix(source, pairs)
+        matched = np.full((len(timestamps), len(pairs)), np.nan)
+        if len(block) == 0 or not pairs:
+            return matched
+        observed_at = self.timestamps(source)
+        # Row of each column's last observation at or before every row, -1 before the first
+        last = np.where(np.isnan(block), -1, np.arange(len(block))[:, None])
+        np.maximum.accumulate(last, axis=0, out=last)
+
+        idx = np.searchsorted(observed_at, timestamps, side='right') - 1
+        rows = np.where(idx[:, None] >= 0, last[np.maximum(idx, 0)], -1)
+        valid = rows >= 0
+        if tolerance is not None:
+            valid &= timestamps[:, None] - observed_at[np.maximum(rows, 0)] <= tolerance
+        columns = np.broadcast_to(np.arange(len(pairs)), rows.shape)
+        matched[valid] = block[rows[valid], columns[valid]]
+        return matched
+
+    def latest_observed(self, source: str, now: Optional[float] = None, tolerance=_STORE_DEFAULT) -> Dict[str, float]:
+        """
+        The last observed price of every pair of a reference source, leaving out
+        those more than ``tolerance`` seconds older than ``now``. Without a
+        tolerance the returned dict is shared; treat it as read-only.
+        """
+        if tolerance is _STORE_DEFAULT:
+            tolerance = self.match_tolerance
+        prices = self._last_prices[source]
+        if tolerance is None or now is None:
+            return prices
+        times = self._last_times[source]
+        return {pair: price for pair, price in prices.items() if now - times[pair] <= tolerance}
+
+    def latest(self) -> Optional[Dict]:
+        """The most recent Pragma row with the last observed references, in the legacy entry format"""
+        series = self._series['pragma']
+        if len(series) == 0:
+            return None
+
+        names = self.registry.names
+        pragma = {
+            names[pair_id]: {'price': price, 'component': {}}
+            for pair_id, price in series.latest_row('price').items()
+        }
+        for j, price in series.latest_row('component').items():
+            pair_id, key = self._component_keys[j]
+            pair = names[pair_id]
+            if pair in pragma:
+                pragma[pair]['component'][key] = price
+
+        timestamp = series.latest_timestamp()
+        return {
+            'timestamp': timestamp,
+            'pragma_prices': pragma,
+            'pyth_prices': self.latest_observed('pyth', timestamp),
+            'stork_prices': self.latest_observed('stork', timestamp),
+        }
@@ -0,0 +1,202 @@
+import json
+import time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+DEFAULT_HIGHEST_US = 3_600_000_000  # one hour
+DEFAULT_SUB_BUCKET_BITS = 7  # 64 linear sub-buckets per power of two, ~1.6% precision
+DEFAULT_WINDOWS = {'1m': 60, '5m': 300, '1h': 3600}
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of latencies, stored as integer microseconds.
+
+    Each power of two is split into ``2 ** (sub_bucket_bits - 1)`` linear
+    sub-buckets, so memory is fixed by the configuration, recording is O(1)
+    and relative error is bounded by the sub-bucket width. Negative samples
+    (clock skew between publisher and client) are counted in ``negative`` and
+    recorded as zero. Histograms with the same configuration merge by adding
+    their counts.
+    """
+
+    def __init__(self, highest_us: int = DEFAULT_HIGHEST_US, sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS):
+        self.highest_us = highest_us
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_bucket_count = 1 << sub_bucket_bits
+        self._half_count = self._sub_bucket_count >> 1
+        bucket_count = max(1, highest_us.bit_length() - sub_bucket_bits + 1)
+        self.counts = np.zeros((bucket_count + 1) * self._half_count, dtype=np.int64)
+        self.total = 0
+        self.negative = 0
+        self.sum_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us: Optional[int] = None
+
+    def _index(self, value_us: int) -> int:
+        bucket = max(0, value_us.bit_length() - self.sub_bucket_bits)
+        return (bucket + 1) * self._half_count + (value_us >> bucket) - self._half_count
+
+    def _value_at(self, index: int) -> float:
+        """Midpoint of the range of values that land in ``index``"""
+        bucket = index // self._half_count - 1
+        sub_bucket = index % self._half_count + self._half_count
+        if bucket < 0:
+            bucket = 0
+            sub_bucket -= self._half_count
+        return ((sub_bucket << bucket) + ((1 << bucket) - 1) / 2)
+
+    def record_us(self, value_us: int, count: int = 1):
+        if value_us < 0:
+            self.negative += count
+            value_us = 0
+        value_us = min(value_us, self.highest_us)
+        self.counts[self._index(value_us)] += count
+        self.total += count
+        self.sum_us += value_us * count
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if self.max_us is None or value_us > self.max_us:
+            self.max_us = value_us
+
+    def record_ms(self, value_ms: float):
+        self.record_us(int(value_ms * 1000))
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Approximate ``q``-th percentile in ms"""
+        return self.percentiles((q,))[q]
+
+    def percentiles(self, qs: Iterable[float]) -> Dict[float, Optional[float]]:
+        if self.total == 0:
+            return {q: None for q in qs}
+        cumulative = np.cumsum(self.counts)
+        result = {}
+        for q in qs:
+            rank = max(1, int(np.ceil(q / 100 * self.total)))
+            index = int(np.searchsorted(cumulative, rank))
+            result[q] = min(max(self._value_at(index), self.min_us), self.max_us) / 1000
+        return result
+
+    def cumulative_counts(self, bounds_us: Iterable[int]) -> Dict[int, int]:
+        """Number of samples at or below each bound, to the histogram's precision"""
+        cumulative = np.cumsum(self.counts)
+        return {
+            bound: int(cumulative[self._index(min(max(int(bound), 0), self.highest_us))])
+            for bound in bounds_us
+        }
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum_us / self.total / 1000 if self.total else None
+
+    def summary(self) -> Optional[Dict[str, float]]:
+        """Count, mean, quartiles, tail percentiles and extremes in ms"""
+        if self.total == 0:
+            return None
+        p = self.percentiles((25, 50, 75, 90, 99))
+        return {
+            'count': self.total,
+            'mean': self.mean,
+            'median': p[50],
+            'q1': p[25],
+            'q3': p[75],
+            'p90': p[90],
+            'p99': p[99],
+            'min': self.min_us / 1000,
+            'max': self.max_us / 1000
+        }
+
+    def _check_compatible(self, other: 'LatencyHistogram'):
+        if (other.highest_us, other.sub_bucket_bits) != (self.highest_us, self.sub_bucket_bits):
+            raise ValueError("cannot merge histograms with different configurations")
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """Add ``other``'s samples into this histogram and return it"""
+        self._check_compatible(other)
+        if other.total == 0:
+            return self
+        self.counts += other.counts
+        self.total += other.total
+        self.negative += other.negative
+        self.sum_us += other.sum_us
+        self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = other.max_us if self.max_us is None else max(self.max_us, other.max_us)
+        return self
+
+    def copy(self) -> 'LatencyHistogram':
+        return LatencyHistogram(self.highest_us, self.sub_bucket_bits).merge(self)
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable form holding only the non-empty buckets"""
+        nonzero = np.flatnonzero(self.counts)
+        return {
+            'highest_us': self.highest_us,
+            'sub_bucket_bits': self.sub_bucket_bits,
+            'total': self.total,
+            'negative': self.negative,
+            'sum_us': self.sum_us,
+            'min_us': self.min_us,
+            'max_us': self.max_us,
+            'buckets': {str(int(i)): int(self.counts[i]) for i in nonzero}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        histogram = cls(data['highest_us'], data['sub_bucket_bits'])
+        for index, count in data['buckets'].items():
+            histogram.counts[int(index)] = count
+        histogram.total = data['total']
+        histogram.negative = data['negative']
+        histogram.sum_us = data['sum_us']
+        histogram.min_us = data['min_us']
+        histogram.max_us = data['max_us']
+        return histogram
+
+    def dumps(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def loads(cls, text: str) -> 'LatencyHistogram':
+        return cls.from_dict(json.loads(text))
+
+
+class WindowedLatencyHistogram:
+    """
+    A cumulative histogram plus a ring of per-slot histograms, so summaries
+    over the last minute / 5 minutes / hour are a merge of at most
+    ``horizon / slot_seconds`` slots rather than a pass over raw samples.
+    """
+
+    def __init__(self, slot_seconds: int = 20, horizon_seconds: int = 3600, **histogram_config):
+        self.slot_seconds = slot_seconds
+        self.histogram_config = histogram_config
+        self.total = LatencyHistogram(**histogram_config)
+        self._slots = [None] * (horizon_seconds // slot_seconds)
+        self._slot_ids = [-1] * len(self._slots)
+
+    def record_ms(self, value_ms: float, now: Optional[float] = None):
+        slot_id = int((time.monotonic() if now is None else now) // self.slot_seconds)
+        i = slot_id % len(self._slots)
+        if self._slot_ids[i] != slot_id:
+            self._slots[i] = LatencyHistogram(**self.histogram_config)
+            self._slot_ids[i] = slot_id
+        self._slots[i].record_ms(value_ms)
+        self.total.record_ms(value_ms)
+
+    def window(self, seconds: Optional[float], now: Optional[float] = None) -> LatencyHistogram:
+        """Merged histogram of the last ``seconds`` (rounded up to whole slots); None means all time"""
+        if seconds is None:
+            return self.total
+        current = int((time.monotonic() if now is None else now) // self.slot_seconds)
+        oldest = current - int(np.ceil(seconds / self.slot_seconds)) + 1
+        merged = LatencyHistogram(**self.histogram_config)
+        for slot_id, histogram in zip(list(self._slot_ids), list(self._slots)):
+            if histogram is not None and oldest <= slot_id <= current:
+                merged.merge(histogram)
+        return merged
+
+    def summaries(self, windows: Dict[str, float] = DEFAULT_WINDOWS) -> Dict[str, Optional[Dict]]:
+        result = {name: self.window(seconds).summary() for name, seconds in windows.items()}
+        result['all'] = self.total.summary()
+        return result
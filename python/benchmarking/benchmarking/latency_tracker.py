@@ -0,0 +1,125 @@
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from latency_histogram import LatencyHistogram
+
+# publisher signs -> node aggregates and sends -> client receives -> client has parsed
+STAGES = ('publisher_to_node', 'node_to_receive', 'receive_to_parsed', 'publisher_to_parsed')
+
+
+def timestamp_to_ns(value) -> Optional[int]:
+    """Convert a payload timestamp in s, ms, us or ns (guessed from magnitude) to epoch ns"""
+    try:
+        ts = float(value)
+    except (TypeError, ValueError):
+        return None
+    if ts > 1e17:
+        return int(ts)
+    if ts > 1e14:
+        return int(ts * 1e3)
+    if ts > 1e11:
+        return int(ts * 1e6)
+    return int(ts * 1e9)
+
+
+class LatencyClock:
+    """
+    Monotonic nanosecond clock anchored to the wall clock once, at construction,
+    so receive times can be compared with payload timestamps without being
+    affected by NTP steps during a run.
+    """
+
+    def __init__(self):
+        self.offset_ns = time.time_ns() - time.monotonic_ns()
+
+    @staticmethod
+    def now() -> int:
+        return time.monotonic_ns()
+
+    def to_wall_ns(self, monotonic_ns: int) -> int:
+        return monotonic_ns + self.offset_ns
+
+    def wall_time(self, monotonic_ns: Optional[int] = None) -> float:
+        """Seconds since the epoch on this clock, now or at ``monotonic_ns``"""
+        return self.to_wall_ns(self.now() if monotonic_ns is None else monotonic_ns) / 1e9
+
+
+class LatencyTracker:
+    """Per-stage latency histograms keyed by pair and publisher"""
+
+    def __init__(self, clock: Optional[LatencyClock] = None):
+        # Shared between collectors whose receive times must be comparable
+        self.clock = clock or LatencyClock()
+        self._samples: Dict[Tuple[str, Optional[str], Optional[str]], LatencyHistogram] = defaultdict(
+            LatencyHistogram
+        )
+
+    def record(self, received_ns: int, parsed_ns: int, node_timestamp,
+               publisher_timestamps: Iterable[Tuple[str, str, object]]):
+        """
+        Record one message. ``received_ns`` and ``parsed_ns`` come from
+        ``clock.now()``; ``node_timestamp`` and the ``(pair, signing_key, timestamp)``
+        publisher entries are the raw payload values.
+        """
+        samples = self._samples
+        received_wall_ns = self.clock.to_wall_ns(received_ns)
+        parsed_wall_ns = self.clock.to_wall_ns(parsed_ns)
+        samples[('receive_to_parsed', None, None)].record_ms((parsed_ns - received_ns) / 1e6)
+
+        node_ns = timestamp_to_ns(node_timestamp)
+        pairs = set()
+        for pair, publisher, timestamp in publisher_timestamps:
+            pairs.add(pair)
+            publisher_ns = timestamp_to_ns(timestamp)
+            if publisher_ns is None:
+                continue
+            samples[('publisher_to_parsed', pair, publisher)].record_ms((parsed_wall_ns - publisher_ns) / 1e6)
+            if node_ns is not None:
+                samples[('publisher_to_node', pair, publisher)].record_ms((node_ns - publisher_ns) / 1e6)
+
+        if node_ns is not None:
+            node_to_receive = (received_wall_ns - node_ns) / 1e6
+            for pair in pairs or (None,):
+                samples[('node_to_receive', pair, None)].record_ms(node_to_receive)
+
+    @staticmethod
+    def _merge(histograms) -> LatencyHistogram:
+        merged = LatencyHistogram()
+        for histogram in histograms:
+            merged.merge(histogram)
+        return merged
+
+    @classmethod
+    def _summary(cls, histograms) -> Optional[Dict[str, float]]:
+        if not histograms:
+            return None
+        return cls._merge(histograms).summary()
+
+    def stage_histograms(self) -> Dict[str, LatencyHistogram]:
+        """One merged histogram per stage that has samples"""
+        per_stage = defaultdict(list)
+        for key, histogram in list(self._samples.items()):
+            per_stage[key[0]].append(histogram)
+        return {stage: self._merge(per_stage[stage]) for stage in STAGES if stage in per_stage}
+
+    def _group(self, key_index: int) -> Dict[str, Dict[str, Dict]]:
+        grouped = defaultdict(lambda: defaultdict(list))
+        for key, histogram in list(self._samples.items()):
+            if key[key_index] is not None:
+                grouped[key[key_index]][key[0]].append(histogram)
+        return {
+            name: {stage: self._summary(histograms) for stage, histograms in stages.items()}
+            for name, stages in grouped.items()
+        }
+
+    def report(self) -> Dict:
+        """Latency summaries in ms, overall per stage, per pair and per publisher"""
+        per_stage = defaultdict(list)
+        for key, histogram in list(self._samples.items()):
+            per_stage[key[0]].append(histogram)
+        return {
+            'stages': {stage: self._summary(per_stage.get(stage)) for stage in STAGES},
+            'per_pair': self._group(1),
+            'per_publisher': self._group(2)
+        }
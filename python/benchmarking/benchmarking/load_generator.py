@@ -0,0 +1,212 @@
+"""
+Load-generation mode: N concurrent subscribers against a Pragma node.
+
+    python load_generator.py --clients 10,100,500 --duration 60 --pairs-per-client 4
+    python load_generator.py --clients 1000 --processes 4 --output report.json
+
+Each subscriber opens its own WebSocket, subscribes to its own pair set and
+records time-to-first-message, an inter-arrival histogram and disconnects.
+Results of every connection (across worker processes) are merged into one
+report per subscriber count, so fan-out degradation shows up as the count grows.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import websockets
+
+from connection_metrics import Backoff
+from latency_histogram import LatencyHistogram
+from price_collector import DEFAULT_PAIRS, ENVIRONMENTS
+from pyth_fetcher import PYTH_PAIRS
+
+EXTENDED_PAIRS = list(PYTH_PAIRS.values())
+
+class SubscriberStats:
+    """What one subscriber connection observed"""
+
+    def __init__(self, client_id: int, pairs: List[str]):
+        self.client_id = client_id
+        self.pairs = pairs
+        self.connects = 0
+        self.disconnects = 0
+        self.connect_errors = 0
+        # Any other exception, by type; the subscriber keeps reconnecting
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.messages = 0
+        self.time_to_first_message: Optional[float] = None
+        self.last_arrival: Optional[float] = None
+        self.inter_arrival = LatencyHistogram()
+
+    def to_dict(self) -> Dict:
+        return {
+            'client_id': self.client_id,
+            'pairs': self.pairs,
+            'connects': self.connects,
+            'disconnects': self.disconnects,
+            'connect_errors': self.connect_errors,
+            'errors': dict(self.errors),
+            'messages': self.messages,
+            'time_to_first_message_ms': (
+                self.time_to_first_message * 1000 if self.time_to_first_message is not None else None
+            ),
+            'inter_arrival': self.inter_arrival.to_dict()
+        }
+
+
+async def run_subscriber(url: str, stats: SubscriberStats, deadline: float, backoff: Optional[Backoff] = None):
+    """
+    Keep one subscription open until ``deadline``, reconnecting after
+    disconnects and errors with jittered backoff, so a node that drops every
+    client is not hit by all of them again at once
+    """
+    subscription = json.dumps({"msg_type": "subscribe", "pairs": stats.pairs})
+    backoff = backoff or Backoff()
+    while time.monotonic() < deadline:
+        try:
+            connect_start = time.monotonic()
+            stats.last_arrival = None
+            async with websockets.connect(url, open_timeout=10) as websocket:
+                stats.connects += 1
+                await websocket.send(subscription)
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    try:
+                        await asyncio.wait_for(websocket.recv(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        return
+                    received_at = time.monotonic()
+                    if stats.time_to_first_message is None:
+                        stats.time_to_first_message = received_at - connect_start
+                    if stats.last_arrival is None:
+                        backoff.reset()
+                    stats.messages += 1
+                    if stats.last_arrival is not None:
+                        stats.inter_arrival.record_ms((received_at - stats.last_arrival) * 1000)
+                    stats.last_arrival = received_at
+        except websockets.ConnectionClosed:
+            stats.disconnects += 1
+        except (OSError, asyncio.TimeoutError, websockets.InvalidHandshake):
+            stats.connect_errors += 1
+        except Exception as e:
+            stats.errors[type(e).__name__] += 1
+        await asyncio.sleep(max(0.0, min(backoff.next(), deadline - time.monotonic())))
+
+
+def assign_pairs(client_ids: List[int], pair_pool: List[str], pairs_per_client: int, seed: int) -> Dict[int, List[str]]:
+    rng = random.Random(seed)
+    k = min(pairs_per_client, len(pair_pool))
+    return {client_id: rng.sample(pair_pool, k) for client_id in client_ids}
+
+
+async def run_clients(url: str, assignment: Dict[int, List[str]], duration: float, ramp: float) -> List[Dict]:
+    deadline = time.monotonic() + duration
+    stats = [SubscriberStats(client_id, pairs) for client_id, pairs in assignment.items()]
+
+    async def staggered(i, s):
+        if ramp and len(stats) > 1:
+            await asyncio.sleep(ramp * i / len(stats))
+        await run_subscriber(url, s, deadline)
+
+    await asyncio.gather(*(staggered(i, s) for i, s in enumerate(stats)))
+    return [s.to_dict() for s in stats]
+
+
+def _worker(url, assignment, duration, ramp):
+    return asyncio.run(run_clients(url, assignment, duration, ramp))
+
+
+def run_load(url: str, clients: int, pair_pool: List[str], pairs_per_client: int = 4,
+             duration: float = 30.0, ramp: float = 0.0, processes: int = 1, seed: int = 0) -> Dict:
+    """Run ``clients`` subscribers for ``duration`` seconds and return the merged report"""
+    assignment = assign_pairs(list(range(clients)), pair_pool, pairs_per_client, seed)
+    started = time.time()
+
+    if processes <= 1:
+        connections = asyncio.run(run_clients(url, assignment, duration, ramp))
+    else:
+        shards = [{i: assignment[i] for i in range(p, clients, processes)} for p in range(processes)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(_worker, url, shard, duration, ramp) for shard in shards if shard]
+            connections = sorted((c for f in futures for c in f.result()), key=lambda c: c['client_id'])
+
+    return summarize(connections, clients, duration, started)
+
+
+def summarize(connections: List[Dict], clients: int, duration: float, started: float) -> Dict:
+    first_message = LatencyHistogram()
+    for c in connections:
+        if c['time_to_first_message_ms'] is not None:
+            first_message.record_ms(c['time_to_first_message_ms'])
+    inter_arrival = LatencyHistogram()
+    for c in connections:
+        inter_arrival.merge(LatencyHistogram.from_dict(c['inter_arrival']))
+    messages = sum(c['messages'] for c in connections)
+    return {
+        'clients': clients,
+        'duration_s': duration,
+        'started_at': started,
+        'connected': sum(1 for c in connections if c['connects'] > 0),
+        'never_received': clients - first_message.total,
+        'messages': messages,
+        'messages_per_second': messages / duration if duration else None,
+        'disconnects': sum(c['disconnects'] for c in connections),
+        'connect_errors': sum(c['connect_errors'] for c in connections),
+        'errors': sum(sum(c['errors'].values()) for c in connections),
+        'time_to_first_message_ms': first_message.summary(),
+        'inter_arrival_ms': inter_arrival.summary(),
+        'inter_arrival_histogram': inter_arrival.to_dict(),
+        'connections': [{k: v for k, v in c.items() if k != 'inter_arrival'} for c in connections]
+    }
+
+
+def print_report(reports: List[Dict]):
+    print(f"{'clients':>8} {'msg/s':>10} {'ttfm med':>10} {'ttfm p99':>10} "
+          f"{'gap med':>9} {'gap p99':>9} {'disc':>6} {'errors':>6}")
+    for r in reports:
+        ttfm = r['time_to_first_message_ms'] or {}
+        gap = r['inter_arrival_ms'] or {}
+        print(f"{r['clients']:>8} {r['messages_per_second']:>10.1f} "
+              f"{ttfm.get('median', float('nan')):>10.1f} {ttfm.get('p99', float('nan')):>10.1f} "
+              f"{gap.get('median', float('nan')):>9.1f} {gap.get('p99', float('nan')):>9.1f} "
+              f"{r['disconnects']:>6} {r['connect_errors'] + r['errors']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--env', default='local', choices=ENVIRONMENTS.keys())
+    parser.add_argument('--url', help="override the environment's subscribe URL")
+    parser.add_argument('--clients', default='10', help="subscriber count, or a comma separated sweep")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds per subscriber count")
+    parser.add_argument('--pairs-per-client', type=int, default=4)
+    parser.add_argument('--extended-pairs', action='store_true', help="draw pairs from all Pyth pairs, not DEFAULT_PAIRS")
+    parser.add_argument('--ramp', type=float, default=0.0, help="seconds over which connections are opened")
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the JSON report here")
+    args = parser.parse_args()
+
+    url = args.url or ENVIRONMENTS[args.env]
+    pair_pool = EXTENDED_PAIRS if args.extended_pairs else DEFAULT_PAIRS
+    reports = []
+    for clients in (int(c) for c in args.clients.split(',')):
+        print(f"Running {clients} subscribers against {url} for {args.duration:.0f}s...")
+        reports.append(run_load(url, clients, pair_pool, args.pairs_per_client,
+                                args.duration, args.ramp, args.processes, args.seed))
+
+    print_report(reports)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Event-loop lag sampling.
+
+A task asks to wake up every ``interval`` seconds and records how late it
+actually ran. Lag is time a ready callback - such as the Pragma recv - had
+to wait for the loop, so it is the share of measured latency that the client
+itself added.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+from latency_histogram import WindowedLatencyHistogram
+
+
+class LoopLagMonitor:
+    """Samples the running loop's scheduling lag into a windowed histogram (ms)"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.lag = WindowedLatencyHistogram()
+
+    async def run(self, running=lambda: True):
+        while running():
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lag.record_ms(max(0.0, (time.perf_counter() - start - self.interval) * 1000))
+
+    def summaries(self) -> Dict[str, Optional[Dict]]:
+        return self.lag.summaries()
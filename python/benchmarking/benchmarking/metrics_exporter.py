@@ -0,0 +1,180 @@
+"""
+Prometheus / OpenMetrics endpoint for a running PriceCollector.
+
+    PriceCollector('dev', metrics_port=9464)      # then scrape http://127.0.0.1:9464/metrics
+
+The endpoint runs on the collector's own event loop. A scrape reads the
+collector's counters and histograms directly, so its cost depends on the
+number of pairs, publishers and histogram buckets, never on history length.
+Clients sending ``Accept: application/openmetrics-text`` get OpenMetrics;
+everyone else gets the Prometheus text format.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+from aiohttp import web
+
+from latency_histogram import LatencyHistogram
+
+METRIC_PREFIX = 'pragma_bench'
+
+# Histogram bucket bounds in seconds, from 10 µs decode times to minute-long gaps
+DEFAULT_BUCKETS_S = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class MetricsWriter:
+    """Accumulates metric families in the Prometheus text or OpenMetrics format"""
+
+    def __init__(self, openmetrics: bool = False, buckets_s: Iterable[float] = DEFAULT_BUCKETS_S):
+        self.openmetrics = openmetrics
+        self.buckets_s = tuple(buckets_s)
+        self._bounds_us = [int(bound * 1e6) for bound in self.buckets_s]
+        self.lines: List[str] = []
+
+    def _family(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def counter(self, name: str, help_text: str, samples: Iterable[Tuple[Dict, float]]):
+        name = f"{METRIC_PREFIX}_{name}"
+        # OpenMetrics names the family without the _total suffix its samples carry
+        self._family(name if self.openmetrics else f"{name}_total", 'counter', help_text)
+        for labels, value in samples:
+            self.lines.append(f"{name}_total{_labels(labels)} {value}")
+
+    def gauge(self, name: str, help_text: str, samples: Iterable[Tuple[Dict, float]]):
+        name = f"{METRIC_PREFIX}_{name}"
+        self._family(name, 'gauge', help_text)
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {value}")
+
+    def histogram(self, name: str, help_text: str, samples: Iterable[Tuple[Dict, LatencyHistogram]]):
+        """Latency histograms exported in seconds on the fixed ``buckets_s`` bounds"""
+        name = f"{METRIC_PREFIX}_{name}"
+        self._family(name, 'histogram', help_text)
+        for labels, histogram in samples:
+            cumulative = histogram.cumulative_counts(self._bounds_us)
+            for bound, bound_us in zip(self.buckets_s, self._bounds_us):
+                self.lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative[bound_us]}")
+            self.lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.total}")
+            self.lines.append(f"{name}_sum{_labels(labels)} {histogram.sum_us / 1e6}")
+            self.lines.append(f"{name}_count{_labels(labels)} {histogram.total}")
+
+    def render(self) -> str:
+        if self.openmetrics:
+            return '\n'.join(self.lines + ['# EOF']) + '\n'
+        return '\n'.join(self.lines) + '\n'
+
+
+def collect(collector, writer: MetricsWriter) -> MetricsWriter:
+    """Write every collector metric to ``writer``"""
+    writer.counter('messages', "Pragma frames received and Pyth/Stork updates applied",
+                   [({'source': source}, count) for source, count in collector.message_counts.items()])
+    writer.counter('empty_messages', "Pragma frames without oracle_prices",
+                   [({}, collector.empty_message_count)])
+    writer.counter('errors', "Fetch and processing errors",
+                   [({'source': source}, count) for source, count in collector.error_counts.items()])
+    writer.counter('reconnects', "Connections opened after the first",
+                   [({'source': source}, max(0, count - 1)) for source, count in collector.connection_counts.items()])
+
+    writer.histogram('decode_seconds', "Pragma message decode time",
+                     [({}, collector.decode_time)])
+    writer.histogram('inter_arrival_seconds', "Time between consecutive Pragma frames",
+                     [({}, collector.inter_arrival.total)])
+    writer.histogram('event_loop_lag_seconds', "How late the collector's event loop ran scheduled callbacks",
+                     [({}, collector.loop_lag.lag.total)])
+    writer.histogram('latency_seconds', "End-to-end latency by stage",
+                     [({'stage': stage}, histogram)
+                      for stage, histogram in collector.latency.stage_histograms().items()])
+
+    connection = collector.connection
+    writer.histogram('handshake_seconds', "Pragma WebSocket connect-to-open time",
+                     [({}, connection.handshake)])
+    writer.histogram('first_data_seconds', "Time from sending the Pragma subscription to the first frame",
+                     [({}, connection.first_data)])
+    writer.histogram('ping_rtt_seconds', "Pragma WebSocket ping round-trip time, the network baseline",
+                     [({}, connection.ping_rtt.total)])
+    writer.histogram('reconnect_gap_seconds', "Time from a Pragma connection closing to the next one's first frame",
+                     [({}, connection.gap)])
+    writer.counter('connection_closes', "Pragma connections closed or failed, by close code or error",
+                   [({'cause': cause}, count) for cause, count in list(connection.close_codes.items())])
+    writer.counter('ping_timeouts', "Pragma connections closed for an overdue pong",
+                   [({}, connection.ping_timeouts)])
+
+    if collector.profiler.enabled:
+        writer.histogram('stage_seconds', "Client time per profiled hot-path stage",
+                         [({'stage': stage}, histogram) for stage, histogram in list(collector.profiler.histograms.items())])
+
+    tracker = collector.missed_slots
+    per_pair = list(tracker.per_pair.items())
+    per_publisher = list(tracker.per_publisher.items())
+    writer.counter('slots', "Pragma slots per pair",
+                   [({'pair': pair}, counter.total) for pair, counter in per_pair])
+    writer.counter('missed_slots', "Pragma slots in which a pair's median and components did not change",
+                   [({'pair': pair}, counter.missed) for pair, counter in per_pair])
+    writer.counter('publisher_slots', "Pragma slots per publisher, summed over its pairs",
+                   [({'publisher': key}, counter.total) for key, counter in per_publisher])
+    writer.counter('publisher_missed_slots', "Slots in which a publisher's component price did not change",
+                   [({'publisher': key}, counter.missed) for key, counter in per_publisher])
+    if tracker.last_tick is not None:
+        writer.gauge('pair_staleness_seconds', "Time since a pair's median last changed, as of the last message",
+                     [({'pair': pair}, tracker.last_tick - changed) for pair, changed in list(tracker.last_change.items())])
+
+    if collector.pipeline:
+        writer.gauge('decode_queue_frames', "Pragma frames waiting for the decoder",
+                     [({}, collector.pipeline_stats['queued'])])
+
+    writer.gauge('history_rows', "Rows retained in history",
+                 [({'source': source}, collector.history.count(source)) for source in ('pragma', 'pyth', 'stork')])
+
+    stork_client = collector.stork_client
+    if stork_client is not None:
+        writer.counter('stork_polls', "x10 markets polls", [({}, stork_client.poll_count)])
+        writer.counter('stork_not_modified', "x10 markets polls answered 304", [({}, stork_client.not_modified_count)])
+    return writer
+
+
+class MetricsExporter:
+    """Serves ``collect()`` on ``/metrics`` from the collector's event loop"""
+
+    def __init__(self, collector, host: str = '127.0.0.1', port: int = 9464):
+        self.collector = collector
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        openmetrics = 'application/openmetrics-text' in request.headers.get('Accept', '')
+        body = collect(self.collector, MetricsWriter(openmetrics)).render()
+        return web.Response(
+            body=body.encode(),
+            headers={'Content-Type': OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE}
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"Metrics endpoint on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,169 @@
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+DEFAULT_WINDOWS = {'1m': 60, '5m': 300, '1h': 3600}
+
+
+class WindowedCounter:
+    """Missed / total slot counts, cumulative and in a ring of time slots"""
+
+    def __init__(self, slot_seconds: int = 10, horizon_seconds: int = 3600):
+        self.slot_seconds = slot_seconds
+        self.missed = 0
+        self.total = 0
+        n = horizon_seconds // slot_seconds
+        self._slot_ids = [-1] * n
+        self._missed = [0] * n
+        self._total = [0] * n
+
+    def add(self, missed: bool, now: float):
+        slot_id = int(now // self.slot_seconds)
+        i = slot_id % len(self._slot_ids)
+        if self._slot_ids[i] != slot_id:
+            self._slot_ids[i] = slot_id
+            self._missed[i] = 0
+            self._total[i] = 0
+        self._total[i] += 1
+        self.total += 1
+        if missed:
+            self._missed[i] += 1
+            self.missed += 1
+
+    def counts(self, seconds: Optional[float] = None, now: Optional[float] = None):
+        """(missed, total) over the last ``seconds`` up to ``now``, or since start when ``seconds`` is None"""
+        if seconds is None:
+            return self.missed, self.total
+        current = int(now // self.slot_seconds)
+        oldest = current - int(-(-seconds // self.slot_seconds)) + 1
+        missed = total = 0
+        for slot_id, m, t in zip(self._slot_ids, self._missed, self._total):
+            if oldest <= slot_id <= current:
+                missed += m
+                total += t
+        return missed, total
+
+    def ratio(self, seconds: Optional[float] = None, now: Optional[float] = None) -> Dict:
+        missed, total = self.counts(seconds, now)
+        return {
+            'missed': missed,
+            'total': total,
+            'ratio': (missed / total) * 100 if total > 0 else 0
+        }
+
+
+class MissedSlotTracker:
+    """
+    Missed-slot and staleness counters updated as each Pragma tick arrives.
+
+    A slot is one Pragma message. A pair misses a slot when its median and
+    components are identical to the previous message; the global slot is
+    missed when every pair present in both messages is unchanged. The same is
+    tracked per publisher signing key on its component prices, and when a
+    pair's median is stale the publishers whose prices were also unchanged are
+    counted in ``stale_median_publishers``. A tick after a reconnect gap is not
+    compared with the one before it for slot counts, since the messages in
+    between were never received; such gaps are counted in ``gaps``.
+    """
+
+    def __init__(self, slot_seconds: int = 10, horizon_seconds: int = 3600):
+        self._new_counter = lambda: WindowedCounter(slot_seconds, horizon_seconds)
+        self.global_slots = self._new_counter()
+        self.per_pair: Dict[str, WindowedCounter] = defaultdict(self._new_counter)
+        self.per_publisher: Dict[str, WindowedCounter] = defaultdict(self._new_counter)
+        self.stale_median_publishers: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.last_change: Dict[str, float] = {}
+        self.publisher_last_change: Dict[tuple, float] = {}
+        self.last_tick: Optional[float] = None
+        self.gaps = 0
+        self._previous: Dict = {}
+
+    def on_tick(self, prices: Dict, now: float, after_gap: bool = False):
+        """
+        Fold one decoded Pragma message into the counters, O(pairs x publishers).
+        With ``after_gap`` only change times are updated, no slot is counted.
+        """
+        previous = self._previous
+        any_changed = False
+        counting = not after_gap
+        if after_gap:
+            self.gaps += 1
+
+        for pair, data in prices.items():
+            prev = previous.get(pair)
+            if prev is None:
+                self.last_change[pair] = now
+                for key in data['component']:
+                    self.publisher_last_change[(pair, key)] = now
+                continue
+
+            components = data['component']
+            prev_components = prev['component']
+            unchanged_publishers = []
+            for key, price in components.items():
+                unchanged = prev_components.get(key) == price
+                if counting:
+                    self.per_publisher[key].add(unchanged, now)
+                if unchanged:
+                    unchanged_publishers.append(key)
+                else:
+                    self.publisher_last_change[(pair, key)] = now
+
+            unchanged = data['price'] == prev['price'] and components == prev_components
+            if counting:
+                self.per_pair[pair].add(unchanged, now)
+            if not unchanged:
+                any_changed = True
+                self.last_change[pair] = now
+            elif counting:
+                for key in unchanged_publishers:
+                    self.stale_median_publishers[pair][key] += 1
+
+        if previous and counting:
+            self.global_slots.add(not any_changed, now)
+        self._previous = prices
+        self.last_tick = now
+
+    def report(self, now: Optional[float] = None, windows: Dict[str, float] = DEFAULT_WINDOWS) -> Optional[Dict]:
+        """
+        Cumulative and windowed missed-slot ratios, per pair and per publisher,
+        plus staleness, as of ``now`` (wall-clock seconds, the current time by
+        default) so both keep moving while the feed is silent
+        """
+        if self.global_slots.total == 0:
+            return None
+        if now is None:
+            now = time.time()
+
+        def staleness(last_change):
+            return now - last_change
+
+        return {
+            'per_pair': {
+                pair: {**counter.ratio(), 'staleness_s': staleness(self.last_change[pair])}
+                for pair, counter in list(self.per_pair.items())
+            },
+            'global': self.global_slots.ratio(),
+            'gaps': self.gaps,
+            'per_publisher': {
+                key: {
+                    **counter.ratio(),
+                    'staleness_s': {
+                        pair: staleness(changed)
+                        for (pair, k), changed in list(self.publisher_last_change.items()) if k == key
+                    }
+                }
+                for key, counter in list(self.per_publisher.items())
+            },
+            'stale_median_publishers': {
+                pair: dict(counts) for pair, counts in list(self.stale_median_publishers.items())
+            },
+            'windows': {
+                name: {
+                    'global': self.global_slots.ratio(seconds, now),
+                    'per_pair': {pair: c.ratio(seconds, now) for pair, c in list(self.per_pair.items())},
+                    'per_publisher': {key: c.ratio(seconds, now) for key, c in list(self.per_publisher.items())}
+                }
+                for name, seconds in windows.items()
+            }
+        }
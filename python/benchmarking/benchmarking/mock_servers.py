@@ -0,0 +1,284 @@
+"""
+Local stand-ins for the Pragma node, Pyth Hermes and the x10 markets API.
+
+    python mock_servers.py --rate 2 --pairs 4 --publishers 4 --jitter 0.1 --drop-rate 0.01
+
+Serves, on localhost:
+  - ws://HOST:3000/node/v1/data/subscribe   Pragma ``subscribe`` with oracle_prices / signed_prices
+  - http://HOST:3001/v2/updates/price/stream Hermes-style SSE price updates
+  - http://HOST:3002/api/v1/info/markets     x10 markets (honours If-None-Match)
+
+All feeds read one seeded random walk, so runs with the same seed and rates
+are reproducible. Point a collector at them with ``PriceCollector(**mock_endpoints())``.
+"""
+import argparse
+import asyncio
+import dataclasses
+import hashlib
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+import websockets
+from aiohttp import web
+from x10.perpetual.configuration import MAINNET_CONFIG
+
+from pyth_fetcher import PYTH_PAIRS
+from pair_registry import canonical_pair
+from stork_fetcher import MARKET_PAIRS
+from synthetic_data import PriceWalk, make_oracle_prices_message, publisher_keys, synthetic_pairs
+
+PRAGMA_PATH = '/node/v1/data/subscribe'
+PYTH_PATH = '/v2/updates/price/stream'
+X10_PATH = '/api/v1/info/markets'
+
+DEFAULT_PORTS = {'pragma': 3000, 'pyth': 3001, 'x10': 3002}
+
+
+class MockFeedConfig:
+    """Rates are messages per second per connection; jitter is a fraction of the interval"""
+
+    def __init__(self, rate: float = 2.0, pairs: int = 4, publishers: int = 4, jitter: float = 0.0,
+                 drop_rate: float = 0.0, pyth_rate: float = 2.0, stork_rate: float = 1.0, seed: int = 0):
+        self.rate = rate
+        self.pairs = pairs
+        self.publishers = publishers
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.pyth_rate = pyth_rate
+        self.stork_rate = stork_rate
+        self.seed = seed
+
+
+class MarketSimulator:
+    """One seeded random walk shared by all mock feeds, stepped at the Pragma rate"""
+
+    def __init__(self, config: MockFeedConfig):
+        self.config = config
+        pairs = synthetic_pairs(config.pairs)
+        pairs += [p for p in PYTH_PAIRS.values() if p not in pairs]
+        self.walk = PriceWalk(pairs, seed=config.seed)
+        self.publishers = publisher_keys(config.publishers)
+        self.version = 0
+
+    def prices(self, pairs: List[str]) -> Dict[str, float]:
+        for pair in pairs:
+            if pair not in self.walk.prices:
+                self.walk.prices[pair] = 10.0 + len(self.walk.prices)
+        return {pair: self.walk.prices[pair] for pair in pairs}
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(1 / self.config.rate)
+            self.walk.step()
+            self.version += 1
+
+
+def _interval(rate: float, jitter: float, rng: random.Random) -> float:
+    return max(0.0, (1 / rate) * (1 + rng.uniform(-jitter, jitter)))
+
+
+class MockPragmaServer:
+    def __init__(self, simulator: MarketSimulator):
+        self.simulator = simulator
+        self.config = simulator.config
+        self.connections = 0
+        self.messages_sent = 0
+        self.messages_dropped = 0
+
+    async def handler(self, websocket):
+        if websocket.path != PRAGMA_PATH:
+            await websocket.close(code=1008, reason="unknown path")
+            return
+        self.connections += 1
+        rng = random.Random(self.config.seed + self.connections)
+        try:
+            subscription = json.loads(await websocket.recv())
+            pairs = subscription.get('pairs') or synthetic_pairs(self.config.pairs)
+            while True:
+                await asyncio.sleep(_interval(self.config.rate, self.config.jitter, rng))
+                if rng.random() < self.config.drop_rate:
+                    self.messages_dropped += 1
+                    continue
+                message = make_oracle_prices_message(self.simulator.prices(pairs), self.simulator.publishers, rng)
+                await websocket.send(json.dumps(message))
+                self.messages_sent += 1
+        except websockets.ConnectionClosed:
+            pass
+
+    async def start(self, host: str, port: int):
+        return await websockets.serve(self.handler, host, port)
+
+
+class MockPythServer:
+    def __init__(self, simulator: MarketSimulator):
+        self.simulator = simulator
+        self.config = simulator.config
+
+    def _event(self, ids: List[str], rng: random.Random) -> bytes:
+        now = int(time.time())
+        prices = self.simulator.prices([PYTH_PAIRS[i] for i in ids])
+        parsed = []
+        for hash_id in ids:
+            price = prices[PYTH_PAIRS[hash_id]] * (1 + rng.gauss(0, 0.0001))
+            quote = {"price": str(int(price * 1e8)), "conf": str(int(price * 1e4)), "expo": -8, "publish_time": now}
+            parsed.append({"id": hash_id, "price": quote, "ema_price": quote,
+                           "metadata": {"slot": self.simulator.version, "proof_available_time": now,
+                                        "prev_publish_time": now - 1}})
+        payload = {"binary": {"encoding": "hex", "data": []}, "parsed": parsed}
+        return b'data:' + json.dumps(payload).encode() + b'\n\n'
+
+    async def handler(self, request: web.Request) -> web.StreamResponse:
+        ids = [i for i in request.query.getall('ids[]', []) if i in PYTH_PAIRS]
+        rng = random.Random(self.config.seed)
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        try:
+            while True:
+                await response.write(self._event(ids, rng))
+                await asyncio.sleep(_interval(self.config.pyth_rate, self.config.jitter, rng))
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        return response
+
+
+class MockX10Server:
+    def __init__(self, simulator: MarketSimulator):
+        self.simulator = simulator
+        self.config = simulator.config
+        self._snapshot: Dict[str, float] = {}
+        self._etag: Optional[str] = None
+
+    async def run(self):
+        rng = random.Random(self.config.seed)
+        while True:
+            self._snapshot = self.simulator.prices([canonical_pair(m) for m in MARKET_PAIRS])
+            digest = hashlib.sha1(json.dumps(self._snapshot, sort_keys=True).encode()).hexdigest()
+            self._etag = f'"{digest}"'
+            await asyncio.sleep(_interval(self.config.stork_rate, self.config.jitter, rng))
+
+    @staticmethod
+    def _market(name: str, price: float) -> Dict:
+        price = f"{price:.8f}"
+        return {
+            "name": name, "assetName": name.split('-')[0], "assetPrecision": 4,
+            "collateralAssetName": "USD", "collateralAssetPrecision": 6, "active": True,
+            "marketStats": {
+                "dailyVolume": "0", "dailyVolumeBase": "0", "dailyPriceChange": "0",
+                "dailyLow": price, "dailyHigh": price, "lastPrice": price, "askPrice": price,
+                "bidPrice": price, "markPrice": price, "indexPrice": price, "fundingRate": "0",
+                "nextFundingRate": 0, "openInterest": "0", "openInterestBase": "0"
+            },
+            "tradingConfig": {
+                "minOrderSize": "0.0001", "minOrderSizeChange": "0.0001", "minPriceChange": "0.01",
+                "maxMarketOrderValue": "1000000", "maxLimitOrderValue": "1000000",
+                "maxPositionValue": "1000000", "maxLeverage": "50", "maxNumOrders": 200,
+                "limitPriceCap": "0.05", "limitPriceFloor": "0.05",
+                "riskFactorConfig": [{"upperBound": "1000000", "riskFactor": "0.02"}]
+            },
+            "l2Config": {
+                "type": "STARKX", "collateralId": "0x1", "collateralResolution": 1000000,
+                "syntheticId": "0x2", "syntheticResolution": 10000
+            }
+        }
+
+    async def handler(self, request: web.Request) -> web.Response:
+        if self._etag and request.headers.get('If-None-Match') == self._etag:
+            return web.Response(status=304, headers={'ETag': self._etag})
+        requested = request.query.getall('market', MARKET_PAIRS)
+        data = [
+            self._market(name, self._snapshot[canonical_pair(name)])
+            for name in requested if canonical_pair(name) in self._snapshot
+        ]
+        return web.json_response({"status": "OK", "data": data}, headers={'ETag': self._etag or ''})
+
+
+def mock_endpoints(host: str = '127.0.0.1', ports: Dict[str, int] = DEFAULT_PORTS) -> Dict:
+    """Keyword arguments pointing a ``PriceCollector`` at the mock servers"""
+    return {
+        'websocket_url': f"ws://{host}:{ports['pragma']}{PRAGMA_PATH}",
+        'pyth_url': f"http://{host}:{ports['pyth']}{PYTH_PATH}",
+        'stork_config': dataclasses.replace(MAINNET_CONFIG, api_base_url=f"http://{host}:{ports['x10']}/api/v1")
+    }
+
+
+class MockServers:
+    """Starts and stops all three mock feeds in the running event loop"""
+
+    def __init__(self, config: MockFeedConfig, host: str = '127.0.0.1', ports: Dict[str, int] = DEFAULT_PORTS):
+        self.config = config
+        self.host = host
+        self.ports = ports
+        self.simulator = MarketSimulator(config)
+        self.pragma = MockPragmaServer(self.simulator)
+        self.pyth = MockPythServer(self.simulator)
+        self.x10 = MockX10Server(self.simulator)
+        self._tasks = []
+        self._ws_server = None
+        self._runners = []
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self.simulator.run()), asyncio.create_task(self.x10.run())]
+        self._ws_server = await self.pragma.start(self.host, self.ports['pragma'])
+        for port, path, handler in (
+            (self.ports['pyth'], PYTH_PATH, self.pyth.handler),
+            (self.ports['x10'], X10_PATH, self.x10.handler)
+        ):
+            app = web.Application()
+            app.router.add_get(path, handler)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            await web.TCPSite(runner, self.host, port).start()
+            self._runners.append(runner)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._ws_server.close()
+        await self._ws_server.wait_closed()
+        for runner in self._runners:
+            await runner.cleanup()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--pragma-port', type=int, default=DEFAULT_PORTS['pragma'])
+    parser.add_argument('--pyth-port', type=int, default=DEFAULT_PORTS['pyth'])
+    parser.add_argument('--x10-port', type=int, default=DEFAULT_PORTS['x10'])
+    parser.add_argument('--rate', type=float, default=2.0, help="Pragma messages per second per connection")
+    parser.add_argument('--pyth-rate', type=float, default=2.0)
+    parser.add_argument('--stork-rate', type=float, default=1.0, help="x10 index price updates per second")
+    parser.add_argument('--pairs', type=int, default=4, help="pairs sent when a subscription names none")
+    parser.add_argument('--publishers', type=int, default=4)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockFeedConfig(args.rate, args.pairs, args.publishers, args.jitter, args.drop_rate,
+                            args.pyth_rate, args.stork_rate, args.seed)
+    ports = {'pragma': args.pragma_port, 'pyth': args.pyth_port, 'x10': args.x10_port}
+
+    async def serve():
+        async with MockServers(config, args.host, ports):
+            print(f"Mock feeds listening on {args.host}: pragma {ports['pragma']}, "
+                  f"pyth {ports['pyth']}, x10 {ports['x10']}")
+            await asyncio.Future()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Several Pragma node environments collected side by side in one process.
+
+    python multi_env.py --envs local,dev --duration 600 --output compare.json
+    python multi_env.py --envs old,new --url old=ws://host-a:3000/... --url new=ws://host-b:3000/...
+    python multi_env.py --envs a,b --mock --duration 60     # both against mock_servers.py
+
+Each environment has its own ``PriceCollector`` for the node leg (decoder,
+latency, missed slots, history and streaming metrics), but none of them runs
+its own Pyth or Stork fetcher. One shared stream and poller hands every
+reference update to all of them, stamped once. Every collector stamps its
+frames with the same ``LatencyClock``. Environments are therefore compared on
+identical reference samples and one time base, which separate processes
+cannot give. ``compare()`` reports each environment and its deltas against
+the baseline (the first environment).
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from latency_tracker import STAGES, LatencyClock
+from loop_lag import LoopLagMonitor
+from mock_servers import mock_endpoints
+from price_collector import DEFAULT_PAIRS, ENVIRONMENTS, PriceCollector
+from pyth_fetcher import PYTH_URL_BASE, stream_pyth_prices
+from stork_fetcher import StorkClient
+from x10.perpetual.configuration import MAINNET_CONFIG
+
+# Seconds stop() waits for the fetchers to exit before cancelling them
+STOP_TIMEOUT = 10
+
+
+def _delta(value, baseline):
+    """``value - baseline`` over the numeric leaves both share"""
+    if isinstance(value, dict) and isinstance(baseline, dict):
+        deltas = {key: _delta(value[key], baseline[key]) for key in value if key in baseline}
+        return {key: delta for key, delta in deltas.items() if delta is not None}
+    numeric = (int, float)
+    if isinstance(value, numeric) and isinstance(baseline, numeric) and not isinstance(value, bool):
+        return value - baseline
+    return None
+
+
+def price_divergence(history, baseline_history, pair: str) -> Optional[Dict[str, float]]:
+    """
+    Median price of ``pair`` in one environment minus the baseline's, each
+    row matched to the baseline's last row at or before it on the shared clock
+    """
+    timestamps = history.timestamps('pragma')
+    baseline_timestamps = baseline_history.timestamps('pragma')
+    if not len(timestamps) or not len(baseline_timestamps):
+        return None
+    previous = np.searchsorted(baseline_timestamps, timestamps, side='right') - 1
+    matched = previous >= 0
+    prices = history.prices('pragma', pair)[matched]
+    baseline_prices = baseline_history.prices('pragma', pair)[previous[matched]]
+    delta = prices - baseline_prices
+    delta = delta[~np.isnan(delta)]
+    if not len(delta):
+        return None
+    return {
+        'count': len(delta),
+        'mean_delta': float(delta.mean()),
+        'mean_abs_delta': float(np.abs(delta).mean()),
+        'max_abs_delta': float(np.abs(delta).max())
+    }
+
+
+class MultiEnvCollector:
+    """One ``PriceCollector`` per node environment sharing a clock and one Pyth / Stork feed"""
+
+    def __init__(self, envs: Iterable[str] = ('local', 'dev'), urls: Optional[Dict[str, str]] = None,
+                 pyth_url=PYTH_URL_BASE, stork_config=MAINNET_CONFIG, **collector_options):
+        urls = urls or {}
+        self.running = False
+        self.collector_thread = None
+        self.pyth_url = pyth_url
+        self.stork_config = stork_config
+        self.clock = LatencyClock()
+        self.loop_lag = LoopLagMonitor()
+        self.stork_client = None
+        self.collectors: Dict[str, PriceCollector] = {}
+        for env in envs:
+            if env not in urls and env not in ENVIRONMENTS:
+                raise ValueError(f"No URL for environment {env!r}; pass urls={{{env!r}: ...}}")
+            collector = PriceCollector(env if env in ENVIRONMENTS else 'local', websocket_url=urls.get(env),
+                                       pyth_url=pyth_url, stork_config=stork_config, clock=self.clock,
+                                       **collector_options)
+            collector.loop_lag = self.loop_lag
+            self.collectors[env] = collector
+        if not self.collectors:
+            raise ValueError("At least one environment is required")
+        self.baseline = next(iter(self.collectors))
+
+    def set_pairs(self, pairs: List[str]):
+        for collector in self.collectors.values():
+            collector.subscription_message = {"msg_type": "subscribe", "pairs": pairs}
+
+    async def _on_pyth_prices(self, prices, received_at, pair_ids=None):
+        for collector in self.collectors.values():
+            await collector._on_pyth_prices(prices, received_at, pair_ids)
+
+    def _on_pyth_event(self, event):
+        for collector in self.collectors.values():
+            collector._on_pyth_event(event)
+
+    async def fetch_pyth_prices(self):
+        await stream_pyth_prices(self._on_pyth_prices, lambda: self.running, base_url=self.pyth_url,
+                                 on_event=self._on_pyth_event, clock=self.clock)
+
+    async def fetch_stork_prices(self):
+        self.stork_client = StorkClient(self.stork_config)
+        for collector in self.collectors.values():
+            collector.stork_client = self.stork_client
+        try:
+            while self.running:
+                try:
+                    prices = await self.stork_client.poll()
+                    if prices:
+                        received_at = self.clock.wall_time()
+                        for collector in self.collectors.values():
+                            await collector._on_stork_prices(prices, received_at, self.stork_client.changed_ids)
+                except Exception as e:
+                    for collector in self.collectors.values():
+                        collector.error_counts['stork'] += 1
+                    print(f"Error fetching Stork prices: {e}")
+                await asyncio.sleep(1)
+        finally:
+            await self.stork_client.close()
+
+    async def run_all_fetchers(self):
+        """Every node leg plus the shared reference feeds, in the running event loop"""
+        await asyncio.gather(
+            *(collector.fetch_pragma_prices() for collector in self.collectors.values()),
+            self.fetch_pyth_prices(),
+            self.fetch_stork_prices(),
+            self.loop_lag.run(lambda: self.running)
+        )
+
+    def _set_running(self, running: bool):
+        self.running = running
+        for collector in self.collectors.values():
+            collector.running = running
+
+    async def _run_until_stopped(self):
+        fetchers = asyncio.ensure_future(self.run_all_fetchers())
+        while self.running and not fetchers.done():
+            await asyncio.sleep(0.5)
+        try:
+            # Fetchers exit at their next message or poll; don't wait on a silent node
+            await asyncio.wait_for(fetchers, timeout=STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            print("Cancelled fetchers that did not stop in time")
+
+    def run_async_loop(self):
+        asyncio.run(self._run_until_stopped())
+
+    def start(self):
+        """Start collecting every environment in a separate thread"""
+        if not self.running:
+            self._set_running(True)
+            self.collector_thread = threading.Thread(target=self.run_async_loop)
+            self.collector_thread.daemon = True
+            self.collector_thread.start()
+
+    def stop(self):
+        if self.running:
+            self._set_running(False)
+            if self.collector_thread:
+                self.collector_thread.join(STOP_TIMEOUT + 5)
+            for collector in self.collectors.values():
+                if collector.capture:
+                    collector.capture.close()
+            print("Multi-environment collector stopped")
+
+    def summarize(self, env: str) -> Dict:
+        """Latency, missed slots and deviation from the references for one environment"""
+        collector = self.collectors[env]
+        missed_slots = collector.calculate_missed_slots()
+        pairs = collector.get_history().pairs('pragma')
+        return {
+            'url': collector.websocket_url,
+            'messages': collector.message_counts['pragma'],
+            'empty_messages': collector.get_empty_message(),
+            'errors': collector.error_counts['pragma'],
+            'inter_arrival_ms': collector.get_latency_metrics(),
+            'latency_ms': {stage: collector.get_e2e_latency()['stages'].get(stage) for stage in STAGES},
+            'connection': collector.get_connection_stats(),
+            'missed_slots': {
+                'global': missed_slots['global'],
+                'gaps': missed_slots['gaps'],
+                'per_pair': {pair: ratio['ratio'] for pair, ratio in missed_slots['per_pair'].items()}
+            } if missed_slots else None,
+            'deviation': {pair: collector.get_metrics(pair) for pair in pairs}
+        }
+
+    def compare(self) -> Dict:
+        """
+        Each environment's summary, and for the others their difference from
+        the baseline's (environment minus baseline) plus how far their Pragma
+        medians diverged from the baseline's on the shared clock
+        """
+        summaries = {env: self.summarize(env) for env in self.collectors}
+        baseline = summaries[self.baseline]
+        baseline_history = self.collectors[self.baseline].get_history()
+        deltas = {}
+        for env, summary in summaries.items():
+            if env == self.baseline:
+                continue
+            history = self.collectors[env].get_history()
+            deltas[env] = {
+                **_delta(summary, baseline),
+                'price_divergence': {
+                    pair: price_divergence(history, baseline_history, pair)
+                    for pair in history.pairs('pragma')
+                }
+            }
+        return {
+            'baseline': self.baseline,
+            'event_loop_lag_ms': self.loop_lag.summaries()['all'],
+            'environments': summaries,
+            'deltas': deltas
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--envs', default='local,dev', help="comma-separated environments, the first is the baseline")
+    parser.add_argument('--url', action='append', default=[], metavar='ENV=URL',
+                        help="Pragma subscribe URL of an environment (repeatable; required for names "
+                             f"other than {', '.join(ENVIRONMENTS)})")
+    parser.add_argument('--mock', action='store_true', help="point every environment and feed at mock_servers.py")
+    parser.add_argument('--duration', type=float, default=600, help="seconds")
+    parser.add_argument('--pairs', default=','.join(DEFAULT_PAIRS), help="comma-separated Pragma pairs")
+    parser.add_argument('--pipeline', action='store_true', help="decode Pragma frames off the recv loop")
+    parser.add_argument('--progress-interval', type=float, default=60, help="seconds, 0 to disable")
+    parser.add_argument('--output', help="write the JSON comparison here")
+    args = parser.parse_args()
+
+    envs = [env.strip() for env in args.envs.split(',') if env.strip()]
+    urls = dict(url.split('=', 1) for url in args.url)
+    options = {}
+    if args.mock:
+        endpoints = mock_endpoints()
+        urls = {env: urls.get(env, endpoints['websocket_url']) for env in envs}
+        options = {'pyth_url': endpoints['pyth_url'], 'stork_config': endpoints['stork_config']}
+    collector = MultiEnvCollector(envs, urls, pipeline=args.pipeline, **options)
+    collector.set_pairs([pair.strip() for pair in args.pairs.split(',') if pair.strip()])
+
+    collector.start()
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < args.duration:
+            remaining = args.duration - (time.monotonic() - started)
+            time.sleep(max(0.0, min(args.progress_interval or remaining, remaining)))
+            if args.progress_interval and time.monotonic() - started < args.duration:
+                counts = {env: c.message_counts['pragma'] for env, c in collector.collectors.items()}
+                print(f"[{time.monotonic() - started:,.0f}s] pragma messages: {counts}")
+    except KeyboardInterrupt:
+        pass
+    collector.stop()
+
+    comparison = {'duration_s': time.monotonic() - started, **collector.compare()}
+    print(json.dumps(comparison, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(comparison, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
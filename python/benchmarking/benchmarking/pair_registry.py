@@ -0,0 +1,96 @@
+"""
+Canonical pair names and small integer ids shared by every source.
+
+Pragma decodes pairs as ``BTC/USD``, Pyth identifies feeds by hex id (named
+``BTCUSD`` in ``PAIR_SIGNATURES``) and x10 names markets ``BTC-USD``. Each
+source resolves its identifiers here once; prices are then keyed by the
+canonical ``BASE/QUOTE`` name everywhere and stored in columns numbered by
+the pair id, so the same column is the same pair in every source's series.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+QUOTE_ASSETS = ('USDT', 'USDC', 'USD', 'EUR', 'BTC', 'ETH', 'STRK')
+
+
+def canonical_pair(symbol: str) -> Optional[str]:
+    """``BTC/USD``, ``BTC-USD`` and ``BTCUSD`` all become ``BTC/USD``; None if no quote asset is found"""
+    symbol = symbol.strip().upper()
+    for separator in ('/', '-', '_'):
+        if separator in symbol:
+            base, _, quote = symbol.partition(separator)
+            return f"{base}/{quote}" if base and quote else None
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return f"{symbol[:-len(quote)]}/{quote}"
+    return None
+
+
+class PairRegistry:
+    """Interns canonical pair names to dense integer ids and remembers each source's aliases"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.unresolved: Dict[str, Set[str]] = defaultdict(set)
+        self._aliases: Dict[Tuple[str, str], Optional[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        pair_id = self.ids.get(name)
+        if pair_id is None:
+            pair_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return pair_id
+
+    def resolve(self, source: str, identifier: str, symbol: Optional[str] = None) -> Optional[int]:
+        """
+        Id of a source's pair identifier, cached per (source, identifier).
+        ``symbol`` is the readable name when the identifier is opaque (Pyth ids).
+        """
+        key = (source, identifier)
+        if key in self._aliases:
+            return self._aliases[key]
+        name = canonical_pair(symbol or identifier)
+        if name is None:
+            self.unresolved[source].add(identifier)
+            pair_id = None
+        else:
+            pair_id = self.intern(name)
+        self._aliases[key] = pair_id
+        return pair_id
+
+    def canonical(self, source: str, identifier: str, symbol: Optional[str] = None) -> Optional[str]:
+        pair_id = self.resolve(source, identifier, symbol)
+        return None if pair_id is None else self.names[pair_id]
+
+    def aliases(self, source: str) -> Dict[str, str]:
+        """Every identifier resolved for ``source`` and its canonical name"""
+        return {
+            identifier: self.names[pair_id]
+            for (alias_source, identifier), pair_id in self._aliases.items()
+            if alias_source == source and pair_id is not None
+        }
+
+    def report(self, seen: Dict[str, Iterable[str]], primary: str = 'pragma') -> Dict:
+        """
+        Pairs of ``primary`` that some other source never delivered, with the
+        sources missing, and identifiers that could not be canonicalized
+        """
+        seen = {source: set(pairs) for source, pairs in seen.items()}
+        references = [source for source in seen if source != primary]
+        missing = {}
+        for pair in sorted(seen.get(primary, ())):
+            absent = [source for source in references if pair not in seen[source]]
+            if absent:
+                missing[pair] = absent
+        return {
+            'missing': missing,
+            'unresolved': {source: sorted(ids) for source, ids in self.unresolved.items() if ids}
+        }
+
+
+# Shared by the fetchers, the decoder and the history store
+PAIRS = PairRegistry()
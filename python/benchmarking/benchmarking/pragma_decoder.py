@@ -0,0 +1,124 @@
+import json
+import logging
+from typing import Dict, List, Optional, Tuple, Union
+
+from pair_registry import PAIRS
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:  # orjson is an optional speedup
+    json_loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+PRICE_DECIMALS = 8
+PRICE_SCALE = 10 ** PRICE_DECIMALS
+
+
+def parse_felt(value: str) -> int:
+    return int(value, 16) if value.startswith('0x') else int(value)
+
+
+class PragmaDecoder:
+    """
+    Decodes Pragma ``subscribe`` messages into the collector's price dicts.
+
+    Pair felts are resolved to pair ids once and cached, prices are parsed as
+    fixed-point integers, and nothing is logged unless this module's logger
+    is at DEBUG. The ids of the last decoded message's pairs, in the order of
+    the returned dict, are kept in ``pair_ids`` for ``HistoryStore.append``.
+    With ``collect_timestamps`` the node and publisher timestamps of the last
+    decoded message are kept in ``message_timestamp`` and
+    ``publisher_timestamps`` as ``(pair, signing_key, timestamp)`` tuples.
+    """
+
+    def __init__(self, loads=json_loads, collect_timestamps: bool = False):
+        self.loads = loads
+        self.collect_timestamps = collect_timestamps
+        self.message_timestamp = None
+        self.publisher_timestamps: List[Tuple[str, str, object]] = []
+        self.pair_ids: List[int] = []
+        self._pair_ids: Dict[str, Optional[int]] = {}
+
+    def resolve_pair(self, global_asset_id: str) -> Optional[int]:
+        pair_id = self._pair_ids.get(global_asset_id)
+        if pair_id is None and global_asset_id not in self._pair_ids:
+            try:
+                felt = parse_felt(global_asset_id)
+                symbol = felt.to_bytes((felt.bit_length() + 7) // 8, byteorder='big').decode('ascii')
+                pair_id = PAIRS.resolve('pragma', global_asset_id, symbol)
+            except (ValueError, UnicodeDecodeError):
+                pair_id = None
+            self._pair_ids[global_asset_id] = pair_id
+        return pair_id
+
+    def decode_pair(self, global_asset_id: str) -> Optional[str]:
+        pair_id = self.resolve_pair(global_asset_id)
+        return None if pair_id is None else PAIRS.names[pair_id]
+
+    @staticmethod
+    def parse_price(price: str) -> Optional[float]:
+        try:
+            return parse_felt(price) / PRICE_SCALE
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+    def decode(self, message: Union[str, bytes], previous: Dict) -> Optional[Dict]:
+        """
+        Return ``{pair: {"price", "component"}}`` for a message, or None when it
+        carries no ``oracle_prices``. Pairs with an unparseable median keep
+        their previous price.
+        """
+        parsed_data = self.loads(message)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Raw message: %s", parsed_data)
+
+        oracle_prices = parsed_data.get('oracle_prices')
+        if oracle_prices is None:
+            return None
+
+        collect_timestamps = self.collect_timestamps
+        if collect_timestamps:
+            self.message_timestamp = parsed_data.get('timestamp')
+            publisher_timestamps = self.publisher_timestamps = []
+
+        parse_price = self.parse_price
+        resolve_pair = self.resolve_pair
+        names = PAIRS.names
+        prices = {}
+        pair_ids = self.pair_ids = []
+        for price_data in oracle_prices:
+            pair_id = resolve_pair(price_data['global_asset_id'])
+            if pair_id is None:
+                continue
+            pair = names[pair_id]
+
+            price_value = parse_price(price_data['median_price'])
+            if price_value is None:
+                if pair in previous:
+                    prices[pair] = previous[pair]
+                    if len(prices) > len(pair_ids):
+                        pair_ids.append(pair_id)
+                continue
+
+            component_prices = {}
+            for cmp in price_data.get('signed_prices', ()):
+                comp_price = parse_price(cmp['oracle_price'])
+                if comp_price is not None:
+                    component_prices[cmp['signing_key']] = comp_price
+                if collect_timestamps:
+                    publisher_timestamps.append((pair, cmp['signing_key'], cmp.get('timestamp')))
+
+            if debug:
+                logger.debug("%s median=%s components=%s", pair, price_value, component_prices)
+            prices[pair] = {
+                "price": price_value,
+                "component": component_prices
+            }
+            # A pair repeated within a message keeps its first position
+            if len(prices) > len(pair_ids):
+                pair_ids.append(pair_id)
+
+        return prices
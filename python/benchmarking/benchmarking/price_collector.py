@@ -3,10 +3,22 @@ import asyncio
 import websockets
 import time
 import threading
-from queue import Queue
-from pyth_fetcher import retrieve_pyth_prices
-from stork_fetcher import retrieve_stork_prices
-import numpy as np
+from pyth_fetcher import PYTH_URL_BASE, parse_price_update, stream_pyth_prices
+from stork_fetcher import StorkClient
+from x10.perpetual.configuration import MAINNET_CONFIG
+from history_store import HistoryStore, REFERENCE_SOURCES, SOURCES
+from pair_registry import PAIRS
+from pragma_decoder import PragmaDecoder
+from latency_tracker import LatencyTracker
+from latency_histogram import LatencyHistogram, WindowedLatencyHistogram
+from capture_log import CaptureWriter
+from connection_metrics import Backoff, ConnectionMetrics
+from metrics_exporter import MetricsExporter
+from streaming_metrics import StreamingMetrics
+from missed_slots import MissedSlotTracker
+from loop_lag import LoopLagMonitor
+from profiling import Profiler
+from snapshot_bus import DROP_OLDEST, SnapshotBus
 
 # Environment configurations
 ENVIRONMENTS = {
@@ -18,22 +30,57 @@ ENVIRONMENTS = {
 DEFAULT_PAIRS = ['BTC/USD', 'ETH/USD', 'SOL/USD', 'BNB/USD']
 
 class PriceCollector:
-    def __init__(self, env='local'):
+    def __init__(self, env='local', history_size=50_000, history_max_age=None, correlation_window=1000,
+                 pyth_url=PYTH_URL_BASE, stork_config=MAINNET_CONFIG, websocket_url=None,
+                 capture_dir=None, capture_compress=False, match_tolerance=None, metrics_port=None,
+                 metrics_host='127.0.0.1', pipeline=False, decode_batch=8, pipeline_depth=10_000,
+                 profile=None, clock=None, ping_interval=5.0, ping_timeout=20.0, reconnect_backoff=None):
         self.running = False
-        self.price_history = []
-        self.update_history = []
+        self.pyth_url = pyth_url
+        self.stork_config = stork_config
+        self.history = HistoryStore(capacity=history_size, max_age=history_max_age, match_tolerance=match_tolerance)
+        self.metrics = StreamingMetrics(correlation_window=correlation_window)
+        self.inter_arrival = WindowedLatencyHistogram()
+        self.last_message_ns = None
         self.empty_message_count = 0
-        self.lock = asyncio.Lock()
-        self.update_queue = Queue()
-        self.websocket_url = ENVIRONMENTS[env]
+        # Pragma frames received and Pyth / Stork updates applied
+        self.message_counts = {'pragma': 0, 'pyth': 0, 'stork': 0}
+        self.error_counts = {'pragma': 0, 'pyth': 0, 'stork': 0}
+        self.connection_counts = {'pragma': 0, 'pyth': 0}
+        self.decode_time = LatencyHistogram()
+        # Serve OpenMetrics on this port from the collector loop when set
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        self.missed_slots = MissedSlotTracker()
+        # Pragma WebSocket handshake / first-data / ping RTT / close codes / reconnect gaps
+        self.connection = ConnectionMetrics()
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.reconnect_backoff = reconnect_backoff or Backoff()
+        # Pipelined mode: the recv loop only stamps and queues frames, a separate task decodes them
+        self.pipeline = pipeline
+        self.decode_batch = decode_batch
+        self.pipeline_depth = pipeline_depth
+        self.pipeline_stats = {'queued': 0, 'max_queued': 0, 'batches': 0, 'frames': 0}
+        self.loop_lag = LoopLagMonitor()
+        # Snapshot of every history append, for other threads and in-loop consumers
+        self.updates = SnapshotBus()
+        self.stork_client = None
+        self.websocket_url = websocket_url or ENVIRONMENTS[env]
         self.subscription_message = {"msg_type": "subscribe", "pairs": DEFAULT_PAIRS}
+        self.decoder = PragmaDecoder(collect_timestamps=True)
+        # Receive times (and Pragma history timestamps) come from this clock; pass one to share it
+        self.latency = LatencyTracker(clock)
+        self.capture = CaptureWriter(capture_dir, compress=capture_compress,
+                                     clock=self.latency.clock) if capture_dir else None
+        # Per-stage timings; enabled by ``profile`` or, when that is None, by PRAGMA_BENCH_PROFILE
+        self.profiler = Profiler.from_env(profile)
         
         # Store latest prices from each source
         self.latest_prices = {
             'pragma': {},
             'pyth': {},
-            'stork': {},
-            'timestamp': None
+            'stork': {}
         }
 
     def decode_short_string(self, felt: str) -> str:
@@ -54,116 +101,272 @@ class PriceCollector:
             return None
 
     async def fetch_pyth_prices(self):
-        while self.running:
-            try:
-                prices = await retrieve_pyth_prices()
-                if prices:
-                    async with self.lock:
-                        self.latest_prices['pyth'] = prices
-                        self.latest_prices['timestamp'] = time.time()
-                        self._update_price_history()
-            except Exception as e:
-                print(f"Error fetching Pyth prices: {e}")
-            await asyncio.sleep(1)  # Adjust rate limiting as needed
+        on_raw = (lambda data: self.capture.record('pyth', data)) if self.capture else None
+        await stream_pyth_prices(self._on_pyth_prices, lambda: self.running, base_url=self.pyth_url, on_raw=on_raw,
+                                 on_event=self._on_pyth_event, profiler=self.profiler, clock=self.latency.clock)
+
+    def _on_pyth_event(self, event):
+        if event == 'connect':
+            self.connection_counts['pyth'] += 1
+        else:
+            self.error_counts['pyth'] += 1
+
+    def _resolved_ids(self, pair_ids):
+        """Ids a source resolved in ``PAIRS``, unless the history keeps a registry of its own"""
+        return pair_ids if self.history.registry is PAIRS else None
+
+    async def _on_pyth_prices(self, prices, received_at, pair_ids=None):
+        start_ns = time.perf_counter_ns() if self.profiler.enabled else 0
+        self.message_counts['pyth'] += 1
+        # Hermes events only carry the feeds that moved, so merge them over the last known prices
+        self.latest_prices['pyth'] = {**self.latest_prices['pyth'], **prices}
+        self.history.append('pyth', received_at, prices, self._resolved_ids(pair_ids))
+        self._publish('pyth', received_at, prices)
+        if self.profiler.enabled:
+            self.profiler.add('pyth.update', time.perf_counter_ns() - start_ns)
+
+    async def handle_pyth_payload(self, data, received_at):
+        """Process one raw Hermes event payload, as the stream consumer would"""
+        start_ns = time.perf_counter_ns() if self.profiler.enabled else 0
+        pair_ids = []
+        prices = parse_price_update(data, pair_ids)
+        if self.profiler.enabled:
+            self.profiler.add('pyth.parse', time.perf_counter_ns() - start_ns)
+        if prices:
+            await self._on_pyth_prices(prices, received_at, pair_ids)
+
+    async def _on_stork_prices(self, prices, received_at, pair_ids=None):
+        start_ns = time.perf_counter_ns() if self.profiler.enabled else 0
+        self.message_counts['stork'] += 1
+        # Only pairs whose index price changed are returned
+        self.latest_prices['stork'] = {**self.latest_prices['stork'], **prices}
+        self.history.append('stork', received_at, prices, self._resolved_ids(pair_ids))
+        self._publish('stork', received_at, prices)
+        if self.profiler.enabled:
+            self.profiler.add('stork.update', time.perf_counter_ns() - start_ns)
+
+    async def handle_stork_payload(self, payload, received_at):
+        """Process one raw x10 markets payload, as a successful poll would"""
+        if self.stork_client is None:
+            self.stork_client = StorkClient(self.stork_config, profiler=self.profiler)
+        prices = self.stork_client.apply_payload(payload)
+        if prices:
+            await self._on_stork_prices(prices, received_at, self.stork_client.changed_ids)
 
     async def fetch_stork_prices(self):
-        while self.running:
+        on_raw = (lambda data: self.capture.record('stork', data)) if self.capture else None
+        self.stork_client = StorkClient(self.stork_config, on_raw=on_raw, profiler=self.profiler)
+        try:
+            while self.running:
+                try:
+                    prices = await self.stork_client.poll()
+                    if prices:
+                        await self._on_stork_prices(prices, self.latency.clock.wall_time(),
+                                                    self.stork_client.changed_ids)
+                except Exception as e:
+                    self.error_counts['stork'] += 1
+                    print(f"Error fetching Stork prices: {e}")
+                await asyncio.sleep(1)  # Adjust rate limiting as needed
+        finally:
+            await self.stork_client.close()
+
+    async def handle_pragma_message(self, message, received_ns, received_at=None, queued_ns=0):
+        """
+        Process one raw Pragma frame: inter-arrival, decode, latency and history.
+        ``received_ns`` is on ``self.latency.clock``; ``received_at`` (wall clock,
+        defaults to ``received_ns`` on that clock) is the history timestamp. ``queued_ns`` is how long the
+        frame waited for the decoder and counts towards receive-to-parsed latency.
+        """
+        self.message_counts['pragma'] += 1
+        # An interval across a reconnect is a gap, reported by the connection metrics instead
+        after_gap = self.connection.spans_gap(self.last_message_ns, received_ns)
+        if self.last_message_ns is not None and not after_gap:
+            self.inter_arrival.record_ms((received_ns - self.last_message_ns) / 1e6, received_ns / 1e9)
+        self.last_message_ns = received_ns
+
+        decode_start_ns = time.perf_counter_ns()
+        prices = self.decoder.decode(message, self.latest_prices['pragma'])
+        decode_ns = time.perf_counter_ns() - decode_start_ns
+        self.decode_time.record_us(decode_ns // 1000)
+        if self.profiler.enabled:
+            self.profiler.add('pragma.decode', decode_ns)
+        if prices is None:
+            self.empty_message_count += 1
+            return
+        self.latency.record(
+            received_ns,
+            received_ns + queued_ns + decode_ns,
+            self.decoder.message_timestamp,
+            self.decoder.publisher_timestamps
+        )
+
+        if len(prices.keys()) > 0:  # Only update if we have prices
+            if received_at is None:
+                received_at = self.latency.clock.wall_time(received_ns)
+            # On the wall clock, the time base calculate_missed_slots reports against
+            self.missed_slots.on_tick(prices, received_at, after_gap)
+            update_start_ns = time.perf_counter_ns() if self.profiler.enabled else 0
+            self.latest_prices['pragma'] = prices
+            self._update_price_history(received_at, self._resolved_ids(self.decoder.pair_ids))
+            if self.profiler.enabled:
+                self.profiler.add('pragma.update', time.perf_counter_ns() - update_start_ns)
+
+    async def _handle_pragma_frame(self, message, received_ns, received_at=None, queued_ns=0):
+        try:
+            await self.handle_pragma_message(message, received_ns, received_at, queued_ns)
+        except Exception as e:
+            self.error_counts['pragma'] += 1
+            print(f"Error processing Pragma message: {e}")
+
+    async def _decode_frames(self, frames: asyncio.Queue):
+        """
+        Pipelined mode: decode queued frames in batches of up to ``decode_batch``,
+        yielding after each batch so the recv loop can stamp the next frames
+        """
+        stats = self.pipeline_stats
+        while True:
+            batch = [await frames.get()]
+            while len(batch) < self.decode_batch and not frames.empty():
+                batch.append(frames.get_nowait())
+            stats['queued'] = frames.qsize()
+            stats['batches'] += 1
+            stats['frames'] += len(batch)
+            for message, received_ns in batch:
+                queued_ns = self.latency.clock.now() - received_ns
+                if self.profiler.enabled:
+                    self.profiler.add('pragma.queue', queued_ns)
+                await self._handle_pragma_frame(message, received_ns, queued_ns=queued_ns)
+            await asyncio.sleep(0)
+
+    async def _ping(self, websocket):
+        """Sample ping RTT every ``ping_interval`` seconds; close the connection if a pong is overdue"""
+        clock = self.latency.clock
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            sent_ns = clock.now()
             try:
-                prices = await retrieve_stork_prices()
-                if prices:
-                    async with self.lock:
-                        self.latest_prices['stork'] = prices
-                        self.latest_prices['timestamp'] = time.time()
-                        self._update_price_history()
-            except Exception as e:
-                print(f"Error fetching Stork prices: {e}")
-            await asyncio.sleep(1)  # Adjust rate limiting as needed
+                pong = await websocket.ping()
+                await asyncio.wait_for(pong, self.ping_timeout)
+            except asyncio.TimeoutError:
+                self.connection.ping_timeouts += 1
+                await websocket.close(1011, 'ping timeout')
+                return
+            except websockets.ConnectionClosed:
+                # The recv loop sees the close and records it
+                return
+            self.connection.ping_rtt.record_ms((clock.now() - sent_ns) / 1e6)
 
     async def fetch_pragma_prices(self):
-        while self.running:
-            try:
-                async with websockets.connect(self.websocket_url) as websocket:
-                    print(f"WebSocket connection established to {self.websocket_url}")
-                    await websocket.send(json.dumps(self.subscription_message))
-                    
-                    while self.running:
-                        message = await websocket.recv()
-                        self.update_history.append(time.time())
-                        try:
-                            parsed_data = json.loads(message)
-                            print("\n=== Raw Message ===")
-                            print(json.dumps(parsed_data, indent=2))
-                            if 'oracle_prices' not in parsed_data:
-                                self.empty_message_count += 1
+        frames = asyncio.Queue(self.pipeline_depth) if self.pipeline else None
+        decoder = asyncio.ensure_future(self._decode_frames(frames)) if frames else None
+        clock = self.latency.clock
+        connection = self.connection
+        try:
+            while self.running:
+                websocket = None
+                pinger = None
+                try:
+                    connect_start_ns = time.perf_counter_ns()
+                    # Keepalive is our own ping task, which also samples the RTT
+                    async with websockets.connect(self.websocket_url, ping_interval=None) as websocket:
+                        handshake_ns = time.perf_counter_ns() - connect_start_ns
+                        connection.opened(handshake_ns, clock.now())
+                        print(f"WebSocket connection established to {self.websocket_url}")
+                        self.connection_counts['pragma'] += 1
+                        await websocket.send(json.dumps(self.subscription_message))
+                        subscribed_ns = clock.now()
+                        if self.profiler.enabled:
+                            self.profiler.add('pragma.connect', handshake_ns)
+                        if self.ping_interval:
+                            pinger = asyncio.ensure_future(self._ping(websocket))
+
+                        first = True
+                        while self.running:
+                            # pragma.recv is time spent waiting for the node, not client work
+                            recv_start_ns = time.perf_counter_ns() if self.profiler.enabled else 0
+                            message = await websocket.recv()
+                            received_ns = clock.now()
+                            if self.profiler.enabled:
+                                self.profiler.add('pragma.recv', time.perf_counter_ns() - recv_start_ns)
+                            if first:
+                                first = False
+                                connection.received_first(received_ns - subscribed_ns, received_ns,
+                                                          clock.to_wall_ns(received_ns))
+                                self.reconnect_backoff.reset()
+                            if self.capture:
+                                self.capture.record('pragma', message, received_ns)
+                            if frames is None:
+                                await self._handle_pragma_frame(message, received_ns)
                                 continue
+                            # A full queue holds up recv, which the lag and queue stats then show
+                            await frames.put((message, received_ns))
+                            if frames.qsize() > self.pipeline_stats['max_queued']:
+                                self.pipeline_stats['max_queued'] = frames.qsize()
+
+                except Exception as e:
+                    self.error_counts['pragma'] += 1
+                    close_code = websocket.close_code if websocket is not None else None
+                    connection.closed(close_code if close_code is not None else type(e).__name__, clock.now())
+                    delay = self.reconnect_backoff.next()
+                    print(f"WebSocket error: {e}; reconnecting in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                finally:
+                    if pinger:
+                        pinger.cancel()
+        finally:
+            if decoder:
+                decoder.cancel()
 
-                            prices = {}
-                            for price_data in parsed_data['oracle_prices']:
-                                pair = self.decode_short_string(price_data['global_asset_id'])
-                                print(f"\nProcessing pair: {pair}")
-                                print(f"Price data: {json.dumps(price_data, indent=2)}")
-                                if not pair:
-                                    # use previous price
-                                    prices[pair] = self.latest_prices['pragma'][pair]
-                                    continue
-                                
-                                price_value = self.format_price(price_data['median_price'])
-                                if price_value is None:  # Skip if price is None
-                                    # use previous price
-                                    prices[pair] = self.latest_prices['pragma'][pair]
-                                    continue
-                                
-                                component_prices = {}
-                                print("\nLooking for component prices...")
-                                print(f"Available fields: {price_data.keys()}")
-                                for cmp in price_data.get('signed_prices', []):
-                                    print(f"Processing component: {cmp}")
-                                    comp_price = self.format_price(cmp["oracle_price"])
-                                    if comp_price is not None:  # Only add valid component prices
-                                        component_prices[cmp["signing_key"]] = comp_price
-                                
-                                print(f"Collected component prices: {component_prices}")
-                                prices[pair] = {
-                                    "price": price_value,
-                                    "component": component_prices
-                                }
-
-                            if len(prices.keys()) > 0:  # Only update if we have prices
-                                async with self.lock:
-                                    self.latest_prices['pragma'] = prices
-                                    self.latest_prices['timestamp'] = time.time()
-                                    self._update_price_history()
-
-                        except Exception as e:
-                            print(f"Error processing Pragma message: {e}")
-
-            except Exception as e:
-                print(f"WebSocket error: {e}")
-                await asyncio.sleep(5)
-
-    def _update_price_history(self):
-        """Create a new price entry from latest prices and add to history"""
+    def _update_price_history(self, timestamp=None, pair_ids=None):
+        """
+        Record the latest Pragma message in history and fold it into the metrics,
+        matched against the reference prices observed as of its timestamp.
+        ``pair_ids`` are the message's pair ids in the history's registry.
+        """
         # Only update if we have pragma prices (our primary source)
-        if not self.latest_prices['pragma']:
+        pragma_prices = self.latest_prices['pragma']
+        if not pragma_prices:
             return
+        timestamp = timestamp or self.latency.clock.wall_time()
+        profiler = self.profiler
+        start_ns = time.perf_counter_ns() if profiler.enabled else 0
 
-        price_entry = {
-            'timestamp': self.latest_prices['timestamp'] or time.time(),
-            'pragma_prices': self.latest_prices['pragma'].copy(),
-            'pyth_prices': self.latest_prices['pyth'].copy(),
-            'stork_prices': self.latest_prices['stork'].copy()
+        self.history.append('pragma', timestamp, pragma_prices, pair_ids)
+        if profiler.enabled:
+            appended_ns = time.perf_counter_ns()
+            profiler.add('history.append', appended_ns - start_ns)
+        references = {
+            source: self.history.latest_observed(source, timestamp)
+            for source in REFERENCE_SOURCES
         }
-        
-        self.price_history.append(price_entry)
-        self.update_queue.put(price_entry)
+        self.metrics.update(pragma_prices, references)
+        if profiler.enabled:
+            metrics_ns = time.perf_counter_ns()
+            profiler.add('pragma.metrics', metrics_ns - appended_ns)
+        self._publish('pragma', timestamp, pragma_prices)
+        if profiler.enabled:
+            profiler.add('snapshot.publish', time.perf_counter_ns() - metrics_ns)
+
+    def _publish(self, source, timestamp, prices):
+        # Every latest_prices dict is replaced, never mutated, so the snapshot can share them
+        self.updates.publish(source, timestamp, prices, dict(self.latest_prices))
 
     async def run_all_fetchers(self):
-        """Run all price fetchers concurrently"""
-        await asyncio.gather(
-            self.fetch_pragma_prices(),
-            self.fetch_pyth_prices(),
-            self.fetch_stork_prices()
-        )
+        """Run all price fetchers concurrently, and the metrics endpoint if configured"""
+        exporter = None
+        if self.metrics_port is not None:
+            exporter = MetricsExporter(self, self.metrics_host, self.metrics_port)
+            await exporter.start()
+        try:
+            await asyncio.gather(
+                self.fetch_pragma_prices(),
+                self.fetch_pyth_prices(),
+                self.fetch_stork_prices(),
+                self.loop_lag.run(lambda: self.running)
+            )
+        finally:
+            if exporter:
+                await exporter.stop()
 
     def run_async_loop(self):
         asyncio.run(self.run_all_fetchers())
@@ -181,84 +384,99 @@ class PriceCollector:
             self.running = False
             if self.collector_thread:
                 self.collector_thread.join()
+            if self.capture:
+                self.capture.close()
             print("Price collector stopped")
 
+    def subscribe(self, maxsize=1024, policy=DROP_OLDEST, sources=None):
+        """
+        Bounded queue of ``PriceSnapshot``s, one per history append, optionally
+        only for ``sources``; see ``snapshot_bus`` for the overflow policies
+        """
+        return self.updates.subscribe(maxsize, policy, sources)
+
+    def unsubscribe(self, subscription):
+        self.updates.unsubscribe(subscription)
+
+    def get_snapshot(self):
+        """The most recently published ``PriceSnapshot``, or None before the first update"""
+        return self.updates.latest
+
     def get_history(self):
-        """Thread-safe way to get price history"""
-        return self.price_history.copy() if self.price_history else []
+        """Consistent snapshot of the bounded columnar price history; the live store stays with the collector"""
+        return self.history.snapshot()
+
+    def get_history_length(self):
+        """Number of retained Pragma rows, without copying the history"""
+        return len(self.history)
     
+    def get_metrics(self, pair):
+        """Streaming MSE / delta / windowed Spearman for a pair, keyed by reference source"""
+        return self.metrics.get(pair)
+
+    def get_unmatched_pairs(self):
+        """Pragma pairs that Pyth or Stork never delivered, and identifiers no source could canonicalize"""
+        return self.history.registry.report({source: self.history.pairs(source) for source in SOURCES})
+
+    def get_stork_poll_stats(self):
+        return self.stork_client.get_stats() if self.stork_client else None
+
     def get_empty_message(self):
         return self.empty_message_count
         
-    def get_latency_metrics(self):
-        timestamps = self.update_history.copy()
-        
-        if len(timestamps) < 2:
-            return None
-        
-        latency = np.diff(timestamps) * 1000
-        
-        metrics = {
-            'mean': np.mean(latency),
-            'median': np.median(latency),
-            'q1': np.percentile(latency, 25),
-            'q3': np.percentile(latency, 75),
-            'p90': np.percentile(latency, 90),
-            'p99': np.percentile(latency, 99)
-        }
-        
-        return metrics
-    
-    def calculate_missed_slots(self):
-        history = self.price_history.copy()
+    def get_e2e_latency(self):
+        """Publisher -> node -> receive -> parsed latency in ms, per stage, pair and publisher"""
+        return self.latency.report()
 
-        if len(history) < 2:
+    def get_latency_metrics(self, window=None, at_ns=None):
+        """
+        Inter-arrival time of Pragma messages in ms, over the last ``window``
+        seconds (rounded to the histogram's slot size) or the whole run, as of
+        ``at_ns`` on ``self.latency.clock`` (now by default)
+        """
+        histogram = self.inter_arrival.window(window, None if at_ns is None else at_ns / 1e9)
+        if histogram.total < 1:
             return None
+        return histogram.summary()
 
-        total_slots = len(history) - 1
-        missed_per_pair = {}
-        global_missed = 0
-
-        pairs = history[0]['pragma_prices'].keys()
-
-        for pair in pairs:
-            missed_per_pair[pair] = 0
-
-        for i in range(1, len(history)):
-            prev = history[i-1]['pragma_prices']
-            curr = history[i]['pragma_prices']
-            
-            for pair in pairs:
-                if pair in prev and pair in curr:
-                    if prev[pair] == curr[pair]:
-                        missed_per_pair[pair] += 1
-            
-            all_unchanged = True
-            for pair in pairs:
-                if pair in prev and pair in curr:
-                    if prev[pair] != curr[pair]:
-                        all_unchanged = False
-                        break
-            if all_unchanged:
-                global_missed += 1
-
-        ratios = {
-            'per_pair': {
-                pair: {
-                    'missed': missed,
-                    'total': total_slots,
-                    'ratio': (missed / total_slots) * 100 if total_slots > 0 else 0
-                }
-                for pair, missed in missed_per_pair.items()
-            },
-            'global': {
-                'missed': global_missed,
-                'total': total_slots,
-                'ratio': (global_missed / total_slots) * 100 if total_slots > 0 else 0
-            }
-        }
+    def get_latency_windows(self):
+        """Inter-arrival summaries for the last 1m / 5m / 1h and the whole run"""
+        return self.inter_arrival.summaries()
+
+    def get_loop_lag(self):
+        """
+        How late the collector's event loop ran scheduled callbacks, in ms, for
+        the last 1m / 5m / 1h and the whole run; lag here delays every receive
+        timestamp and so inflates the measured latency
+        """
+        return self.loop_lag.summaries()
+
+    def get_profile(self):
+        """Per-stage counts and timings (µs), most expensive first; None unless profiling is enabled"""
+        return self.profiler.top(None, include_waits=True) if self.profiler.enabled else None
 
-        return ratios
+    def get_connection_stats(self):
+        """
+        Pragma WebSocket handshake, subscribe-to-first-data and ping RTT in ms,
+        close codes and reconnect gaps; gaps are left out of the inter-arrival
+        and missed-slot statistics
+        """
+        return self.connection.report()
+
+    def get_pipeline_stats(self):
+        """Decode queue depth and batching in pipelined mode, None otherwise"""
+        if not self.pipeline:
+            return None
+        stats = self.pipeline_stats
+        return {**stats, 'mean_batch': stats['frames'] / stats['batches'] if stats['batches'] else None}
+    
+    def calculate_missed_slots(self, at_ns=None):
+        """
+        Missed-slot ratios per pair, per publisher signing key and overall,
+        cumulative and over the last 1m / 5m / 1h of Pragma messages, as of
+        ``at_ns`` on ``self.latency.clock`` (now by default)
+        """
+        return self.missed_slots.report(self.latency.clock.wall_time(at_ns))
 
 def main():
     collector = PriceCollector('local')
@@ -270,13 +488,12 @@ def main():
         while True:
             time.sleep(1)
             history = collector.get_history()
-            if history:
-                latest = history[-1]
-                print(latest)
+            if len(history):
+                print(history.latest())
     except KeyboardInterrupt:
         collector.stop()
         print("\nStopped price collection")
-        print("Final price history length:", len(collector.get_history()))
+        print("Final price history length:", collector.get_history_length())
 
 if __name__ == "__main__":
     main()
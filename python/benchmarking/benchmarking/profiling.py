@@ -0,0 +1,119 @@
+"""
+Per-stage timing of the client's own hot paths.
+
+    PRAGMA_BENCH_PROFILE=1 python CLI_monitoring.py                 # print the stage table on exit
+    PRAGMA_BENCH_PROFILE=profile.json python soak.py --mock ...     # or dump it as JSON
+
+Stages are named spans - ``pragma.connect``, ``pragma.recv``,
+``pragma.decode``, ``history.append``, ``pyth.parse``, ``stork.fetch`` and
+so on. Each aggregates a count, a total and a latency histogram. Hot paths
+check ``profiler.enabled`` before reading the clock, so a disabled profiler
+costs one attribute lookup per stage. ``top()`` ranks the client's own work
+by total time, leaving out ``WAIT_STAGES`` (time spent waiting on the
+network), to show where the client spends it before the node is blamed.
+``pragma.update`` contains ``history.append``, ``pragma.metrics`` and
+``snapshot.publish``.
+"""
+import atexit
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from latency_histogram import LatencyHistogram
+
+PROFILE_ENV = 'PRAGMA_BENCH_PROFILE'
+
+WAIT_STAGES = frozenset({'pragma.connect', 'pragma.recv', 'pyth.connect', 'stork.fetch'})
+
+
+class Profiler:
+    """Count, total and histogram (µs) of elapsed time per named stage"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.counts: Dict[str, int] = {}
+        self.totals_ns: Dict[str, int] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    @classmethod
+    def from_env(cls, enabled: Optional[bool] = None) -> 'Profiler':
+        """
+        A profiler enabled by ``enabled`` or, when that is None, by ``PRAGMA_BENCH_PROFILE``.
+        A ``.json`` value also dumps the summary there on exit; any other true value prints it.
+        """
+        setting = os.environ.get(PROFILE_ENV, '')
+        if enabled is None:
+            enabled = setting.lower() not in ('', '0', 'false', 'no')
+        profiler = cls(enabled)
+        if enabled and setting:
+            profiler.dump_on_exit(setting if setting.endswith('.json') else None)
+        return profiler
+
+    def add(self, stage: str, elapsed_ns: int):
+        if stage not in self.counts:
+            self.counts[stage] = 0
+            self.totals_ns[stage] = 0
+            self.histograms[stage] = LatencyHistogram()
+        self.counts[stage] += 1
+        self.totals_ns[stage] += elapsed_ns
+        self.histograms[stage].record_us(elapsed_ns // 1000)
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time the enclosed block; for paths that are not hot enough to guard by hand"""
+        if not self.enabled:
+            yield
+            return
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter_ns() - start_ns)
+
+    def reset(self):
+        self.counts.clear()
+        self.totals_ns.clear()
+        self.histograms.clear()
+
+    def stage(self, stage: str) -> Optional[Dict[str, float]]:
+        count = self.counts.get(stage)
+        if not count:
+            return None
+        total_ns = self.totals_ns[stage]
+        histogram = self.histograms[stage]
+        p = histogram.percentiles((50, 99))
+        return {
+            'count': count,
+            'total_ms': total_ns / 1e6,
+            'us_per_message': total_ns / count / 1e3,
+            'p50_us': p[50] * 1000,
+            'p99_us': p[99] * 1000,
+            'max_us': histogram.max_us
+        }
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: self.stage(stage) for stage in sorted(self.counts)}
+
+    def top(self, n: Optional[int] = 10, include_waits: bool = False) -> List[Dict]:
+        """The ``n`` stages (all if None) with the most total time"""
+        stages = [stage for stage in self.counts if include_waits or stage not in WAIT_STAGES]
+        ranked = sorted(stages, key=self.totals_ns.get, reverse=True)[:n]
+        return [{'stage': stage, **self.stage(stage)} for stage in ranked]
+
+    def dump(self, path: Optional[str] = None):
+        """Write the summary as JSON to ``path``, or print the stage table"""
+        if path:
+            with open(path, 'w') as f:
+                json.dump({'stages': self.summary(), 'top': self.top()}, f, indent=2)
+            print(f"Profile written to {path}")
+            return
+        print(f"{'stage':<20} {'count':>9} {'total ms':>10} {'µs/msg':>9} {'p99 µs':>9}")
+        for row in self.top(None, include_waits=True):
+            wait = ' (wait)' if row['stage'] in WAIT_STAGES else ''
+            print(f"{row['stage']:<20} {row['count']:>9} {row['total_ms']:>10.1f} "
+                  f"{row['us_per_message']:>9.1f} {row['p99_us']:>9.1f}{wait}")
+
+    def dump_on_exit(self, path: Optional[str] = None):
+        atexit.register(lambda: self.counts and self.dump(path))
@@ -1,9 +1,14 @@
 import aiohttp
+import asyncio
 import json
 import time
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from urllib.parse import urlencode
 
+from latency_tracker import LatencyClock
+from pair_registry import PAIRS
+from profiling import Profiler
+
 PYTH_URL_BASE = 'https://hermes.pyth.network/v2/updates/price/stream'
 
 PAIR_SIGNATURES = {
@@ -38,70 +43,155 @@ PAIR_SIGNATURES = {
     "d40472610abe56d36d065a0cf889fc8f1dd9f3b7f2a478231a5fc6df07ea5ce3": "ONDOUSD"
 }
 
-async def retrieve_pyth_prices() -> Optional[Dict[str, float]]:
+# Hex feed id -> pair id and canonical pair name
+PYTH_PAIR_IDS = {hash_id: PAIRS.resolve('pyth', hash_id, name) for hash_id, name in PAIR_SIGNATURES.items()}
+PYTH_PAIRS = {hash_id: PAIRS.names[pair_id] for hash_id, pair_id in PYTH_PAIR_IDS.items() if pair_id is not None}
+
+PYTH_STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30)
+
+def build_pyth_url(base_url: str = PYTH_URL_BASE) -> str:
+    params = [('ids[]', hash_id) for hash_id in PAIR_SIGNATURES.keys()]
+    return f"{base_url}?{urlencode(params)}"
+
+def parse_price_update(data: bytes, pair_ids: Optional[List[int]] = None) -> Dict[str, float]:
+    """
+    Map the ``parsed`` entries of one Hermes price update event to pair prices.
+    The pair id of each returned price is appended to ``pair_ids``, if given.
+    """
+    price_map = {}
+    json_data = json.loads(data)
+    parsed = json_data.get('parsed')
+    if isinstance(parsed, list):
+        names = PAIRS.names
+        for prices in parsed:
+            pair_id = PYTH_PAIR_IDS.get(prices['id'])
+            if pair_id is not None:
+                price_map[names[pair_id]] = int(prices['price']['price']) * (10 ** int(prices['price']['expo']))
+                if pair_ids is not None and len(price_map) > len(pair_ids):
+                    pair_ids.append(pair_id)
+    return price_map
+
+async def iter_sse_data(response: aiohttp.ClientResponse,
+                        clock: Optional[LatencyClock] = None) -> AsyncIterator[Tuple[bytes, float]]:
+    """
+    Yield the payload of every ``data:`` line of an SSE response with the time
+    its chunk was received, in wall-clock seconds on ``clock``. Lines are split
+    on the raw bytes and the consumed prefix is dropped once per chunk, so a
+    partial line is never re-scanned.
+    """
+    clock = clock or LatencyClock()
+    buffer = bytearray()
+    async for chunk in response.content.iter_any():
+        received_at = clock.wall_time()
+        buffer += chunk
+        start = 0
+        while True:
+            newline = buffer.find(b'\n', start)
+            if newline == -1:
+                break
+            line = bytes(buffer[start:newline]).strip()
+            start = newline + 1
+            if line.startswith(b'data:'):
+                yield line[5:], received_at
+        del buffer[:start]
+
+async def retrieve_pyth_prices(on_event: Optional[Callable[[str], None]] = None) -> Optional[Dict[str, float]]:
     """
     Retrieves real-time price data from Pyth Network for various cryptocurrency pairs.
+    ``on_event('error')`` is called for every event that cannot be parsed.
     
     Returns:
         Dict[str, float]: A dictionary mapping trading pairs to their current prices,
                          or None if an error occurs
     """
-    price_map = {}
-    start_time = time.time()
-    message_count = 0
-    total_processing_time = 0
-
+    on_event = on_event or (lambda event: None)
     try:
-        # Construct query parameters
-        params = []
-        for hash_id in PAIR_SIGNATURES.keys():
-            params.append(('ids[]', hash_id))
-        
-        query_string = urlencode(params)
-        pyth_url = f"{PYTH_URL_BASE}?{query_string}"
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(pyth_url) as response:
+        async with aiohttp.ClientSession(timeout=PYTH_STREAM_TIMEOUT) as session:
+            async with session.get(build_pyth_url()) as response:
                 if not response.ok:
                     raise aiohttp.ClientError(f"HTTP {response.status}: {response.reason}")
 
-                buffer = ""
-                async for chunk in response.content:
-                    buffer += chunk.decode('utf-8')
-                    
-                    while '\n' in buffer:
-                        line, buffer = buffer.split('\n', 1)
-                        
-                        if line.strip().startswith('data:'):
-                            processing_start = time.perf_counter()
-                            try:
-                                json_data = json.loads(line[5:])
-                                
-                                if json_data.get('parsed') and isinstance(json_data['parsed'], list):
-                                    message_count += 1
-                                    
-                                    for prices in json_data['parsed']:
-                                        pair_id = PAIR_SIGNATURES.get(prices['id'])
-                                        if pair_id:
-                                            price = int(prices['price']['price']) * (10 ** int(prices['price']['expo']))
-                                            price_map[pair_id] = price
-                                    
-                                    # Return as soon as we get the first complete set of prices
-                                    return price_map
-                                    
-                            except json.JSONDecodeError as e:
-                                print(f'Error parsing JSON: {e}')
-                                
-                            processing_end = time.perf_counter()
-                            total_processing_time += processing_end - processing_start
+                async for data, _ in iter_sse_data(response):
+                    try:
+                        price_map = parse_price_update(data)
+                    except (ValueError, KeyError, TypeError):
+                        # A malformed event is skipped; the stream goes on
+                        on_event('error')
+                        continue
+                    if price_map:
+                        # Return as soon as we get the first complete set of prices
+                        return price_map
 
     except Exception as e:
         print(f'Error fetching data: {e}')
         return None
+
+async def stream_pyth_prices(
+    on_prices: Callable[[Dict[str, float], float, List[int]], Awaitable[None]],
+    is_running: Callable[[], bool],
+    initial_backoff: float = 0.5,
+    max_backoff: float = 30.0,
+    base_url: str = PYTH_URL_BASE,
+    on_raw: Optional[Callable[[bytes], None]] = None,
+    on_event: Optional[Callable[[str], None]] = None,
+    profiler: Optional[Profiler] = None,
+    clock: Optional[LatencyClock] = None
+):
+    """
+    Consume the Hermes price stream over one long-lived session, awaiting
+    ``on_prices(prices, received_at, pair_ids)`` for every parsed update. The stream is
+    reopened with exponential backoff whenever it errors or ends, until
+    ``is_running()`` returns False. ``on_raw`` sees every event payload
+    before it is parsed; ``on_event`` is told of each ``'connect'`` and
+    ``'error'`` (a dropped stream, or an event that is not valid JSON or
+    lacks the expected fields, which is skipped). ``profiler`` times
+    the ``pyth.connect`` and ``pyth.parse`` stages. Updates are stamped on
+    ``clock``; pass the collector's so they share the Pragma time base.
+    """
+    on_event = on_event or (lambda event: None)
+    profiler = profiler or Profiler(enabled=False)
+    backoff = initial_backoff
+    pyth_url = build_pyth_url(base_url)
+
+    async with aiohttp.ClientSession(timeout=PYTH_STREAM_TIMEOUT) as session:
+        while is_running():
+            try:
+                connect_start_ns = time.perf_counter_ns()
+                async with session.get(pyth_url) as response:
+                    if not response.ok:
+                        raise aiohttp.ClientError(f"HTTP {response.status}: {response.reason}")
+                    on_event('connect')
+                    if profiler.enabled:
+                        profiler.add('pyth.connect', time.perf_counter_ns() - connect_start_ns)
+
+                    async for data, received_at in iter_sse_data(response, clock):
+                        if not is_running():
+                            return
+                        if on_raw is not None:
+                            on_raw(data)
+                        try:
+                            parse_start_ns = time.perf_counter_ns() if profiler.enabled else 0
+                            pair_ids = []
+                            price_map = parse_price_update(data, pair_ids)
+                            if profiler.enabled:
+                                profiler.add('pyth.parse', time.perf_counter_ns() - parse_start_ns)
+                        except (ValueError, KeyError, TypeError):
+                            # Invalid JSON or an entry missing fields; counted, not printed per event
+                            on_event('error')
+                            continue
+                        if price_map:
+                            backoff = initial_backoff
+                            await on_prices(price_map, received_at, pair_ids)
+
+            except Exception as e:
+                print(f'Pyth stream error: {e}')
+                on_event('error')
+
+            if is_running():
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, max_backoff)
     
 if __name__ == "__main__":
-    import asyncio
-    
     async def main():
         prices = await retrieve_pyth_prices()
         if prices:
@@ -0,0 +1,114 @@
+"""
+Offline replay of a captured session through PriceCollector's parsing path.
+
+    python replay.py CAPTURE_DIR                # as fast as possible
+    python replay.py CAPTURE_DIR --speed 1      # real time
+    python replay.py CAPTURE_DIR --speed 10     # 10x
+
+Records go through the same decode -> latest_prices -> _update_price_history ->
+metrics path as live traffic, with no network. The report has throughput and
+mean microseconds per message for each stage. After ``replay()`` the collector
+holds the replayed history, so new metric definitions can be run over it;
+pass the report's ``ended_ns`` as ``at_ns`` to windowed and staleness metrics
+so they are measured from the end of the capture rather than from now.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Optional
+
+from capture_log import CaptureRecord, read_capture
+from price_collector import PriceCollector
+from profiling import Profiler
+
+
+async def replay(
+    records: Iterable[CaptureRecord],
+    collector: Optional[PriceCollector] = None,
+    speed: Optional[float] = None,
+    on_record: Optional[Callable[[PriceCollector, CaptureRecord], None]] = None
+) -> Dict:
+    """
+    Feed ``records`` through ``collector`` (a fresh one by default). ``speed``
+    is a multiple of real time; None replays as fast as possible.
+    """
+    collector = collector or PriceCollector()
+    collector.profiler = profiler = Profiler()
+    messages = defaultdict(int)
+    errors = 0
+    first = None
+    started = time.perf_counter()
+
+    for record in records:
+        if first is None:
+            first = record
+            # Map the capture's monotonic clock onto its wall clock for end-to-end latency
+            collector.latency.clock.offset_ns = record.wall_ns - record.monotonic_ns
+
+        if speed is not None:
+            due = (record.monotonic_ns - first.monotonic_ns) / 1e9 / speed
+            delay = due - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        received_at = record.wall_ns / 1e9
+        try:
+            if record.source == 'pragma':
+                await collector.handle_pragma_message(record.data, record.monotonic_ns, received_at)
+            elif record.source == 'pyth':
+                await collector.handle_pyth_payload(record.data, received_at)
+            elif record.source == 'stork':
+                await collector.handle_stork_payload(record.data, received_at)
+        except Exception as e:
+            errors += 1
+            print(f"Error replaying {record.source} record: {e}")
+        messages[record.source] += 1
+
+        if on_record is not None:
+            on_record(collector, record)
+
+    elapsed = time.perf_counter() - started
+    total = sum(messages.values())
+    captured_span = (record.monotonic_ns - first.monotonic_ns) / 1e9 if first else 0.0
+    # The capture's own time at its last record, on the collector's clock
+    ended_ns = record.monotonic_ns if first else None
+    return {
+        'collector': collector,
+        'messages': dict(messages),
+        'errors': errors,
+        'elapsed_s': elapsed,
+        'captured_span_s': captured_span,
+        'ended_ns': ended_ns,
+        'messages_per_second': total / elapsed if elapsed > 0 else None,
+        'us_per_message': elapsed / total * 1e6 if total else None,
+        'stages': profiler.summary(),
+        'history_entries': len(collector.history)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('capture_dir')
+    parser.add_argument('--speed', type=float, help="multiple of real time (1 = real time); omit for max speed")
+    parser.add_argument('--output', help="write the JSON report here")
+    args = parser.parse_args()
+
+    report = asyncio.run(replay(read_capture(args.capture_dir), speed=args.speed))
+    collector = report.pop('collector')
+    missed_slots = collector.calculate_missed_slots(report['ended_ns']) or {}
+    report['missed_slots'] = missed_slots.get('global')
+    report['missed_slots_windows'] = {
+        name: window['global'] for name, window in missed_slots.get('windows', {}).items()
+    }
+    report['inter_arrival_ms'] = collector.get_latency_metrics()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Hand-off between the collector loop and its consumers.
+
+The collector publishes an immutable ``PriceSnapshot`` after every history
+append. Publishing swaps ``SnapshotBus.latest`` (a single reference
+assignment) and offers the snapshot to each subscription's bounded queue; it
+never takes a lock and never waits on a consumer. Consumers either read
+``latest`` or pull from their own ``Subscription``:
+
+    updates = collector.subscribe(policy=LATEST, sources=('pragma',))
+    snapshot = updates.get(timeout=1)       # from any thread
+    snapshot = await updates.get_async()    # from an event loop
+    collector.unsubscribe(updates)
+
+A full queue drops its oldest snapshot (``DROP_OLDEST``) or, with
+``LATEST``, only ever holds the newest one, so a consumer that falls behind
+costs a bounded amount of memory and nothing else.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+DROP_OLDEST = 'drop_oldest'
+LATEST = 'latest'
+POLICIES = (DROP_OLDEST, LATEST)
+
+
+class PriceSnapshot(NamedTuple):
+    version: int
+    source: str
+    timestamp: float
+    # Prices this update delivered, as appended to history
+    prices: Dict
+    # Latest known prices of every source once this update was applied
+    latest: Dict[str, Dict]
+
+
+class Subscription:
+    """
+    A bounded queue of snapshots for one consumer.
+
+    Only the publishing thread appends and only the consumer pops, and both
+    are atomic deque operations, so neither side blocks the other.
+    ``dropped`` counts snapshots lost to the overflow policy.
+    """
+
+    def __init__(self, maxsize: int = 1024, policy: str = DROP_OLDEST, sources: Optional[Iterable[str]] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}, expected one of {POLICIES}")
+        self.policy = policy
+        self.sources = frozenset(sources) if sources else None
+        self.queue = deque(maxlen=1 if policy == LATEST else maxsize)
+        self.dropped = 0
+        self._ready = threading.Event()
+        # (loop, thread id, asyncio.Event) of a consumer waiting in get_async
+        self._async_waiter: Optional[Tuple] = None
+
+    def offer(self, snapshot: PriceSnapshot):
+        """Called by the publisher; never blocks"""
+        if self.sources is not None and snapshot.source not in self.sources:
+            return
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(snapshot)
+        self._ready.set()
+        waiter = self._async_waiter
+        if waiter is not None:
+            loop, thread_id, event = waiter
+            if threading.get_ident() == thread_id:
+                event.set()
+            else:
+                loop.call_soon_threadsafe(event.set)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[PriceSnapshot]:
+        """Next snapshot, waiting up to ``timeout`` seconds; None on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self.queue.popleft()
+            except IndexError:
+                pass
+            self._ready.clear()
+            if self.queue:  # appended between popleft and clear
+                continue
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            self._ready.wait(remaining)
+
+    async def get_async(self) -> PriceSnapshot:
+        """Next snapshot, awaited on the running event loop"""
+        while True:
+            try:
+                return self.queue.popleft()
+            except IndexError:
+                pass
+            if self._async_waiter is None:
+                self._async_waiter = (asyncio.get_running_loop(), threading.get_ident(), asyncio.Event())
+            event = self._async_waiter[2]
+            event.clear()
+            if self.queue:
+                continue
+            await event.wait()
+
+    def drain(self) -> List[PriceSnapshot]:
+        """Every queued snapshot, oldest first, without waiting"""
+        snapshots = []
+        while True:
+            try:
+                snapshots.append(self.queue.popleft())
+            except IndexError:
+                return snapshots
+
+
+class SnapshotBus:
+    """Publishes versioned snapshots by atomic swap and fans them out to subscriptions"""
+
+    def __init__(self):
+        self.version = 0
+        self.latest: Optional[PriceSnapshot] = None
+        # Replaced, never mutated, so publish iterates it without a lock
+        self._subscriptions: Tuple[Subscription, ...] = ()
+        self._subscribe_lock = threading.Lock()
+
+    def publish(self, source: str, timestamp: float, prices: Dict, latest: Dict[str, Dict]) -> PriceSnapshot:
+        """
+        Publish one update. ``prices`` and the dicts in ``latest`` must not be
+        mutated afterwards; the collector replaces them instead.
+        """
+        self.version += 1
+        snapshot = PriceSnapshot(self.version, source, timestamp, prices, latest)
+        self.latest = snapshot
+        for subscription in self._subscriptions:
+            subscription.offer(snapshot)
+        return snapshot
+
+    def subscribe(self, maxsize: int = 1024, policy: str = DROP_OLDEST,
+                  sources: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = Subscription(maxsize, policy, sources)
+        with self._subscribe_lock:
+            self._subscriptions = self._subscriptions + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._subscribe_lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+
+    def __len__(self):
+        return len(self._subscriptions)
@@ -0,0 +1,160 @@
+"""
+Headless soak run of the collector with a machine-readable summary.
+
+    python soak.py --env dev --duration 14400 --pairs BTC/USD,ETH/USD --output soak-dev.json
+    python soak.py --mock --duration 60 --uvloop       # against mock_servers.py
+
+Nothing is printed per message; a progress line is printed every
+``--progress-interval`` seconds. The summary has throughput per source,
+decode time per Pragma message, CPU time per message, peak RSS, inter-arrival,
+end-to-end and event-loop lag percentiles, connection metrics and missed slots, so summaries from
+two node releases can be diffed directly. ``--pipeline`` decodes Pragma frames
+in a separate task so decoding never delays the next receive. ``--profile``
+adds per-stage timings; it is off by default since timing every stage adds
+its own overhead to the CPU figures.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import sys
+import time
+from typing import Dict, List, Optional
+
+from mock_servers import mock_endpoints
+from price_collector import DEFAULT_PAIRS, ENVIRONMENTS, PriceCollector
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def soak(collector: PriceCollector, duration: float, progress_interval: Optional[float] = 60) -> Dict:
+    """
+    Run ``collector`` for ``duration`` seconds in the current event loop and
+    summarize the run; stage timings are included if its profiler is enabled
+    """
+    profiler = collector.profiler
+    cpu_start = cpu_seconds()
+    started = time.perf_counter()
+
+    collector.running = True
+    fetchers = asyncio.ensure_future(collector.run_all_fetchers())
+    deadline = started + duration
+    while time.perf_counter() < deadline and not fetchers.done():
+        await asyncio.sleep(min(progress_interval or duration, deadline - time.perf_counter()))
+        if progress_interval and time.perf_counter() < deadline:
+            print(f"[{time.perf_counter() - started:,.0f}s] messages: {collector.message_counts}")
+
+    collector.running = False
+    try:
+        # Fetchers exit at their next message or poll; don't wait on a silent feed
+        await asyncio.wait_for(fetchers, timeout=10)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - started
+    cpu = cpu_seconds() - cpu_start
+    if collector.capture:
+        collector.capture.close()
+
+    counts = dict(collector.message_counts)
+    total = sum(counts.values())
+    decode = collector.decode_time
+    missed_slots = collector.calculate_missed_slots()
+    return {
+        'elapsed_s': elapsed,
+        'messages': counts,
+        'empty_messages': collector.get_empty_message(),
+        'messages_per_second': {source: count / elapsed for source, count in counts.items()},
+        'decode_us_per_message': decode.sum_us / decode.total if decode.total else None,
+        'profiled': profiler.enabled,
+        'stages': profiler.summary() if profiler.enabled else None,
+        'profile_top': profiler.top(5) if profiler.enabled else None,
+        'cpu_s': cpu,
+        'cpu_us_per_message': cpu / total * 1e6 if total else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'inter_arrival_ms': collector.get_latency_metrics(),
+        'e2e_latency_ms': collector.get_e2e_latency()['stages'],
+        'event_loop_lag_ms': collector.get_loop_lag()['all'],
+        'pipeline': collector.get_pipeline_stats(),
+        'connection': collector.get_connection_stats(),
+        'missed_slots': {
+            'global': missed_slots['global'],
+            'gaps': missed_slots['gaps'],
+            'per_pair': missed_slots['per_pair']
+        } if missed_slots else None,
+        'stork_poll': collector.get_stork_poll_stats(),
+        'history_entries': len(collector.history)
+    }
+
+
+def run(collector: PriceCollector, duration: float, use_uvloop: bool = False,
+        progress_interval: Optional[float] = 60) -> Dict:
+    """``soak`` in a fresh event loop, uvloop's if requested and installed"""
+    loop_name = 'asyncio'
+    if use_uvloop:
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            loop_name = f'uvloop {uvloop.__version__}'
+        except ImportError:
+            print("uvloop is not installed, using the default asyncio loop")
+    summary = asyncio.run(soak(collector, duration, progress_interval))
+    summary['event_loop'] = loop_name
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--env', choices=list(ENVIRONMENTS), default='local')
+    parser.add_argument('--url', help="Pragma subscribe URL (overrides --env)")
+    parser.add_argument('--mock', action='store_true', help="use the mock_servers.py endpoints for all three feeds")
+    parser.add_argument('--duration', type=float, default=3600, help="seconds")
+    parser.add_argument('--pairs', default=','.join(DEFAULT_PAIRS), help="comma-separated Pragma pairs")
+    parser.add_argument('--uvloop', action='store_true', help="run on uvloop if it is installed")
+    parser.add_argument('--pipeline', action='store_true', help="decode Pragma frames off the recv loop")
+    parser.add_argument('--decode-batch', type=int, default=8, help="frames decoded per turn with --pipeline")
+    parser.add_argument('--profile', action='store_true',
+                        help="time every stage (also enabled by PRAGMA_BENCH_PROFILE); adds per-message overhead")
+    parser.add_argument('--capture-dir', help="also capture raw traffic here")
+    parser.add_argument('--progress-interval', type=float, default=60, help="seconds, 0 to disable")
+    parser.add_argument('--output', help="write the JSON summary here")
+    parser.add_argument('--metrics-port', type=int, help="serve Prometheus/OpenMetrics on this port during the run")
+    args = parser.parse_args()
+
+    options = mock_endpoints() if args.mock else {}
+    if args.url:
+        options['websocket_url'] = args.url
+    collector = PriceCollector(args.env, capture_dir=args.capture_dir, metrics_port=args.metrics_port,
+                               pipeline=args.pipeline, decode_batch=args.decode_batch,
+                               profile=True if args.profile else None, **options)
+    pairs: List[str] = [pair.strip() for pair in args.pairs.split(',') if pair.strip()]
+    collector.subscription_message = {"msg_type": "subscribe", "pairs": pairs}
+
+    summary = {
+        'env': args.env,
+        'url': collector.websocket_url,
+        'pairs': pairs,
+        'pipeline': args.pipeline,
+        'duration_s': args.duration,
+        'started_at': time.time(),
+        'python': platform.python_version(),
+        **run(collector, args.duration, args.uvloop, args.progress_interval or None)
+    }
+
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,142 @@
-import aiohttp
-from typing import Dict, Optional
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
 from x10.perpetual.trading_client import PerpetualTradingClient
 from x10.perpetual.configuration import MAINNET_CONFIG
+from x10.perpetual.markets import MarketModel
+from x10.utils.http import handle_known_errors, parse_response_to_model
+
+from pair_registry import PAIRS
+from profiling import Profiler
 
 MARKET_PAIRS = [
-    'BTC-USD', 'ETH-USD', 'SOL-USD', 'BNB-USD', 'LTC-USD', 'LINK-USD', 
+    'BTC-USD', 'ETH-USD', 'SOL-USD', 'BNB-USD', 'LTC-USD', 'LINK-USD',
     'AVAX-USD', 'MATIC-USD', 'XRP-USD', 'DOGE-USD', 'PEPE-USD', 'AAVE-USD',
     'TRX-USD', 'SUI-USD', 'WIF-USD', 'TIA-USD', 'TON-USD', 'LDO-USD',
     'ARB-USD', 'OP-USD', 'ORDI-USD', 'JTO-USD', 'JUP-USD', 'UNI-USD',
     'OKB-USD', 'ATOM-USD', 'NEAR-USD', 'SATS-USD', 'ONDO-USD'
 ]
 
+class StorkClient:
+    """
+    Long-lived x10 markets poller.
+
+    The trading client (and the pooled aiohttp session it owns) is kept until
+    ``close()``. Each poll asks only for ``MARKET_PAIRS`` and sends the last
+    ETag, so an unchanged payload costs a 304. The x10 SDK has no index price
+    stream, so polling is the only mode available. ``on_raw`` sees every
+    full (non-304) payload before it is parsed. The pair ids of the last
+    changed prices returned, in order, are kept in ``changed_ids``.
+    """
+
+    def __init__(self, config=MAINNET_CONFIG, market_pairs: List[str] = MARKET_PAIRS, stats_size: int = 1000,
+                 on_raw: Optional[Callable[[bytes], None]] = None, profiler: Optional[Profiler] = None):
+        self.on_raw = on_raw
+        self.profiler = profiler or Profiler(enabled=False)
+        self.trading_client = PerpetualTradingClient(config, None)
+        self.markets_url = self.trading_client.markets_info._get_url("/info/markets", query={"market": market_pairs})
+        # Market name -> pair id
+        self.market_ids = {market: PAIRS.resolve('stork', market) for market in market_pairs}
+        self.last_prices: Dict[str, float] = {}
+        self.changed_ids: List[int] = []
+        self.poll_count = 0
+        self.not_modified_count = 0
+        self.total_payload_bytes = 0
+        self.poll_latencies_ms = deque(maxlen=stats_size)
+        self.payload_sizes = deque(maxlen=stats_size)
+        self._etag = None
+
+    async def poll(self) -> Dict[str, float]:
+        """Fetch the markets and return only the pairs whose index price changed since the last poll"""
+        session = await self.trading_client.markets_info.get_session()
+        headers = {'If-None-Match': self._etag} if self._etag else {}
+
+        start = time.perf_counter()
+        async with session.get(self.markets_url, headers=headers) as response:
+            payload = await response.read()
+            latency_ms = (time.perf_counter() - start) * 1000
+            if self.profiler.enabled:
+                self.profiler.add('stork.fetch', int(latency_ms * 1e6))
+
+            self.poll_count += 1
+            self.poll_latencies_ms.append(latency_ms)
+            self.payload_sizes.append(len(payload))
+            self.total_payload_bytes += len(payload)
+
+            if response.status == 304:
+                self.not_modified_count += 1
+                return {}
+
+            if self.on_raw is not None:
+                self.on_raw(payload)
+            response_text = payload.decode('utf-8')
+            handle_known_errors(self.markets_url, None, response, response_text)
+            self._etag = response.headers.get('ETag')
+
+        return self.apply_payload(response_text)
+
+    def apply_payload(self, response_text) -> Dict[str, float]:
+        """Parse a markets payload and return the pairs whose index price changed"""
+        start_ns = time.perf_counter_ns() if self.profiler.enabled else 0
+        markets = parse_response_to_model(response_text, List[MarketModel])
+        assert markets.data is not None
+
+        changed = {}
+        changed_ids = self.changed_ids = []
+        names = PAIRS.names
+        for market in markets.data:
+            pair_id = self.market_ids.get(market.name)
+            if pair_id is None:
+                continue
+            pair = names[pair_id]
+            if (hasattr(market, 'market_stats') and
+                market.market_stats is not None and
+                market.market_stats.mark_price is not None):
+                price = float(market.market_stats.index_price)
+                if self.last_prices.get(pair) != price:
+                    changed[pair] = price
+                    if len(changed) > len(changed_ids):
+                        changed_ids.append(pair_id)
+        self.last_prices.update(changed)
+        if self.profiler.enabled:
+            self.profiler.add('stork.parse', time.perf_counter_ns() - start_ns)
+        return changed
+
+    def get_stats(self) -> Optional[Dict[str, float]]:
+        """Latency and payload size of recent polls"""
+        if not self.poll_latencies_ms:
+            return None
+        latencies = np.fromiter(self.poll_latencies_ms, dtype=float)
+        return {
+            'polls': self.poll_count,
+            'not_modified': self.not_modified_count,
+            'mean_latency_ms': float(np.mean(latencies)),
+            'p50_latency_ms': float(np.percentile(latencies, 50)),
+            'p99_latency_ms': float(np.percentile(latencies, 99)),
+            'mean_payload_bytes': float(np.mean(self.payload_sizes)),
+            'total_payload_bytes': self.total_payload_bytes
+        }
+
+    async def close(self):
+        await self.trading_client.close()
+
 async def retrieve_stork_prices() -> Optional[Dict[str, float]]:
     """
     Retrieves real-time price data from Stork Network for various cryptocurrency pairs.
-    
+
     Returns:
         Dict[str, float]: A dictionary mapping trading pairs to their current prices,
                          or None if an error occurs
     """
-    price_map = {}
-
     try:
-        # Create a new trading client
-        trading_client = PerpetualTradingClient(MAINNET_CONFIG, None)
+        client = StorkClient()
         try:
-            markets = await trading_client.markets_info.get_markets()
-            assert markets.data is not None
-            markets_cache = {m.name: m for m in markets.data}
-
-            for market_pair in MARKET_PAIRS:
-                if market_pair in markets_cache:
-                    market = markets_cache[market_pair]
-                    if (hasattr(market, 'market_stats') and 
-                        market.market_stats is not None and 
-                        market.market_stats.mark_price is not None):
-                        normalized_pair = market_pair.replace("-", "")
-                        price_map[normalized_pair] = float(market.market_stats.index_price)
+            return await client.poll()
         finally:
             # Ensure the session is closed
-            await trading_client.close()
-
-        return price_map
+            await client.close()
 
     except Exception as e:
         print(f'Error fetching data from Stork: {e}')
@@ -50,15 +145,20 @@ async def retrieve_stork_prices() -> Optional[Dict[str, float]]:
 
 if __name__ == "__main__":
     import asyncio
-    
+
     async def main():
-        while True:
-            prices = await retrieve_stork_prices()
-            if prices:
-                for pair, price in prices.items():
-                    print(f"{pair}: {price}")
-            else:
-                print("Failed to retrieve prices")
+        client = StorkClient()
+        try:
+            while True:
+                try:
+                    prices = await client.poll()
+                    for pair, price in prices.items():
+                        print(f"{pair}: {price}")
+                    print(client.get_stats())
+                except Exception as e:
+                    print(f"Failed to retrieve prices: {e}")
+                await asyncio.sleep(1)
+        finally:
+            await client.close()
 
     asyncio.run(main())
-
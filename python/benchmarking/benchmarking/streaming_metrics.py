@@ -0,0 +1,145 @@
+import math
+import threading
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+from scipy import stats
+
+REFERENCE_SOURCES = ('pyth', 'stork')
+
+
+class RunningDeviation:
+    """Running MSE and mean delta of Pragma against a reference, O(1) per sample"""
+
+    def __init__(self):
+        self.count = 0
+        self.sum_squared_error = 0.0
+        self.sum_delta = 0.0
+        self.sum_delta_pct = 0.0
+        # Samples with a percentage delta; a zero Pragma price has none
+        self.count_pct = 0
+        self.max_abs_delta = 0.0
+
+    def add(self, pragma_price: float, reference_price: float):
+        delta = pragma_price - reference_price
+        self.count += 1
+        self.sum_squared_error += delta * delta
+        self.sum_delta += delta
+        if pragma_price != 0:
+            self.sum_delta_pct += (delta * 100) / pragma_price
+            self.count_pct += 1
+        self.max_abs_delta = max(self.max_abs_delta, abs(delta))
+
+    @property
+    def mse(self) -> Optional[float]:
+        return self.sum_squared_error / self.count if self.count else None
+
+    @property
+    def mean_delta(self) -> Optional[float]:
+        return self.sum_delta / self.count if self.count else None
+
+    @property
+    def mean_delta_pct(self) -> Optional[float]:
+        return self.sum_delta_pct / self.count_pct if self.count_pct else None
+
+
+class WindowedSpearman:
+    """
+    Spearman rank correlation over the last ``window`` samples.
+
+    Both coordinates are kept in sorted lists alongside the insertion-ordered
+    window, so adding a sample is a bisect plus a memmove and ranks (with the
+    average rule for ties, as in ``scipy.stats.spearmanr``) are read off the
+    sorted lists with ``searchsorted`` only when the correlation is queried.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples = deque()
+        self._sorted_x = []
+        self._sorted_y = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, x: float, y: float):
+        with self._lock:
+            self._samples.append((x, y))
+            insort(self._sorted_x, x)
+            insort(self._sorted_y, y)
+            if len(self._samples) > self.window:
+                old_x, old_y = self._samples.popleft()
+                del self._sorted_x[bisect_left(self._sorted_x, old_x)]
+                del self._sorted_y[bisect_left(self._sorted_y, old_y)]
+
+    def correlation(self):
+        """Return (correlation, p_value), or (None, None) if undefined for the window"""
+        with self._lock:
+            samples = np.array(self._samples)
+            sorted_x = np.array(self._sorted_x)
+            sorted_y = np.array(self._sorted_y)
+
+        n = len(samples)
+        if n < 2 or sorted_x[0] == sorted_x[-1] or sorted_y[0] == sorted_y[-1]:
+            return None, None
+
+        rank_x = self._average_ranks(sorted_x, samples[:, 0])
+        rank_y = self._average_ranks(sorted_y, samples[:, 1])
+        rho = float(np.corrcoef(rank_x, rank_y)[0, 1])
+
+        if n < 3 or abs(rho) >= 1.0:
+            return rho, 0.0
+        t = rho * math.sqrt((n - 2) / (1.0 - rho * rho))
+        return rho, float(2 * stats.t.sf(abs(t), n - 2))
+
+    @staticmethod
+    def _average_ranks(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+        left = np.searchsorted(sorted_values, values, side='left')
+        right = np.searchsorted(sorted_values, values, side='right')
+        return (left + right + 1) / 2.0
+
+
+class StreamingMetrics:
+    """Per pair x reference source deviation and windowed rank correlation, updated per tick"""
+
+    def __init__(self, correlation_window: int = 1000):
+        self.correlation_window = correlation_window
+        self._deviation: Dict[tuple, RunningDeviation] = {}
+        self._spearman: Dict[tuple, WindowedSpearman] = {}
+
+    def update(self, pragma: Dict, references: Dict[str, Dict]):
+        """Fold one Pragma message, with the reference prices matched to it, into the running statistics"""
+        for pair, data in pragma.items():
+            pragma_price = data['price']
+            for source, prices in references.items():
+                reference_price = prices.get(pair)
+                if reference_price is None:
+                    continue
+                key = (pair, source)
+                if key not in self._deviation:
+                    self._deviation[key] = RunningDeviation()
+                    self._spearman[key] = WindowedSpearman(self.correlation_window)
+                self._deviation[key].add(pragma_price, reference_price)
+                self._spearman[key].add(pragma_price, reference_price)
+
+    def get(self, pair: str) -> Dict[str, Dict]:
+        """Current metrics for a pair, keyed by reference source"""
+        metrics = {}
+        for source in REFERENCE_SOURCES:
+            deviation = self._deviation.get((pair, source))
+            if deviation is None or deviation.count < 2:
+                continue
+            correlation, p_value = self._spearman[(pair, source)].correlation()
+            metrics[source] = {
+                'mse': deviation.mse,
+                'mean_delta': deviation.mean_delta,
+                'mean_delta_pct': deviation.mean_delta_pct,
+                'max_abs_delta': deviation.max_abs_delta,
+                'correlation': correlation,
+                'p_value': p_value,
+                'count': deviation.count
+            }
+        return metrics
@@ -0,0 +1,89 @@
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+from pragma_decoder import PRICE_SCALE
+
+PUBLISHER_KEYS = [
+    "0x624EBFB99865079BD58CFCFB925B6F5CE940D6F6E41E118B8A72B7163FB435C",
+    "0x04e2863fd0ff85803eef98ce5dd8272ab21c6595537269a2cd855a10ebcc18cc",
+    "0x0279fde026e3e6cceacb9c263fece0c8d66a8f59e8448f3da5a1968976841c62",
+    "0x009d84fae6d6a8eff16f7729e755a9084896352cae5d7f0518f43da98ff4d903"
+]
+
+BASE_PRICES = {
+    'BTC': 67_000.0, 'ETH': 2_600.0, 'SOL': 150.0, 'BNB': 580.0
+}
+
+
+def encode_short_string(text: str) -> str:
+    """Encode an ASCII string as a hex felt, the inverse of ``decode_short_string``"""
+    return hex(int.from_bytes(text.encode('ascii'), byteorder='big'))
+
+
+def synthetic_pairs(count: int) -> List[str]:
+    """``count`` pair names, starting with the real ``BASE_PRICES`` assets"""
+    assets = list(BASE_PRICES) + [f"A{i}" for i in range(max(0, count - len(BASE_PRICES)))]
+    return [f"{asset}/USD" for asset in assets[:count]]
+
+
+def publisher_keys(count: int) -> List[str]:
+    return PUBLISHER_KEYS[:count] + [hex(0xBEEF0000 + i) for i in range(max(0, count - len(PUBLISHER_KEYS)))]
+
+
+class PriceWalk:
+    """Seeded random walk per pair so synthetic feeds are reproducible"""
+
+    def __init__(self, pairs: List[str], seed: int = 0, volatility: float = 0.0005):
+        self.rng = random.Random(seed)
+        self.volatility = volatility
+        self.prices = {pair: BASE_PRICES.get(pair.split('/')[0], 10.0 + i) for i, pair in enumerate(pairs)}
+
+    def step(self) -> Dict[str, float]:
+        for pair, price in self.prices.items():
+            self.prices[pair] = price * (1 + self.rng.gauss(0, self.volatility))
+        return self.prices
+
+
+def make_oracle_prices_message(
+    prices: Dict[str, float],
+    publishers: List[str],
+    rng: random.Random,
+    timestamp: Optional[float] = None,
+    spread: float = 0.0002
+) -> Dict:
+    """Build a Pragma ``subscribe`` payload with one signed price per publisher and pair"""
+    timestamp = time.time() if timestamp is None else timestamp
+    oracle_prices = []
+    for pair, price in prices.items():
+        global_asset_id = encode_short_string(pair)
+        signed_prices = []
+        for key in publishers:
+            publisher_price = price * (1 + rng.uniform(-spread, spread))
+            signed_prices.append({
+                "oracle_asset_id": global_asset_id,
+                "oracle_price": str(int(publisher_price * PRICE_SCALE)),
+                "signing_key": key,
+                "signature": hex(rng.getrandbits(252)),
+                "timestamp": str(int(timestamp) - rng.randint(0, 2))
+            })
+        oracle_prices.append({
+            "global_asset_id": global_asset_id,
+            "median_price": str(int(price * PRICE_SCALE)),
+            "signature": hex(rng.getrandbits(252)),
+            "signed_prices": signed_prices
+        })
+    return {"oracle_prices": oracle_prices, "timestamp": int(timestamp * 1000)}
+
+
+def recorded_pragma_messages(count: int, pairs: int = 4, publishers: int = 4, seed: int = 0) -> List[str]:
+    """``count`` serialized Pragma messages as they arrive off the WebSocket"""
+    walk = PriceWalk(synthetic_pairs(pairs), seed=seed)
+    keys = publisher_keys(publishers)
+    rng = random.Random(seed)
+    start = 1_700_000_000
+    return [
+        json.dumps(make_oracle_prices_message(walk.step(), keys, rng, timestamp=start + i))
+        for i in range(count)
+    ]
@@ -0,0 +1,36 @@
+"""Fixtures of the benchmark suite; settings and helpers are in ``harness.py``"""
+from typing import Callable, Dict
+
+import pytest
+
+from .harness import BenchmarkResults, load_baseline, measure
+
+
+@pytest.fixture(scope='session')
+def benchmark_results():
+    results = BenchmarkResults(load_baseline())
+    yield results
+    results.write()
+
+
+@pytest.fixture
+def bench(benchmark_results, request):
+    """``bench(fn, per=1, **params)``: time ``fn``, record it under the test id, fail on a regression"""
+
+    def timed(fn: Callable, per: int) -> Dict[str, float]:
+        timing = measure(fn)
+        if per > 1:
+            timing = {**timing, 'min_s': timing['min_s'] / per, 'median_s': timing['median_s'] / per, 'per': per}
+        return timing
+
+    def run(fn: Callable, per: int = 1, **params) -> Dict[str, float]:
+        timing = timed(fn, per)
+        if benchmark_results.regressed(request.node.name, timing):
+            # Confirm with a second measurement so a burst of load elsewhere is not reported
+            timing = min(timing, timed(fn, per), key=lambda t: t['min_s'])
+        regression = benchmark_results.record(request.node.name, timing, **params)
+        if regression:
+            pytest.fail(regression)
+        return timing
+
+    return run
@@ -0,0 +1,226 @@
+"""
+Benchmark harness: timing, the synthetic history and the results / baseline files.
+
+Sizes are chosen by environment variables so the full scaling matrix and
+a quick run use the same tests:
+
+    BENCH_SIZES            history entries, default ``1000,100000,1000000`` (quick: ``1000``)
+    BENCH_PAIRS            pair counts, default ``4,29,200``
+    BENCH_MAX_CELLS        opt-in: skip histories above this many stored prices
+    BENCH_COMPARE          set to 1 to fail tests slower than the baseline; otherwise
+                           the ratio is only written to the results file
+    BENCH_THRESHOLD        allowed slowdown against the baseline, default 0.3 (30%)
+    BENCH_RESULTS          results file, default ``tests/benchmark_results.json``
+    BENCH_BASELINE         baseline file, default ``tests/benchmark_baseline.json``
+    BENCH_UPDATE_BASELINE  set to 1 to write this run's timings as the baseline
+"""
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'benchmarking'))
+
+from history_store import HistoryStore, REFERENCE_SOURCES  # noqa: E402
+from pair_registry import PairRegistry  # noqa: E402
+from synthetic_data import BASE_PRICES, publisher_keys, synthetic_pairs  # noqa: E402
+
+
+def _int_list(name: str, default: str) -> List[int]:
+    return [int(value) for value in os.environ.get(name, default).split(',') if value.strip()]
+
+
+SIZES = _int_list('BENCH_SIZES', '1000,100000,1000000')
+PAIR_COUNTS = _int_list('BENCH_PAIRS', '4,29,200')
+MAX_CELLS = int(float(os.environ['BENCH_MAX_CELLS'])) if os.environ.get('BENCH_MAX_CELLS') else None
+THRESHOLD = float(os.environ.get('BENCH_THRESHOLD', 0.3))
+RESULTS_PATH = os.environ.get('BENCH_RESULTS', os.path.join(HERE, 'benchmark_results.json'))
+BASELINE_PATH = os.environ.get('BENCH_BASELINE', os.path.join(HERE, 'benchmark_baseline.json'))
+UPDATE_BASELINE = os.environ.get('BENCH_UPDATE_BASELINE', '') not in ('', '0')
+# Timings only compare with a baseline taken on the same, idle machine, so failing on them is opt-in
+COMPARE = os.environ.get('BENCH_COMPARE', '') not in ('', '0')
+
+PUBLISHERS = 2
+# Pragma ticks per second and reference updates per Pragma tick in the synthetic history
+TICK_SECONDS = 1.0
+PYTH_EVERY = 1
+STORK_EVERY = 5
+
+# Target wall time of one timed repeat, and repeats per benchmark; calls slower
+# than SLOW_CALL_S (the large analytics cells) get SLOW_REPEATS
+MIN_REPEAT_S = 0.1
+REPEATS = 7
+SLOW_CALL_S = 1.0
+SLOW_REPEATS = 3
+# Full-size (rows, pairs) arrays the analytics allocate on top of the history
+WORKING_ARRAYS = 8
+
+
+def history_cells(entries: int, pairs: int, components: bool = True) -> int:
+    """Prices a synthetic history stores: Pragma medians, optionally components, and both references"""
+    return entries * pairs * (1 + (PUBLISHERS if components else 0) + len(REFERENCE_SOURCES))
+
+
+def _available_memory() -> Optional[int]:
+    """MemAvailable in bytes where /proc/meminfo exists"""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def skip_if_too_large(entries: int, pairs: int, components: bool = True):
+    """
+    Skip a cell over ``BENCH_MAX_CELLS`` when that is set, or one that would
+    not fit in this machine's memory (the ring buffers hold every row twice)
+    """
+    cells = history_cells(entries, pairs, components)
+    if MAX_CELLS is not None and cells > MAX_CELLS:
+        pytest.skip(f"{entries} x {pairs} pairs needs {cells:,} cells > BENCH_MAX_CELLS={MAX_CELLS:,}")
+    needed = 8 * (2 * cells + WORKING_ARRAYS * entries * pairs)
+    available = _available_memory()
+    if available is not None and needed > available:
+        pytest.skip(f"{entries} x {pairs} pairs needs ~{needed / 2 ** 30:.1f} GiB, "
+                    f"{available / 2 ** 30:.1f} GiB available")
+
+
+def measure(fn: Callable, min_repeat_s: float = MIN_REPEAT_S, repeats: int = REPEATS) -> Dict[str, float]:
+    """
+    Seconds per call of ``fn``: calls are batched until one repeat takes at
+    least ``min_repeat_s``, and the minimum and median over ``repeats`` are
+    kept. The minimum is what the regression check compares, being the least
+    disturbed by other load on the machine.
+    """
+    def run(number: int) -> float:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        return (time.perf_counter_ns() - start) / 1e9
+
+    # As timeit does, keep collections of the setup's garbage out of the timings
+    gc_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        number = 1
+        while True:
+            elapsed = run(number)
+            if elapsed >= min_repeat_s or number >= 1 << 20:
+                break
+            number *= 2 if elapsed == 0 else max(2, min(10, int(min_repeat_s / elapsed) + 1))
+        if elapsed / number >= SLOW_CALL_S:
+            repeats = min(repeats, SLOW_REPEATS)
+        times = [elapsed / number] + [run(number) / number for _ in range(repeats - 1)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    times.sort()
+    return {'min_s': times[0], 'median_s': times[len(times) // 2], 'number': number, 'repeats': repeats}
+
+
+def pair_prices(pairs: List[str]) -> np.ndarray:
+    return np.array([BASE_PRICES.get(pair.split('/')[0], 10.0 + i) for i, pair in enumerate(pairs)])
+
+
+def price_walk(entries: int, pairs: List[str], rng: np.random.Generator, volatility: float = 0.0005) -> np.ndarray:
+    """(entries, pairs) seeded random walk starting from each pair's base price"""
+    steps = rng.normal(0.0, volatility, size=(entries, len(pairs)))
+    return pair_prices(pairs) * np.exp(np.cumsum(steps, axis=0))
+
+
+def synthetic_history(entries: int, pair_count: int, components: bool = True, seed: int = 0) -> HistoryStore:
+    """
+    A full ``HistoryStore`` of ``entries`` Pragma ticks, with ``PUBLISHERS``
+    component prices per pair unless ``components`` is False, and Pyth and
+    Stork updates slightly after them. Built by each test that needs one and
+    freed with it, so the largest cells only need one history's memory.
+    """
+    skip_if_too_large(entries, pair_count, components)
+    rng = np.random.default_rng(seed)
+    pairs = synthetic_pairs(pair_count)
+    keys = publisher_keys(PUBLISHERS) if components else []
+    history = HistoryStore(capacity=entries, registry=PairRegistry())
+
+    timestamps = 1_700_000_000.0 + np.arange(entries) * TICK_SECONDS
+    medians = price_walk(entries, pairs, rng)
+    component_prices = {
+        pair: {key: medians[:, j] * (1 + rng.normal(0.0, 0.0002, entries)) for key in keys}
+        for j, pair in enumerate(pairs)
+    }
+    history.extend('pragma', timestamps, {pair: medians[:, j] for j, pair in enumerate(pairs)}, component_prices)
+    del component_prices
+
+    for source, every in (('pyth', PYTH_EVERY), ('stork', STORK_EVERY)):
+        rows = slice(None, None, every)
+        reference = medians[rows] * (1 + rng.normal(0.0, 0.0005, medians[rows].shape))
+        history.extend(source, timestamps[rows] + 0.3 * TICK_SECONDS,
+                       {pair: reference[:, j] for j, pair in enumerate(pairs)})
+    return history
+
+
+class BenchmarkResults:
+    """Timings of this run, compared against a stored baseline"""
+
+    def __init__(self, baseline: Optional[Dict[str, Dict]] = None):
+        self.baseline = baseline or {}
+        self.results: Dict[str, Dict] = {}
+
+    def regressed(self, name: str, timing: Dict[str, float]) -> bool:
+        """Whether ``timing`` is beyond ``THRESHOLD`` of the baseline; never unless ``COMPARE`` is set"""
+        reference = self.baseline.get(name)
+        return COMPARE and bool(reference) and timing['min_s'] > reference['min_s'] * (1 + THRESHOLD)
+
+    def record(self, name: str, timing: Dict[str, float], **params) -> Optional[str]:
+        """Store one timing with its ratio to the baseline; returns a message if it regressed"""
+        entry = {**params, **timing}
+        reference = self.baseline.get(name)
+        if not reference:
+            self.results[name] = entry
+            return None
+        entry['baseline_min_s'] = reference['min_s']
+        entry['ratio'] = timing['min_s'] / reference['min_s']
+        self.results[name] = entry
+        if not self.regressed(name, timing):
+            return None
+        return (f"{name}: {timing['min_s'] * 1e6:.1f} µs vs baseline {reference['min_s'] * 1e6:.1f} µs "
+                f"({entry['ratio']:.2f}x, threshold {1 + THRESHOLD:.2f}x)")
+
+    def write(self):
+        if not self.results:
+            return
+        meta = {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpus': os.cpu_count(),
+            'threshold': THRESHOLD
+        }
+        with open(RESULTS_PATH, 'w') as f:
+            json.dump({'meta': meta, 'results': self.results}, f, indent=2, sort_keys=True)
+        if UPDATE_BASELINE:
+            baseline = {**self.baseline}
+            for name, entry in self.results.items():
+                baseline[name] = {key: value for key, value in entry.items()
+                                  if key not in ('baseline_min_s', 'ratio')}
+            with open(BASELINE_PATH, 'w') as f:
+                json.dump({'meta': meta, 'results': baseline}, f, indent=2, sort_keys=True)
+
+
+def load_baseline() -> Dict[str, Dict]:
+    if UPDATE_BASELINE or not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)['results']
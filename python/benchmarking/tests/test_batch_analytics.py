@@ -0,0 +1,60 @@
+"""Ranks and statistics of ``batch_analytics`` against scipy and the streaming metrics"""
+import numpy as np
+import pytest
+from scipy import stats
+
+from batch_analytics import column_statistics, rank_rows
+from streaming_metrics import RunningDeviation
+
+
+@pytest.mark.parametrize('shape', [(1, 1), (5, 7), (40, 200)])
+def test_rank_rows_matches_rankdata(shape):
+    rng = np.random.default_rng(shape[1])
+    # Few distinct values, so most rows have ties
+    values = rng.integers(0, 10, shape).astype(float)
+    valid = rng.random(shape) < 0.8
+
+    ranks = rank_rows(values, valid)
+    for row in range(shape[0]):
+        kept = valid[row]
+        np.testing.assert_allclose(ranks[row, kept], stats.rankdata(values[row, kept]))
+        # Entries that are not valid rank after every valid one
+        assert (ranks[row, ~kept] > kept.sum()).all()
+
+
+def test_rank_rows_ignores_values_at_invalid_entries():
+    values = np.array([[3.0, np.nan, 1.0, np.inf, 3.0]])
+    valid = np.array([[True, False, True, False, True]])
+    np.testing.assert_allclose(rank_rows(values, valid)[0, valid[0]], [2.5, 1.0, 2.5])
+
+
+def test_column_statistics_match_scipy_per_column():
+    rng = np.random.default_rng(0)
+    pragma = 100 + np.cumsum(rng.normal(0, 1, (300, 3)), axis=0)
+    reference = pragma + rng.normal(0, 0.5, pragma.shape)
+    reference[rng.random(pragma.shape) < 0.2] = np.nan
+    reference[:, 2] = np.nan
+
+    columns = column_statistics(pragma, reference)
+    for j in range(2):
+        matched = ~np.isnan(reference[:, j])
+        rho, p_value = stats.spearmanr(pragma[matched, j], reference[matched, j])
+        assert columns['count'][j] == matched.sum()
+        assert columns['correlation'][j] == pytest.approx(rho)
+        assert columns['p_value'][j] == pytest.approx(p_value)
+        assert columns['mse'][j] == pytest.approx(np.mean((pragma[matched, j] - reference[matched, j]) ** 2))
+    assert columns['count'][2] == 0 and np.isnan(columns['correlation'][2])
+
+
+def test_zero_prices_have_no_percentage_delta():
+    pragma = np.array([[100.0], [0.0], [102.0]])
+    reference = np.array([[101.0], [99.0], [101.0]])
+    deviation = RunningDeviation()
+    for p, r in zip(pragma[:, 0], reference[:, 0]):
+        deviation.add(p, r)
+
+    columns = column_statistics(pragma, reference)
+    expected = np.mean([-100 / 100.0, 100 / 102.0])
+    assert deviation.count == columns['count'][0] == 3
+    assert deviation.mean_delta_pct == pytest.approx(expected)
+    assert columns['mean_delta_pct'][0] == pytest.approx(expected)
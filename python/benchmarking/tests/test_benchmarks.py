@@ -0,0 +1,149 @@
+"""
+Microbenchmarks of the collector's hot paths and analytics on synthetic data,
+at each history size in ``BENCH_SIZES`` and pair count in ``BENCH_PAIRS``
+(see ``harness.py``). Timings go to ``benchmark_results.json``; a test fails
+when it is more than ``BENCH_THRESHOLD`` slower than the stored baseline.
+
+    python -m pytest tests                                       # full matrix
+    BENCH_SIZES=1000 python -m pytest tests                      # 1k entries, quick
+    BENCH_UPDATE_BASELINE=1 python -m pytest tests               # record the baseline
+
+Each test also checks the result, so a fast wrong answer is not a speedup.
+"""
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+from batch_analytics import pair_metrics, source_metrics
+from CLI_monitoring import calculate_metrics
+from .harness import PAIR_COUNTS, PUBLISHERS, SIZES, pair_prices, synthetic_history
+from price_collector import PriceCollector
+from synthetic_data import encode_short_string, publisher_keys, synthetic_pairs
+
+sizes = pytest.mark.parametrize('entries', SIZES)
+pair_counts = pytest.mark.parametrize('pair_count', PAIR_COUNTS)
+
+
+@pytest.fixture
+def collector():
+    return PriceCollector(profile=False)
+
+
+def pragma_prices(pairs, prices, keys):
+    """Pragma prices as ``latest_prices['pragma']`` holds them"""
+    return {
+        pair: {'price': float(price), 'component': {key: float(price) for key in keys}}
+        for pair, price in zip(pairs, prices)
+    }
+
+
+@pair_counts
+def test_decode_short_string(bench, collector, pair_count):
+    pairs = synthetic_pairs(pair_count)
+    felts = [encode_short_string(pair) for pair in pairs]
+    decode = collector.decode_short_string
+    assert [decode(felt) for felt in felts] == pairs
+
+    bench(lambda: [decode(felt) for felt in felts], per=pair_count, pairs=pair_count)
+
+
+@pair_counts
+def test_format_price(bench, collector, pair_count):
+    raw = [str(int(price * 1e8)) for price in pair_prices(synthetic_pairs(pair_count))]
+    format_price = collector.format_price
+    assert format_price(raw[0]) == pytest.approx(float(raw[0]) / 1e8)
+
+    bench(lambda: [format_price(price) for price in raw], per=pair_count, pairs=pair_count)
+
+
+@sizes
+@pair_counts
+def test_update_price_history(bench, collector, entries, pair_count):
+    """Steady-state append of one Pragma message to a full history of ``entries`` rows"""
+    collector.history = synthetic_history(entries, pair_count)
+    pairs = synthetic_pairs(pair_count)
+    collector.latest_prices = {**collector.latest_prices,
+                               'pragma': pragma_prices(pairs, pair_prices(pairs), publisher_keys(PUBLISHERS))}
+    # Resolved once, as the decoder does
+    pair_ids = [collector.history.registry.ids[pair] for pair in pairs]
+    clock = itertools.count(collector.history.timestamps()[-1] + 1)
+
+    bench(lambda: collector._update_price_history(next(clock), pair_ids), entries=entries, pairs=pair_count)
+    assert len(collector.history) == entries
+    assert collector.get_metrics(pairs[0])['pyth']['count'] > 0
+
+
+@sizes
+def test_get_latency_metrics(bench, collector, entries):
+    """Summaries of a windowed histogram holding ``entries`` inter-arrival samples from the last hour"""
+    rng = np.random.default_rng(0)
+    # Slots are keyed on the monotonic clock, as the collector records them
+    now = time.monotonic()
+    times = now - 3600 * (1 - np.arange(entries) / entries)
+    for value, at in zip(rng.gamma(2.0, 50.0, entries).tolist(), times.tolist()):
+        collector.inter_arrival.record_ms(value, at)
+    assert collector.get_latency_metrics()['count'] == entries
+    assert collector.get_latency_metrics(60)['count'] > 0
+
+    bench(lambda: (collector.get_latency_metrics(), collector.get_latency_metrics(60)), entries=entries)
+
+
+@pair_counts
+def test_calculate_missed_slots(bench, collector, pair_count):
+    """
+    Report after an hour of one-second ticks. The tracker's state is bounded
+    by that horizon, not by the history size, so there is no size axis.
+    """
+    pairs = synthetic_pairs(pair_count)
+    keys = publisher_keys(PUBLISHERS)
+    ticks = 3600
+    rng = np.random.default_rng(0)
+    walk = pair_prices(pairs) * np.exp(np.cumsum(rng.normal(0.0, 0.0005, (ticks, pair_count)), axis=0))
+    # Roughly one pair in ten repeats its previous price, a missed slot
+    stale = rng.random((ticks, pair_count)) < 0.1
+    walk[1:][stale[1:]] = walk[:-1][stale[1:]]
+    start = time.time() - ticks
+    for i, row in enumerate(walk):
+        collector.missed_slots.on_tick(pragma_prices(pairs, row, keys), start + i)
+
+    report = collector.calculate_missed_slots()
+    assert report is not None
+
+    bench(collector.calculate_missed_slots, pairs=pair_count, ticks=ticks)
+
+
+@sizes
+@pair_counts
+def test_cli_calculate_metrics(bench, entries, pair_count):
+    """The CLI's Pragma vs Pyth statistics, called once per pair"""
+    history = synthetic_history(entries, pair_count, components=False)
+    pairs = synthetic_pairs(pair_count)
+    correlation, p_value, mse, count = calculate_metrics(history, pairs[0])
+    # The first Pragma tick precedes every Pyth update
+    assert count == entries - 1 and correlation > 0.9
+
+    bench(lambda: [calculate_metrics(history, pair) for pair in pairs], entries=entries, pairs=pair_count)
+
+
+@sizes
+@pair_counts
+def test_gui_calculate_metrics(bench, entries, pair_count):
+    """The dashboard's opt-in full-history statistics against Pyth and Stork (``source_metrics``), called once per pair"""
+    history = synthetic_history(entries, pair_count, components=False)
+    pairs = synthetic_pairs(pair_count)
+    assert set(source_metrics(history, pairs[0])) == {'pyth', 'stork'}
+
+    bench(lambda: [source_metrics(history, pair) for pair in pairs], entries=entries, pairs=pair_count)
+
+
+@sizes
+@pair_counts
+def test_pair_metrics(bench, entries, pair_count):
+    """Every pair and source in one batch, for comparison with the per-pair calls above"""
+    history = synthetic_history(entries, pair_count, components=False)
+    pairs = synthetic_pairs(pair_count)
+    assert len(pair_metrics(history, pairs, workers=1)) == 2 * pair_count
+
+    bench(lambda: pair_metrics(history, pairs, workers=1), entries=entries, pairs=pair_count)
@@ -0,0 +1,123 @@
+"""A capture written by ``capture_log`` and replayed through ``replay`` reproduces the live session"""
+import asyncio
+import json
+import os
+
+import numpy as np
+import pytest
+
+from capture_log import CaptureRecord, CaptureWriter, list_segments, read_capture
+from price_collector import PriceCollector
+from pyth_fetcher import PYTH_PAIRS
+from replay import replay
+from synthetic_data import recorded_pragma_messages
+
+START_NS = 1_700_000_000 * 10 ** 9
+PYTH_ID, PYTH_PAIR = next(iter(PYTH_PAIRS.items()))
+
+
+def pyth_event(price: float) -> bytes:
+    quote = {'price': str(int(price * 1e8)), 'conf': '0', 'expo': -8, 'publish_time': 0}
+    return json.dumps({'parsed': [{'id': PYTH_ID, 'price': quote}]}).encode()
+
+
+def session(count=20):
+    """Records of a short session: a Pragma frame every second, a Pyth event after every other one"""
+    records = []
+    for i, message in enumerate(recorded_pragma_messages(count)):
+        at = START_NS + i * 10 ** 9
+        records.append(CaptureRecord('pragma', at, at, message.encode()))
+        if i % 2:
+            records.append(CaptureRecord('pyth', at + 3 * 10 ** 8, at + 3 * 10 ** 8, pyth_event(100.0 + i)))
+    return records
+
+
+def write_capture(directory, records, **options):
+    writer = CaptureWriter(str(directory), **options)
+    for record in records:
+        writer.record(record.source, record.data, record.monotonic_ns, record.wall_ns)
+    writer.close()
+    return writer
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_capture_reads_back_every_record(tmp_path, compress):
+    records = session()
+    writer = write_capture(tmp_path, records, compress=compress, max_segment_bytes=4096, batch_size=4)
+
+    assert len(list_segments(str(tmp_path))) > 1
+    assert writer.records_written == len(records)
+    assert list(read_capture(str(tmp_path))) == records
+
+
+def test_read_stops_at_a_record_cut_short(tmp_path):
+    records = session(4)
+    write_capture(tmp_path, records)
+    path, = list_segments(str(tmp_path))
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 5)
+
+    assert list(read_capture(str(tmp_path))) == records[:-1]
+
+
+def test_read_stops_at_a_truncated_gzip_segment(tmp_path):
+    records = session()
+    write_capture(tmp_path / 'cut', records, compress=True)
+    path, = list_segments(str(tmp_path / 'cut'))
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) // 2)
+    # A segment created by a writer that crashed before its first write
+    (tmp_path / 'cut' / 'segment-999999-0.cap.gz').touch()
+
+    read = list(read_capture(str(tmp_path / 'cut')))
+    assert 0 < len(read) < len(records)
+    assert read == records[:len(read)]
+
+
+def test_replay_rebuilds_the_live_history(tmp_path):
+    records = session()
+    write_capture(tmp_path, records, compress=True)
+
+    live = PriceCollector(profile=False)
+
+    async def feed():
+        for record in records:
+            if record.source == 'pragma':
+                await live.handle_pragma_message(record.data.decode(), record.monotonic_ns, record.wall_ns / 1e9)
+            else:
+                await live.handle_pyth_payload(record.data, record.wall_ns / 1e9)
+
+    asyncio.run(feed())
+    report = asyncio.run(replay(read_capture(str(tmp_path)), PriceCollector(profile=False)))
+    replayed = report['collector']
+
+    assert report['errors'] == 0
+    assert report['messages'] == {'pragma': 20, 'pyth': 10}
+    assert report['history_entries'] == 20
+    live_history, replayed_history = live.get_history(), replayed.get_history()
+    np.testing.assert_array_equal(replayed_history.timestamps(), live_history.timestamps())
+    np.testing.assert_array_equal(replayed_history.timestamps('pyth'), live_history.timestamps('pyth'))
+    assert replayed_history.pairs('pragma') == live_history.pairs('pragma')
+    for pair in live_history.pairs('pragma'):
+        np.testing.assert_array_equal(replayed_history.prices('pragma', pair), live_history.prices('pragma', pair))
+    np.testing.assert_allclose(replayed_history.prices('pyth', PYTH_PAIR), 100.0 + np.arange(1, 20, 2))
+
+    # The decoded medians are the ones the frames carried
+    first = json.loads(records[0].data)['oracle_prices'][0]
+    assert replayed_history.prices('pragma', 'BTC/USD')[0] == pytest.approx(int(first['median_price']) / 1e8)
+
+
+def test_replay_reports_as_of_the_end_of_the_capture(tmp_path):
+    records = session()
+    write_capture(tmp_path, records)
+
+    report = asyncio.run(replay(read_capture(str(tmp_path)), PriceCollector(profile=False)))
+    collector, ended_ns = report['collector'], report['ended_ns']
+    assert ended_ns == records[-1].monotonic_ns
+
+    missed_slots = collector.calculate_missed_slots(ended_ns)
+    for pair, counts in missed_slots['per_pair'].items():
+        assert 0 <= counts['staleness_s'] <= report['captured_span_s']
+    # The whole 20 s session falls inside the last minute of the capture
+    assert missed_slots['windows']['1m']['global'] == missed_slots['global']
+    assert collector.get_latency_metrics(60, ended_ns)['count'] == 19
@@ -0,0 +1,41 @@
+"""A history sent by ``collector_daemon`` as a snapshot line loads back into an identical replica"""
+import json
+
+import numpy as np
+
+from collector_daemon import copy_history, encode_snapshot, load_snapshot
+from history_store import SOURCES, HistoryStore
+from pair_registry import PairRegistry
+
+
+def wrapped_history():
+    """A store that has wrapped, with pairs and publishers that come and go"""
+    history = HistoryStore(capacity=4, registry=PairRegistry())
+    for i in range(7):
+        t = 1_700_000_000.0 + i
+        prices = {'BTC/USD': {'price': 100.0 + i, 'component': {'a': 99.0 + i, 'b': 101.0 + i}}}
+        if i % 2:
+            prices['ETH/USD'] = {'price': 10.0 + i, 'component': {'c': 10.5 + i}}
+        history.append('pragma', t, prices)
+        history.append('pyth', t + 0.3, {'BTC/USD': 100.1 + i})
+        if i % 3 == 0:
+            history.append('stork', t + 0.6, {'ETH/USD': 10.2 + i})
+    return history
+
+
+def test_snapshot_round_trip_rebuilds_the_history():
+    original = wrapped_history()
+    line = json.loads(encode_snapshot(copy_history(original)))
+    replica = HistoryStore(capacity=4, registry=PairRegistry())
+    load_snapshot(replica, line['series'])
+
+    for source in SOURCES:
+        np.testing.assert_array_equal(replica.timestamps(source), original.timestamps(source))
+        assert replica.pairs(source) == original.pairs(source)
+        for pair in original.pairs(source):
+            np.testing.assert_array_equal(replica.prices(source, pair), original.prices(source, pair))
+    for pair in original.pairs('pragma'):
+        assert replica.publishers(pair) == original.publishers(pair)
+        for key in original.publishers(pair):
+            np.testing.assert_array_equal(replica.component(pair, key), original.component(pair, key))
+    assert replica.latest() == original.latest()
@@ -0,0 +1,160 @@
+"""Ring buffer, as-of join and snapshot behavior of ``history_store``"""
+import math
+
+import numpy as np
+import pytest
+
+from history_store import HistoryStore, SeriesBuffer
+from pair_registry import PAIRS, PairRegistry
+from pragma_decoder import PragmaDecoder
+from synthetic_data import recorded_pragma_messages
+
+
+def store(capacity=100, **options):
+    return HistoryStore(capacity=capacity, registry=PairRegistry(), **options)
+
+
+def pragma(prices):
+    return {pair: {'price': price, 'component': {'key': price}} for pair, price in prices.items()}
+
+
+def test_series_buffer_wraparound_keeps_the_last_rows_in_order():
+    series = SeriesBuffer(('price',), capacity=3, direct_groups=('price',))
+    for i in range(1, 6):
+        series.append(float(i), {'price': {0: 10.0 * i}})
+
+    assert len(series) == 3 and series.appended == 5
+    np.testing.assert_array_equal(series.timestamps(), [3.0, 4.0, 5.0])
+    np.testing.assert_array_equal(series.column('price', 0), [30.0, 40.0, 50.0])
+    assert series.latest_row('price') == {0: 50.0}
+    assert series.latest_timestamp() == 5.0
+
+
+def test_series_buffer_views_are_read_only():
+    series = SeriesBuffer(('price',), capacity=3, direct_groups=('price',))
+    series.append(1.0, {'price': {0: 1.0}})
+    with pytest.raises(ValueError):
+        series.timestamps()[0] = 2.0
+
+
+def test_series_buffer_new_keys_after_wraparound():
+    series = SeriesBuffer(('component',), capacity=3, initial_width=1)
+    for i in range(1, 5):
+        series.append(float(i), {'component': {'a': float(i)}})
+    # A second and third key widen the buffer after it has wrapped
+    series.append(5.0, {'component': {'a': 5.0, 'b': 50.0}})
+    series.append(6.0, {'component': {'c': 600.0}})
+
+    np.testing.assert_array_equal(series.column('component', 'a'), [4.0, 5.0, np.nan])
+    np.testing.assert_array_equal(series.column('component', 'b'), [np.nan, 50.0, np.nan])
+    np.testing.assert_array_equal(series.column('component', 'c'), [np.nan, np.nan, 600.0])
+    np.testing.assert_array_equal(series.column('component', 'missing'), [np.nan] * 3)
+
+
+def test_series_buffer_extend_matches_appends_across_the_wrap():
+    appended = SeriesBuffer(('price',), capacity=4, direct_groups=('price',))
+    extended = SeriesBuffer(('price',), capacity=4, direct_groups=('price',))
+    appended.append(0.0, {'price': {0: 0.0}})
+    extended.append(0.0, {'price': {0: 0.0}})
+    timestamps = np.arange(1.0, 8.0)
+    for t in timestamps:
+        appended.append(t, {'price': {1: t * 2}})
+    extended.extend(timestamps, {'price': {1: timestamps * 2}})
+
+    assert extended.appended == appended.appended == 8
+    np.testing.assert_array_equal(extended.timestamps(), appended.timestamps())
+    for key in (0, 1):
+        np.testing.assert_array_equal(extended.column('price', key), appended.column('price', key))
+
+
+def test_series_buffer_evicts_rows_past_max_age():
+    series = SeriesBuffer(('price',), capacity=10, max_age=2.5, direct_groups=('price',))
+    for i in range(6):
+        series.append(float(i), {'price': {0: float(i)}})
+    np.testing.assert_array_equal(series.timestamps(), [3.0, 4.0, 5.0])
+
+
+def joined_store(**options):
+    history = store(**options)
+    for t in (1.0, 2.0, 3.0, 4.0, 5.0):
+        history.append('pragma', t, pragma({'BTC/USD': 100.0 + t, 'ETH/USD': 10.0 + t}))
+    history.append('pyth', 1.5, {'BTC/USD': 101.5})
+    history.append('pyth', 3.0, {'ETH/USD': 13.0})
+    history.append('pyth', 4.2, {'BTC/USD': 104.2})
+    return history
+
+
+def test_as_of_takes_the_last_observation_at_or_before_each_row():
+    history = joined_store()
+    np.testing.assert_array_equal(history.as_of('pyth', 'BTC/USD'), [np.nan, 101.5, 101.5, 101.5, 104.2])
+    # An observation at exactly a row's timestamp matches that row
+    np.testing.assert_array_equal(history.as_of('pyth', 'ETH/USD'), [np.nan, np.nan, 13.0, 13.0, 13.0])
+    np.testing.assert_array_equal(history.as_of('stork', 'BTC/USD'), [np.nan] * 5)
+
+
+def test_as_of_drops_matches_older_than_the_tolerance():
+    history = joined_store(match_tolerance=1.0)
+    np.testing.assert_array_equal(history.as_of('pyth', 'BTC/USD'), [np.nan, 101.5, np.nan, np.nan, 104.2])
+    # An explicit tolerance overrides the store's, None removes the limit
+    np.testing.assert_array_equal(history.as_of('pyth', 'BTC/USD', tolerance=None),
+                                  [np.nan, 101.5, 101.5, 101.5, 104.2])
+
+
+@pytest.mark.parametrize('tolerance', [None, 1.0, 0.0])
+def test_as_of_matrix_matches_as_of_per_pair(tolerance):
+    rng = np.random.default_rng(1)
+    history = store(capacity=500)
+    pairs = ['BTC/USD', 'ETH/USD', 'SOL/USD']
+    for t in np.cumsum(rng.exponential(1.0, 300)):
+        history.append('pragma', float(t), pragma({pair: float(rng.normal(100, 1)) for pair in pairs}))
+        delivered = [pair for pair in pairs if rng.random() < 0.4]
+        history.append('pyth', float(t) + 0.1,
+                       {pair: float(rng.normal(100, 1)) for pair in delivered})
+
+    queried = pairs + ['XRP/USD']
+    matrix = history.as_of_matrix('pyth', queried, tolerance=tolerance)
+    for j, pair in enumerate(queried):
+        np.testing.assert_array_equal(matrix[:, j], history.as_of('pyth', pair, tolerance=tolerance))
+
+
+def test_snapshot_is_unaffected_by_later_appends():
+    history = store(capacity=3)
+    for t in (1.0, 2.0, 3.0, 4.0):
+        history.append('pragma', t, pragma({'BTC/USD': t}))
+    history.append('pyth', 4.0, {'BTC/USD': 40.0})
+    snapshot = history.snapshot()
+    history.append('pragma', 5.0, pragma({'BTC/USD': 5.0, 'ETH/USD': 5.0}))
+    history.append('pyth', 5.0, {'BTC/USD': 50.0})
+
+    assert len(snapshot) == 3 and snapshot.appended('pragma') == 4
+    np.testing.assert_array_equal(snapshot.timestamps(), [2.0, 3.0, 4.0])
+    np.testing.assert_array_equal(snapshot.prices('pragma', 'BTC/USD'), [2.0, 3.0, 4.0])
+    assert snapshot.pairs('pragma') == ['BTC/USD']
+    assert snapshot.publishers('BTC/USD') == ['key']
+    latest = snapshot.latest()
+    assert latest['timestamp'] == 4.0 and latest['pyth_prices'] == {'BTC/USD': 40.0}
+    assert snapshot.store_id == history.store_id
+
+
+def test_snapshot_of_an_empty_store():
+    snapshot = store().snapshot()
+    assert len(snapshot) == 0 and snapshot.latest() is None
+    assert math.isnan(snapshot.as_of_matrix('pyth', ['BTC/USD'], np.array([1.0]))[0, 0])
+
+
+def test_append_with_the_decoders_pair_ids_matches_lookups():
+    decoder = PragmaDecoder()
+    looked_up, resolved = HistoryStore(capacity=10), HistoryStore(capacity=10)
+    for t, message in enumerate(recorded_pragma_messages(3)):
+        prices = decoder.decode(message, {})
+        assert [PAIRS.names[pair_id] for pair_id in decoder.pair_ids] == list(prices)
+        looked_up.append('pragma', float(t), prices)
+        resolved.append('pragma', float(t), prices, decoder.pair_ids)
+
+    assert resolved.pairs('pragma') == looked_up.pairs('pragma')
+    for pair in looked_up.pairs('pragma'):
+        np.testing.assert_array_equal(resolved.prices('pragma', pair), looked_up.prices('pragma', pair))
+        assert resolved.publishers(pair) == looked_up.publishers(pair) != []
+        for key, column in looked_up.components(pair).items():
+            np.testing.assert_array_equal(resolved.component(pair, key), column)
+    assert resolved.latest() == looked_up.latest()
@@ -0,0 +1,79 @@
+"""Overflow policies and delivery of ``snapshot_bus`` subscriptions"""
+import asyncio
+import threading
+
+import pytest
+
+from snapshot_bus import DROP_OLDEST, LATEST, SnapshotBus
+
+
+def publish(bus, count, source='pragma'):
+    for i in range(count):
+        bus.publish(source, float(i), {'BTC/USD': float(i)}, {})
+
+
+def test_drop_oldest_keeps_the_newest_maxsize_snapshots():
+    bus = SnapshotBus()
+    updates = bus.subscribe(maxsize=3, policy=DROP_OLDEST)
+    publish(bus, 5)
+
+    assert [snapshot.version for snapshot in updates.drain()] == [3, 4, 5]
+    assert updates.dropped == 2
+    assert updates.get(timeout=0) is None
+
+
+def test_latest_holds_only_the_newest_snapshot():
+    bus = SnapshotBus()
+    updates = bus.subscribe(maxsize=100, policy=LATEST)
+    publish(bus, 3)
+
+    assert updates.get(timeout=0).version == 3
+    assert updates.dropped == 2
+    assert updates.get(timeout=0) is None
+    publish(bus, 1)
+    assert updates.get(timeout=0).version == 4
+
+
+def test_subscriptions_are_independent_and_filter_sources():
+    bus = SnapshotBus()
+    everything = bus.subscribe(maxsize=10)
+    pyth = bus.subscribe(maxsize=10, sources=('pyth',))
+    publish(bus, 2, 'pragma')
+    publish(bus, 1, 'pyth')
+
+    assert [snapshot.source for snapshot in everything.drain()] == ['pragma', 'pragma', 'pyth']
+    assert [snapshot.version for snapshot in pyth.drain()] == [3]
+    assert bus.latest.version == 3 and pyth.dropped == 0
+
+    bus.unsubscribe(pyth)
+    publish(bus, 1, 'pyth')
+    assert pyth.drain() == [] and len(bus) == 1
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        SnapshotBus().subscribe(policy='block')
+
+
+def test_consumers_wake_on_a_publish_from_another_thread():
+    bus = SnapshotBus()
+    blocking = bus.subscribe()
+    awaiting = bus.subscribe()
+    timer = threading.Timer(0.05, publish, (bus, 1))
+    timer.start()
+    try:
+        assert blocking.get(timeout=5).version == 1
+        assert asyncio.run(asyncio.wait_for(awaiting.get_async(), 5)).version == 1
+    finally:
+        timer.join()
+
+    later = bus.subscribe()
+
+    async def wait_then_publish():
+        # The consumer is already waiting when the publish arrives
+        pending = asyncio.ensure_future(later.get_async())
+        await asyncio.sleep(0.01)
+        threading.Thread(target=publish, args=(bus, 1)).start()
+        return await asyncio.wait_for(pending, 5)
+
+    assert asyncio.run(wait_then_publish()).version == 2